@@ -1,68 +1,63 @@
 
 import streamlit as st
 import pandas as pd
-import numpy as np
-import joblib
 import warnings
-from PIL import Image
+from accident_severity.pipeline.predictions import PredictionPipeline
+from accident_severity.components.model_registry import ModelRegistry
+from accident_severity.logging import configure as configure_logging
 warnings.filterwarnings("ignore")
 
+REGISTRY_DIR = "model_registry"
 
-# Load the model
-model = joblib.load("final_model/rta_model.joblib")
+FEATURE_LABELS = {
+    "driver_age": "Driver's Age",
+    "vehicle_owner": "Vehicle Owner",
+    "vehicle_defect": "Vehicle Defect",
+    "accident_area": "Accident Area",
+    "lanes": "Lanes",
+    "surface_type": "Surface Type",
+    "light_condition": "Light Conditions",
+    "casualty_sex": "Casualty Sex",
+    "casualty_work": "Casualty Work",
+    "pedestrian_movement": "Pedestrian Movement",
+}
 
-# Load the preprocessor
-preprocessor = joblib.load("final_model/preprocessor.joblib")
 
+@st.cache_resource
+def start_logging():
+    # Once per server process, not on every rerun
+    configure_logging()
 
 
 # Define the main function
 def main():
     # Set page title and layout
     st.set_page_config(page_title="Accident Severity Prediction App", layout="wide")
+    start_logging()
 
     
 
     st.title("Accident Severity Prediction App")
 
-    # Define dropdown options
-    driver_age_options = ['18-30', '31-50', 'Over 51', 'Unknown', 'Under 18']
-    vehicle_owner_options = ['Owner', 'Governmental', 'Organization', 'Other']
-    vehicle_defect_options = ['No defect', '7', '5']
-    accident_area_options = ['Other', 'Office areas', 'Residential areas', 'Church areas',
-                             'Industrial areas', 'School areas', 'Recreational areas',
-                             'Outside rural areas', 'Hospital areas', 'Market areas', 'Rural village areas',
-                             'Unknown', 'Rural village areas', 'Office areas', 'Recreational areas']
-    
-    lanes_options = ['Two-way', 'Undivided Two way', 'other', 'Double carriageway', 'One way', 'Two-way', 'Unknown']
-    surface_type_options = ['Asphalt roads', 'Earth roads', 'Gravel roads', 'Other', 'Asphalt roads with some distress']
-    light_condition_options = ['Daylight', 'Darkness - lights lit', 'Darkness - no lighting', 'Darkness - lights unlit']
-    casualty_sex_options = ['Male', 'na', 'Female']
-    casualty_work_options = ['Driver', 'Self-employed', 'Employee', 'Other', 'Student', 'Unemployed', 'Unknown']
-    pedestrian_movement_options = ["Not a Pedestrian", 
-                                    "Crossing from nearside - masked by parked or stationary vehicle", 
-                                    "Unknown or other",  
-                                    "Crossing from driver's nearside", 
-                                    "Crossing from offside - masked by parked or stationary vehicle", 
-                                    "In carriageway, stationary - not crossing  (standing or playing)", 
-                                    "Walking along in carriageway, back to traffic", 
-                                    "In carriageway, stationary - not crossing  (standing or playing) - masked by parked or stationary vehicle",
-                                    "Walking along in carriageway, facing traffic"]
+    # Streamlit reruns this script on every interaction, the model and preprocessor
+    # are unpickled by the first run only and reused from the process-wide artifact
+    # cache afterwards. A newly promoted registry version is picked up by the next rerun
+    if ModelRegistry(REGISTRY_DIR).current() is not None:
+        pipeline = PredictionPipeline.from_registry(REGISTRY_DIR, unknown_value="error")
+    else:
+        pipeline = PredictionPipeline(unknown_value="error")
+
+    # The dropdowns offer exactly the categories the model was trained on, some of
+    # which carry stray spaces in the source data, so they are only trimmed for display
+    categories = dict(zip(pipeline.feature_columns, pipeline.encoder.categories))
 
     # Define the form
     with st.form("accident_severity_form"):
         # Add form inputs
         st.subheader("Please enter the following inputs:")
-        driver_age = st.selectbox("Driver's Age", options=driver_age_options)
-        vehicle_owner = st.selectbox("Vehicle Owner", options=vehicle_owner_options)
-        vehicle_defect = st.selectbox("Vehicle Defect", options=vehicle_defect_options)
-        accident_area = st.selectbox("Accident Areaa", options=accident_area_options)
-        lanes = st.selectbox("Lanes", options=lanes_options)
-        surface_type = st.selectbox("Surface Type", options=surface_type_options)
-        light_condition = st.selectbox("Light Conditions", options=light_condition_options)
-        casualty_sex = st.selectbox("Casualty Sex", options=casualty_sex_options)
-        casualty_work = st.selectbox("Casualty Work", options=casualty_work_options)
-        pedestrian_movement = st.selectbox("Pedestrian Movement", options=pedestrian_movement_options)
+        inputs = {column: st.selectbox(label, options=categories[column].tolist(),
+                                       format_func=lambda value: " ".join(value.split()))
+                  for column, label in FEATURE_LABELS.items()}
 
         # Add submit button
         submit_button = st.form_submit_button(label='Predict')
@@ -70,26 +65,13 @@ def main():
     # If submit button is clicked
     if submit_button:
         # Create a DataFrame with the selected input features
-        input_data = pd.DataFrame({
-            'driver_age': [driver_age],
-            'vehicle_owner': [vehicle_owner],
-            'vehicle_defect': [vehicle_defect],
-            'accident_area': [accident_area],
-            'lanes': [lanes],
-            'surface_type': [surface_type],
-            'light_condition': [light_condition],
-            'casualty_sex': [casualty_sex],
-            'casualty_work': [casualty_work],
-            'pedestrian_movement': [pedestrian_movement]
-        })
-
-        # Encode categorical features
-        categorical_cols = input_data.select_dtypes(include=['object']).columns
-        for col in categorical_cols:
-            input_data[col] = input_data[col].astype('category').cat.codes
+        input_data = pd.DataFrame({column: [value] for column, value in inputs.items()})
+
+        # Encode categorical features with the codes the model was trained on
+        encoded_data = pipeline.transform_batch(input_data)
 
         # Make the prediction
-        prediction = model.predict(input_data)
+        prediction = pipeline.predict(encoded_data)
 
         # Map the prediction to human-readable labels
         severity_mapping = {0: 'Slight Injury', 1: 'Serious Injury', 2: 'Fatal Injury'}
@@ -0,0 +1,62 @@
+# Write time, read time and disk footprint of the stage artifact formats,
+# against the float64 CSVs the pipeline used to write.
+#
+#   python benchmarks/artifact_formats.py --rows 1000000
+import time
+import tempfile
+import argparse
+import warnings
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from accident_severity.utils.common import ARTIFACT_FORMATS, compact_codes, save_frame, load_frame
+warnings.filterwarnings("ignore")
+
+
+def make_encoded_frame(n_rows, seed=42):
+    # Same shape as train.csv: ordinal codes as float64 plus the target
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({f"feature_{i}": rng.integers(0, 14, n_rows).astype(np.float64) for i in range(10)})
+    df["accident_severity"] = rng.choice([0, 1, 2], n_rows, p=[0.85, 0.13, 0.02])
+    return df
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_encoded_frame(args.rows)
+    compact = compact_codes(df, df.columns.to_list())
+
+    print(f"{'format':<14} {'write s':>9} {'read s':>9} {'size MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        # Previous behaviour: float64 codes written with DataFrame.to_csv
+        baseline = Path(tmp, "baseline.csv")
+        write, _ = timed(lambda: df.to_csv(baseline, index=False), args.repeat)
+        read, _ = timed(lambda: pd.read_csv(baseline), args.repeat)
+        print(f"{'csv (float64)':<14} {write:>9.3f} {read:>9.3f} {baseline.stat().st_size / 2**20:>9.1f}")
+
+        for fmt, suffix in ARTIFACT_FORMATS.items():
+            path = Path(tmp, "train" + suffix)
+            write, _ = timed(lambda: save_frame(compact, path), args.repeat)
+            # Touch the data so lazily mapped formats pay for their page faults
+            read, _ = timed(lambda: load_frame(path).to_numpy().sum(), args.repeat)
+            size = sum(p.stat().st_size for p in Path(tmp).glob("train.*"))
+            print(f"{fmt:<14} {write:>9.3f} {read:>9.3f} {size / 2**20:>9.1f}")
+            for p in Path(tmp).glob("train.*"):
+                p.unlink()
+
+
+if __name__ == "__main__":
+    main()
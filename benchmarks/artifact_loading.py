@@ -0,0 +1,101 @@
+# Load time and memory of N worker processes starting at once, each loading the
+# model and preprocessor and scoring one row: the joblib files the pipeline writes
+# against a ModelPackage (UBJSON booster, .npy categories) under each codec.
+# Workers are fresh interpreters; import is the xgboost/sklearn import
+# every format pays, load is the artifacts alone. RSS counts shared pages in full,
+# PSS splits them between the processes mapping them.
+#
+#   python benchmarks/artifact_loading.py --workers 1 4 8 --codecs none gzip lzma
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import warnings
+warnings.filterwarnings("ignore")
+
+
+def memory_mb():
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            key, *rest = line.split()
+            if key in ("Rss:", "Pss:"):
+                values[key[:-1].lower()] = int(rest[0]) / 1024
+    return values
+
+
+def worker(args):
+    start = time.perf_counter()
+    import xgboost  # noqa: F401 (also imports sklearn)
+    from accident_severity.pipeline.predictions import PredictionPipeline
+    imported = time.perf_counter()
+
+    if args.format == "joblib":
+        pipeline = PredictionPipeline(args.model_path, args.preprocessor_path, unknown_value="most_frequent")
+    else:
+        pipeline = PredictionPipeline(package_dir=args.package_dir, unknown_value="most_frequent")
+    pipeline.predict_batch([dict.fromkeys(pipeline.feature_columns)])
+    loaded = time.perf_counter()
+
+    print(json.dumps({"import_seconds": imported - start, "load_seconds": loaded - imported, **memory_mb()}),
+          flush=True)
+    # Stay alive until every worker has reported, so PSS sees them all at once
+    sys.stdin.read()
+
+
+def run_workers(command, n_workers):
+    # Workers also log to stdout, their result is the one JSON line
+    processes = [subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+                 for _ in range(n_workers)]
+    results = [json.loads(next(line for line in process.stdout if line.startswith("{")))
+               for process in processes]
+    for process in processes:
+        process.stdin.close()
+        process.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--codecs", nargs="+", default=["none", "gzip", "lzma"])
+    parser.add_argument("--model-path", default="artifacts/model_trainer/rta_model.joblib")
+    parser.add_argument("--preprocessor-path", default="artifacts/data_transformation/preprocessor.joblib")
+    parser.add_argument("--worker", dest="format", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--package-dir", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.format is not None:
+        worker(args)
+        return
+
+    import joblib
+    from accident_severity.components.model_package import ModelPackage
+
+    model, preprocessor = joblib.load(args.model_path), joblib.load(args.preprocessor_path)
+    base = [sys.executable, __file__, "--model-path", args.model_path, "--preprocessor-path", args.preprocessor_path]
+    print(f"{'format':<14} {'size KB':>8} {'workers':>7} {'import s':>9} {'load s':>8} "
+          f"{'RSS MB':>8} {'PSS MB':>8} {'total PSS MB':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        formats = [("joblib", base + ["--worker", "joblib"],
+                    os.path.getsize(args.model_path) + os.path.getsize(args.preprocessor_path))]
+        for codec in args.codecs:
+            package_dir = os.path.join(tmp, codec)
+            manifest = ModelPackage.save(model, preprocessor, package_dir, codec=codec)
+            size = sum(os.path.getsize(os.path.join(package_dir, name)) for name in manifest["files"])
+            formats.append((f"package/{codec}", base + ["--worker", "package", "--package-dir", package_dir], size))
+
+        for name, command, size in formats:
+            for n_workers in args.workers:
+                results = run_workers(command, n_workers)
+                mean = {key: sum(result[key] for result in results) / n_workers for key in results[0]}
+                print(f"{name:<14} {size / 1024:>8.0f} {n_workers:>7} {mean['import_seconds']:>9.3f} "
+                      f"{mean['load_seconds']:>8.3f} {mean['rss']:>8.1f} {mean['pss']:>8.1f} "
+                      f"{mean['pss'] * n_workers:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
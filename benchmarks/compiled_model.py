@@ -0,0 +1,88 @@
+# Cold start and per-batch latency of the joblib XGBClassifier against the NumPy
+# trees written by the Model Export Stage. Cold start is a fresh interpreter
+# that loads the pipeline and scores one row; it also reports whether xgboost
+# or sklearn ended up imported.
+#
+#   python benchmarks/compiled_model.py --compiled-dir artifacts/model_export --batch-sizes 1 100 10000
+import sys
+import json
+import time
+import argparse
+import subprocess
+import warnings
+import numpy as np
+warnings.filterwarnings("ignore")
+
+
+def load_pipeline(mode, compiled_dir):
+    from accident_severity.pipeline.predictions import PredictionPipeline
+
+    if mode == "compiled":
+        return PredictionPipeline(unknown_value="most_frequent", compiled_dir=compiled_dir)
+    # The model the export was built from, not whatever sits in final_model
+    return PredictionPipeline(model_path="artifacts/model_trainer/rta_model.joblib",
+                              preprocessor_path="artifacts/data_transformation/preprocessor.joblib",
+                              unknown_value="most_frequent")
+
+
+def cold_start(mode, compiled_dir):
+    start = time.perf_counter()
+    pipeline = load_pipeline(mode, compiled_dir)
+    X = pipeline.encoder.transform(np.array([[None] * len(pipeline.feature_columns)], dtype=object))
+    pipeline.predict_proba_codes(X)
+    return {
+        "seconds": time.perf_counter() - start,
+        "xgboost_imported": "xgboost" in sys.modules,
+        "sklearn_imported": "sklearn" in sys.modules,
+    }
+
+
+def batch_latency(pipeline, X, batch_size, repeat):
+    timings = []
+    for i in range(repeat):
+        batch = X[np.arange(i * batch_size, (i + 1) * batch_size) % len(X)]
+        start = time.perf_counter()
+        pipeline.predict_proba_codes(batch)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--compiled-dir", default="artifacts/model_export")
+    parser.add_argument("--data", default="artifacts/data_transformation/test",
+                        help="Encoded rows to score, without the file extension")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 100, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--cold-start", choices=["joblib", "compiled"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cold_start:
+        print(json.dumps(cold_start(args.cold_start, args.compiled_dir)))
+        return
+
+    print(f"{'model':<9} {'cold start s':>13} {'xgboost':>8} {'sklearn':>8}")
+    for mode in ("joblib", "compiled"):
+        runs = [json.loads(subprocess.run([sys.executable, __file__, "--cold-start", mode, "--compiled-dir",
+                                           args.compiled_dir], capture_output=True, text=True,
+                                          check=True).stdout.strip().splitlines()[-1]) for _ in range(3)]
+        result = min(runs, key=lambda run: run["seconds"])
+        print(f"{mode:<9} {result['seconds']:>13.3f} {str(result['xgboost_imported']):>8} "
+              f"{str(result['sklearn_imported']):>8}")
+
+    from accident_severity.config.configuration import ConfigurationManager
+    from accident_severity.utils.common import load_frame
+
+    config = ConfigurationManager()
+    X = load_frame(config.artifact_path(args.data)).drop(columns=[config.schema.TARGET_COLUMN.name])
+    X = X.to_numpy(dtype=np.float32)
+    pipelines = {mode: load_pipeline(mode, args.compiled_dir) for mode in ("joblib", "compiled")}
+
+    print(f"\n{'batch':>7} " + " ".join(f"{mode + ' ms':>12}" for mode in pipelines))
+    for batch_size in args.batch_sizes:
+        timings = [batch_latency(pipeline, X, batch_size, args.repeat) for pipeline in pipelines.values()]
+        print(f"{batch_size:>7} " + " ".join(f"{ms:>12.3f}" for ms in timings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# Wall time and peak memory of k-fold CV as the number of folds grows:
+# the memory-mapped CrossValidation stage against a naive pool that receives
+# pickled DataFrame copies of every fold. Each run is a fresh subprocess so
+# ru_maxrss starts from zero.
+#
+#   python benchmarks/cross_validation.py --folds 3 5 10 --scale 10
+import sys
+import json
+import time
+import argparse
+import tempfile
+import resource
+import warnings
+import subprocess
+import dataclasses
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.model_selection import StratifiedKFold
+warnings.filterwarnings("ignore")
+
+
+def naive_fold(trainer_config, X_train, y_train, X_test, y_test):
+    from accident_severity.components.model_trainer import ModelTrainer
+    from accident_severity.components.model_evaluation import ModelEvaluation
+
+    trainer = ModelTrainer(trainer_config, data=(X_train, y_train, None, None))
+    model, _ = trainer.fit(n_jobs=1)
+    return ModelEvaluation.evaluation_metrics(y_test, model.predict(X_test))[0]
+
+
+def run(mode, n_splits, data_paths, n_workers):
+    from accident_severity.config.configuration import ConfigurationManager
+    from accident_severity.components.cross_validation import CrossValidation
+    from accident_severity.utils.common import load_frame
+
+    configuration = ConfigurationManager()
+    config = dataclasses.replace(configuration.get_cross_validation_config(), n_splits=n_splits,
+                                 n_workers=n_workers, data_paths=data_paths, resampling_strategy="random")
+    trainer_config = dataclasses.replace(configuration.get_model_trainer_config(), early_stopping_rounds=None,
+                                         tuned_params_path=None, resampling_strategy="random")
+
+    start = time.perf_counter()
+    if mode == "memmap":
+        with tempfile.TemporaryDirectory() as tmp:
+            config = dataclasses.replace(config, root_dir=tmp, metric_file_name=str(Path(tmp, "cv.json")))
+            cross_validation = CrossValidation(config, trainer_config)
+            cross_validation.write_arrays()
+            f1 = np.mean([result["f1_score"] for result in cross_validation.run_folds(cross_validation.folds())])
+    else:
+        from accident_severity.components.resampling import random_oversample
+
+        df = pd.concat([load_frame(Path(path)) for path in data_paths], ignore_index=True)
+        X, y = df.drop(columns=[config.target_column]).astype(np.float32), df[config.target_column]
+        splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=config.random_state)
+        with ProcessPoolExecutor(n_workers) as pool:
+            futures = []
+            for train_index, test_index in splitter.split(X, y):
+                X_train, y_train = random_oversample(X.iloc[train_index], y.iloc[train_index])
+                futures.append(pool.submit(naive_fold, trainer_config, X_train, y_train,
+                                           X.iloc[test_index], y.iloc[test_index]))
+            f1 = np.mean([future.result() for future in futures])
+
+    return {
+        "seconds": time.perf_counter() - start,
+        "parent_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "worker_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+        "f1": f1,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--folds", type=int, nargs="+", default=[3, 5, 10])
+    parser.add_argument("--scale", type=int, default=10, help="Replicate the encoded rows this many times")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--run", nargs=2, metavar=("MODE", "FOLDS"), help=argparse.SUPPRESS)
+    parser.add_argument("--data", nargs="+", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run(args.run[0], int(args.run[1]), args.data, args.workers)))
+        return
+
+    from accident_severity.config.configuration import ConfigurationManager
+    from accident_severity.utils.common import load_frame, save_frame
+
+    config = ConfigurationManager().get_cross_validation_config()
+    frames = [load_frame(Path(path)) for path in config.data_paths if Path(path).exists()]
+    df = pd.concat(frames * args.scale, ignore_index=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = Path(tmp, "encoded.parquet")
+        save_frame(df, data_path)
+
+        print(f"{'rows':>9} {'folds':>6} {'mode':<7} {'seconds':>8} {'parent MB':>10} {'worker MB':>10} {'f1':>7}")
+        for n_splits in args.folds:
+            for mode in ("naive", "memmap"):
+                output = subprocess.run([sys.executable, __file__, "--run", mode, str(n_splits), "--workers",
+                                         str(args.workers), "--data", str(data_path)],
+                                        capture_output=True, text=True, check=True).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                print(f"{len(df):>9} {n_splits:>6} {mode:<7} {result['seconds']:>8.2f} {result['parent_mb']:>10.1f} "
+                      f"{result['worker_mb']:>10.1f} {result['f1']:>7.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# Load time and peak memory of the raw RTA CSV loading in DataTransformation:
+# full object-dtype read + rename + select (previous behaviour) against the
+# schema-driven usecols + category read.
+#
+#   python benchmarks/csv_loading.py --scale 1 100
+import time
+import tempfile
+import argparse
+import tracemalloc
+import pandas as pd
+from pathlib import Path
+from accident_severity.config.configuration import ConfigurationManager
+from accident_severity.components.data_transformation import select_columns, source_columns
+
+
+def load_full(config):
+    df = pd.read_csv(config.data_path)
+    df.rename(columns=config.column_mapping, inplace=True)
+    df.drop(columns=["time"], axis=1, inplace=True)
+    return df[config.feature_columns + [config.target_column]]
+
+
+def load_pruned(config):
+    columns = config.feature_columns + [config.target_column]
+    usecols = source_columns(config.column_mapping, columns)
+    df = pd.read_csv(config.data_path, usecols=usecols, dtype="category")
+    return select_columns(df, config.column_mapping, columns)
+
+
+def measure(fn, config):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn(config)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 100])
+    args = parser.parse_args()
+
+    config = ConfigurationManager().get_data_transformation_config()
+    source = pd.read_csv(config.data_path)
+
+    print(f"{'rows':>10} {'loader':<8} {'seconds':>9} {'peak MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scale:
+            path = Path(tmp, f"rta_x{scale}.csv")
+            for i in range(scale):
+                source.to_csv(path, mode="a", header=i == 0, index=False)
+            scaled = config.__class__(**{**config.__dict__, "data_path": path})
+
+            for name, fn in (("full", load_full), ("pruned", load_pruned)):
+                elapsed, peak = measure(fn, scaled)
+                print(f"{len(source) * scale:>10} {name:<8} {elapsed:>9.3f} {peak:>9.1f}")
+            path.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# Cold import cost of the package entry points, parsed from `python -X importtime`.
+# For every target it prints the cumulative import time, the slowest top-level
+# imports and which heavy dependencies got loaded. --budget-ms makes it exit
+# non-zero when a target gets slower, so it can guard against import regressions.
+#
+#   python benchmarks/import_time.py --repeat 5 --top 5 --budget-ms 400
+import sys
+import argparse
+import subprocess
+
+TARGETS = [
+    "accident_severity.logging",
+    "accident_severity.config.configuration",
+    "accident_severity.pipeline.stages",
+    "accident_severity.pipeline.predictions",
+    "accident_severity.__main__",
+]
+
+HEAVY = ["pandas", "joblib", "sklearn", "xgboost", "imblearn", "optuna", "catboost", "flask"]
+
+
+def import_time(target):
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {target}"],
+                            capture_output=True, text=True, check=True).stderr
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nesting is encoded as two extra spaces per level after the single separator space
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), depth, int(cumulative)))
+
+    total = next(us for name, depth, us in imports if name == target and depth == 0)
+    direct = [(name, us) for name, depth, us in imports if depth == 1]
+    loaded = {name for name, _, _ in imports}
+    return {
+        "total_ms": total / 1000,
+        "top": sorted(direct, key=lambda item: item[1], reverse=True),
+        "heavy": [module for module in HEAVY if module in loaded],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("targets", nargs="*", default=TARGETS)
+    parser.add_argument("--repeat", type=int, default=5, help="Best of this many fresh interpreters")
+    parser.add_argument("--top", type=int, default=5, help="Slowest top-level imports to list per target")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail when any target takes longer")
+    args = parser.parse_args()
+
+    over_budget = []
+    for target in args.targets:
+        result = min((import_time(target) for _ in range(args.repeat)), key=lambda run: run["total_ms"])
+        print(f"{target}: {result['total_ms']:.1f} ms, heavy: {', '.join(result['heavy']) or '-'}")
+        for name, us in result["top"][:args.top]:
+            print(f"    {us / 1000:>8.1f} ms  {name}")
+        if args.budget_ms is not None and result["total_ms"] > args.budget_ms:
+            over_budget.append(target)
+
+    if over_budget:
+        sys.exit(f"Over the {args.budget_ms} ms budget: {', '.join(over_budget)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# Exercises DataIngestion against a local HTTP stand-in for the dataset host:
+# a clean download, a transfer cut off part way (resumed with a Range request),
+# a server that ignores Range, a wrong pinned sha256 and a truncated file left
+# on disk. Then times reading the CSV extracted to disk against streaming it
+# straight out of the archive. Exits non-zero when a scenario ends differently
+# than expected or the two reads differ; tests/test_ingestion.py runs the same
+# scenarios under pytest.
+#
+#   python benchmarks/ingestion.py --zip artifacts/data_ingestion/RTA_data.zip --cut 0.4
+import time
+import argparse
+import tempfile
+import threading
+import dataclasses
+import warnings
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+warnings.filterwarnings("ignore")
+
+EXPECTED_OUTCOMES = ["ok", "ok", "ok", "rejected", "ok", "ok"]
+
+
+class StandInServer:
+    def __init__(self, payload):
+        self.payload = payload
+        self.cut_after = None
+        self.honour_range = True
+        self.bytes_sent = 0
+        self.requests = []
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                range_header = self.headers.get("Range")
+                server.requests.append(range_header)
+                start = 0
+                if range_header and server.honour_range:
+                    start = int(range_header.split("=")[1].split("-")[0])
+                    if start >= len(server.payload):
+                        self.send_response(416)
+                        self.end_headers()
+                        return
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{len(server.payload) - 1}/{len(server.payload)}")
+                else:
+                    self.send_response(200)
+                body = server.payload[start:]
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+
+                if server.cut_after is not None:
+                    # Drop the connection once, part way through the body
+                    body, server.cut_after = body[:server.cut_after], None
+                self.wfile.write(body)
+                server.bytes_sent += len(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/RTA-Dataset.zip"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def reset(self, cut_after=None, honour_range=True):
+        self.cut_after, self.honour_range, self.bytes_sent, self.requests = cut_after, honour_range, 0, []
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--zip", default="artifacts/data_ingestion/RTA_data.zip")
+    parser.add_argument("--member", default="RTA Dataset.csv")
+    parser.add_argument("--cut", type=float, default=0.4, help="Fraction of the body sent before the connection drops")
+    parser.add_argument("--chunk-size", type=int, default=64 * 1024)
+    args = parser.parse_args()
+
+    from accident_severity.config.configuration import ConfigurationManager
+    from accident_severity.components.data_ingestion import DataIngestion
+    from accident_severity.components.data_transformation import DataTransformation
+    from accident_severity.utils.common import hash_file
+
+    payload = Path(args.zip).read_bytes()
+    digest = hash_file(args.zip)
+    server = StandInServer(payload)
+    configuration = ConfigurationManager()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = dataclasses.replace(configuration.get_data_ingestion_config(), source_url=server.url,
+                                     local_data_file=str(Path(tmp, "RTA_data.zip")), unzip_dir=tmp,
+                                     sha256=digest, chunk_size=args.chunk_size, timeout=5)
+
+        def run(name, cut_after=None, honour_range=True, sha256=digest, existing=None):
+            server.reset(cut_after, honour_range)
+            Path(config.local_data_file).unlink(missing_ok=True)
+            if existing is not None:
+                Path(config.local_data_file).write_bytes(existing)
+            ingestion = DataIngestion(dataclasses.replace(config, sha256=sha256))
+
+            start = time.perf_counter()
+            try:
+                ingestion.download_file()
+                outcome = "ok" if hash_file(config.local_data_file) == digest else "CORRUPT"
+            except ValueError:
+                outcome = "rejected"
+            seconds = time.perf_counter() - start
+            print(f"{name:<26} {outcome:<9} {seconds:>8.2f} {len(server.requests):>9} {server.bytes_sent:>11}")
+            return outcome
+
+        print(f"{'scenario':<26} {'outcome':<9} {'seconds':>8} {'requests':>9} {'bytes sent':>11}")
+        outcomes = [
+            run("clean"),
+            run("cut and resumed", cut_after=int(len(payload) * args.cut)),
+            run("cut, Range ignored", cut_after=int(len(payload) * args.cut), honour_range=False),
+            run("wrong sha256", sha256="0" * 64),
+            run("truncated file on disk", existing=payload[:len(payload) // 2]),
+            run("no sha256, truncated file", sha256=None, existing=payload[:len(payload) // 2]),
+        ]
+
+        transformation_config = configuration.get_data_transformation_config()
+        usecols = None
+        extracted = dataclasses.replace(transformation_config, zip_path=None,
+                                        data_path=str(Path(tmp, args.member)))
+        streamed = dataclasses.replace(transformation_config, zip_path=args.zip, zip_member=args.member)
+
+        start = time.perf_counter()
+        DataIngestion(config).extract_zip_file()
+        df_extracted = DataTransformation(extracted).read_raw(usecols)
+        extract_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        df_streamed = DataTransformation(streamed).read_raw(usecols)
+        stream_seconds = time.perf_counter() - start
+
+        identical = df_extracted.equals(df_streamed)
+        print(f"\nextract + read_csv {extract_seconds:.3f}s ({Path(extracted.data_path).stat().st_size} bytes on disk), "
+              f"streamed from zip {stream_seconds:.3f}s (0 bytes), identical: {identical}")
+
+    server.httpd.shutdown()
+    if outcomes != EXPECTED_OUTCOMES or not identical:
+        raise SystemExit(f"Unexpected outcomes {outcomes} (expected {EXPECTED_OUTCOMES}), identical: {identical}")
+
+
+if __name__ == "__main__":
+    main()
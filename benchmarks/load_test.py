@@ -0,0 +1,106 @@
+# Concurrent load generator for the micro-batching prediction service.
+#
+# Starts the service in-process (or targets --url of a running one), fires
+# requests from --concurrency client threads and reports latency percentiles
+# and throughput.
+#
+#   python benchmarks/load_test.py --requests 5000 --concurrency 32 --rows-per-request 1
+import json
+import logging
+import time
+import argparse
+import threading
+import http.client
+import warnings
+import numpy as np
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+warnings.filterwarnings("ignore")
+
+
+def start_local_server(args):
+    from werkzeug.serving import make_server
+    from accident_severity.pipeline.predictions import PredictionPipeline
+    from accident_severity.pipeline.serving import MicroBatcher, Deployment, HotSwap, create_app
+    from accident_severity.utils.common import read_yaml
+    from accident_severity.constants import SCHEMA_FILE_PATH
+
+    pipeline = PredictionPipeline(args.model_path, args.preprocessor_path, unknown_value="most_frequent")
+    batcher = MicroBatcher(pipeline.predict_proba_codes,
+                           max_batch_size=args.max_batch_size,
+                           max_wait_ms=args.max_wait_ms)
+    hot_swap = HotSwap(Deployment(pipeline, batcher))
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    target_mapping = read_yaml(SCHEMA_FILE_PATH).TARGET_MAPPING
+    server = make_server("127.0.0.1", 0, create_app(hot_swap, target_mapping), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return f"http://127.0.0.1:{server.server_port}", pipeline, server, batcher
+
+
+def make_payloads(categories, feature_columns, n_requests, rows_per_request, seed=42):
+    rng = np.random.default_rng(seed)
+    payloads = []
+    for _ in range(n_requests):
+        records = [{col: str(cats[rng.integers(len(cats))]) for col, cats in zip(feature_columns, categories)}
+                   for _ in range(rows_per_request)]
+        payloads.append(json.dumps({"records": records}))
+    return payloads
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="Target a running service instead of starting one")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rows-per-request", type=int, default=1)
+    parser.add_argument("--max-batch-size", type=int, default=1024)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    parser.add_argument("--model-path", default="final_model/rta_model.joblib")
+    parser.add_argument("--preprocessor-path", default="final_model/preprocessor.joblib")
+    args = parser.parse_args()
+
+    if args.url is None:
+        url, pipeline, server, batcher = start_local_server(args)
+        categories, feature_columns = pipeline.encoder.categories, pipeline.feature_columns
+    else:
+        import joblib
+        from accident_severity.components.categorical_encoder import CategoricalLookupEncoder
+
+        url, server = args.url, None
+        encoder = CategoricalLookupEncoder.from_preprocessor(joblib.load(args.preprocessor_path))
+        categories, feature_columns = encoder.categories, encoder.feature_columns
+
+    target = urlparse(url)
+    payloads = make_payloads(categories, feature_columns, args.requests, args.rows_per_request)
+    local = threading.local()
+
+    def send(payload):
+        # One keep-alive connection per client thread
+        if not hasattr(local, "conn"):
+            local.conn = http.client.HTTPConnection(target.hostname, target.port)
+        start = time.perf_counter()
+        local.conn.request("POST", "/predict", body=payload, headers={"Content-Type": "application/json"})
+        response = local.conn.getresponse()
+        response.read()
+        if response.status != 200:
+            raise RuntimeError(f"Request failed with status {response.status}")
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        latencies = np.array(list(pool.map(send, payloads))) * 1000
+    elapsed = time.perf_counter() - start
+
+    if server is not None:
+        server.shutdown()
+        batcher.close()
+
+    print(f"requests:    {args.requests} x {args.rows_per_request} rows, concurrency {args.concurrency}")
+    print(f"p50 latency: {np.percentile(latencies, 50):.2f} ms")
+    print(f"p99 latency: {np.percentile(latencies, 99):.2f} ms")
+    print(f"throughput:  {args.requests / elapsed:,.0f} req/s, {args.requests * args.rows_per_request / elapsed:,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# Per-call latency of logging.info on the scoring path while several threads
+# score single rows concurrently, one prediction record per scored row.
+#
+# sync writes each JSON record to the rotating log file on the calling thread
+# (what a plain FileHandler does), async is the queue handler from
+# accident_severity.logging with every record kept, sampled keeps
+# --sample-rate of them. Log files go to a temporary directory. With more
+# threads than cores the tail also holds waits for the GIL, compare the p50s.
+#
+#   python benchmarks/logging_latency.py --threads 8 --calls 5000 --sample-rate 0.01
+import time
+import logging
+import argparse
+import tempfile
+import threading
+import dataclasses
+import warnings
+import numpy as np
+warnings.filterwarnings("ignore")
+
+
+def sync_backend(config):
+    from accident_severity.logging import ContextFilter, JsonFormatter, LazyRotatingFileHandler
+
+    handler = LazyRotatingFileHandler(f"{config.log_dir}/{config.file_name}", config.max_bytes, config.backup_count)
+    handler.setFormatter(JsonFormatter())
+    handler.addFilter(ContextFilter())
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    logging.getLogger("accident_severity.predictions").filters = []
+    return handler
+
+
+def run(pipeline, X, n_threads, n_calls):
+    from accident_severity.logging import prediction_logger, log_context
+
+    latencies = np.empty((n_threads, n_calls))
+    barrier = threading.Barrier(n_threads + 1)
+
+    def worker(index):
+        rows = X[np.arange(index, index + n_calls) % len(X)]
+        barrier.wait()
+        for call in range(n_calls):
+            with log_context(request_id=f"{index}-{call}"):
+                proba = pipeline.predict_proba_codes(rows[call:call + 1])
+                start = time.perf_counter()
+                prediction_logger.info("prediction", extra={"fields": {"rows": 1, "label": int(proba.argmax())}})
+                latencies[index, call] = time.perf_counter() - start
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return latencies.ravel() * 1e6, n_threads * n_calls / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--calls", type=int, default=5000, help="Scored rows and log calls per thread")
+    parser.add_argument("--sample-rate", type=float, default=0.01)
+    parser.add_argument("--model-path", default="final_model/rta_model.joblib")
+    parser.add_argument("--preprocessor-path", default="final_model/preprocessor.joblib")
+    args = parser.parse_args()
+
+    import accident_severity.logging as log
+    from accident_severity.pipeline.predictions import PredictionPipeline
+
+    pipeline = PredictionPipeline(args.model_path, args.preprocessor_path, unknown_value="most_frequent")
+    X = np.column_stack([np.random.default_rng(index).integers(0, len(categories), 10_000)
+                         for index, categories in enumerate(pipeline.encoder.categories)]).astype(np.float32)
+
+    print(f"{'backend':<10} {'mean us':>9} {'p50 us':>9} {'p99 us':>9} {'max us':>10} {'rows/s':>10} {'lines':>8}")
+    for name in ("sync", "async", "sampled"):
+        with tempfile.TemporaryDirectory() as tmp:
+            config = dataclasses.replace(log.DEFAULT_CONFIG, log_dir=tmp, console=False,
+                                         prediction_sample_rate=args.sample_rate if name == "sampled" else 1.0)
+            if name == "sync":
+                handler = sync_backend(config)
+            else:
+                backend = log.configure(config)
+            latencies, throughput = run(pipeline, X, args.threads, args.calls)
+            if name == "sync":
+                logging.getLogger().removeHandler(handler)
+                handler.close()
+            else:
+                backend.stop()
+            with open(f"{tmp}/{config.file_name}") as f:
+                lines = sum(1 for _ in f)
+        print(f"{name:<10} {latencies.mean():>9.1f} {np.percentile(latencies, 50):>9.1f} "
+              f"{np.percentile(latencies, 99):>9.1f} {latencies.max():>10.1f} {throughput:>10,.0f} {lines:>8}")
+
+
+if __name__ == "__main__":
+    main()
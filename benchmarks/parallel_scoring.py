@@ -0,0 +1,48 @@
+# Throughput of forked process-pool scoring for an increasing number of workers.
+# The rows are scored in chunks through one pool, as batch scoring does, and the
+# pool startup is part of the timing.
+#
+#   python benchmarks/parallel_scoring.py --rows 1000000 --chunksize 100000 --workers 1 2 4 8
+import os
+import time
+import argparse
+import warnings
+import numpy as np
+from accident_severity.pipeline.predictions import PredictionPipeline
+from accident_severity.components.parallel_scoring import ParallelScoring
+warnings.filterwarnings("ignore")
+
+
+def make_records(pipeline, n_rows, seed=42):
+    rng = np.random.default_rng(seed)
+    columns = [cats[rng.integers(0, len(cats), n_rows)] for cats in pipeline.encoder.categories]
+    return np.stack(columns, axis=1).astype(object)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count()])
+    parser.add_argument("--model-path", default="final_model/rta_model.joblib")
+    parser.add_argument("--preprocessor-path", default="final_model/preprocessor.joblib")
+    args = parser.parse_args()
+
+    pipeline = PredictionPipeline(args.model_path, args.preprocessor_path)
+    X = make_records(pipeline, args.rows)
+
+    baseline = None
+    print(f"{'workers':>7} {'seconds':>9} {'rows/s':>12} {'speedup':>8}")
+    for n_workers in sorted(set(args.workers)):
+        start = time.perf_counter()
+        with ParallelScoring(pipeline, n_workers=n_workers) as scorer:
+            for offset in range(0, args.rows, args.chunksize):
+                scorer.predict_proba(X[offset:offset + args.chunksize])
+        elapsed = time.perf_counter() - start
+
+        baseline = baseline or elapsed
+        print(f"{n_workers:>7} {elapsed:>9.3f} {args.rows / elapsed:>12,.0f} {baseline / elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
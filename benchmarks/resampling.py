@@ -0,0 +1,70 @@
+# Runtime, peak memory and weighted F1 of the resampling strategies in
+# params.yaml, on the encoded train/test split of the transformation stage.
+# The F1 column trains the configured XGBClassifier on each resampled set
+# and scores it on the untouched test rows.
+#
+#   python benchmarks/resampling.py --scale 1 10
+import time
+import argparse
+import tracemalloc
+import warnings
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from xgboost import XGBClassifier
+from sklearn.metrics import f1_score
+from accident_severity.config.configuration import ConfigurationManager
+from accident_severity.components.resampling import RESAMPLERS, resample, balanced_sample_weight
+from accident_severity.utils.common import load_frame
+warnings.filterwarnings("ignore")
+
+
+def measure(strategy, X, y, categorical_features, k_neighbors):
+    tracemalloc.start()
+    start = time.perf_counter()
+    X_res, y_res = resample(strategy, X, y, categorical_features, k_neighbors=k_neighbors)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return X_res, y_res, elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, nargs="+", default=[1],
+                        help="Replicate the train set this many times to time larger inputs")
+    parser.add_argument("--strategies", nargs="+", default=list(RESAMPLERS))
+    args = parser.parse_args()
+
+    configuration = ConfigurationManager()
+    transformation = configuration.get_data_transformation_config()
+    trainer = configuration.get_model_trainer_config()
+    target = transformation.target_column
+
+    root = Path(transformation.root_dir)
+    train = load_frame(configuration.artifact_path(str(root / "train")))
+    test = load_frame(configuration.artifact_path(str(root / "test")))
+    X_test, y_test = test.drop(columns=[target]), test[target]
+
+    print(f"{'rows':>9} {'strategy':<13} {'seconds':>9} {'peak MB':>9} {'out rows':>9} {'weighted F1':>12}")
+    for scale in args.scale:
+        # The transformation stage resamples the float64 output of the preprocessor
+        scaled = pd.concat([train] * scale, ignore_index=True)
+        scaled = scaled.astype({col: "float64" for col in transformation.feature_columns})
+        X, y = scaled.drop(columns=[target]), scaled[target]
+        categorical_features = list(range(X.shape[1]))
+
+        for strategy in args.strategies:
+            X_res, y_res, elapsed, peak = measure(strategy, X, y, categorical_features, transformation.k_neighbors)
+
+            sample_weight = balanced_sample_weight(y_res) if strategy == "class_weight" else None
+            model = XGBClassifier(n_estimators=trainer.n_estimators, max_depth=trainer.max_depth,
+                                  learning_rate=trainer.learning_rate)
+            model.fit(X_res, np.asarray(y_res), sample_weight=sample_weight)
+            f1 = f1_score(y_test, model.predict(X_test), average="weighted")
+
+            print(f"{len(X):>9} {strategy:<13} {elapsed:>9.3f} {peak:>9.1f} {len(X_res):>9} {f1:>12.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+# Benchmark suite over every pipeline stage and the serving path, with a JSON
+# history to catch regressions before deploying.
+#
+# `run` builds a synthetic raw dataset per scale (multiples of the source CSV,
+# see SyntheticDataGenerator), zips it and pushes it through the stages in a
+# temporary directory, timing each step and sampling its peak RSS above the
+# level it started at. Every scale runs in a fresh subprocess. The results are
+# appended as one JSON line to the history file, tagged with the git commit.
+#
+# `compare` diffs the latest run against an earlier one (the previous run by
+# default) and exits non-zero when a case got slower, or used more memory, by
+# more than the threshold.
+#
+#   python benchmarks/suite.py run --scales 1 10 --batch-sizes 1 100 10000 100000
+#   python benchmarks/suite.py compare --threshold 0.15
+import os
+import sys
+import json
+import time
+import zipfile
+import argparse
+import tempfile
+import platform
+import threading
+import subprocess
+import dataclasses
+import warnings
+from pathlib import Path
+from datetime import datetime, timezone
+warnings.filterwarnings("ignore")
+
+HISTORY = "artifacts/benchmarks/history.jsonl"
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+class PeakRSS:
+    # Polls the resident set size from a background thread while the block runs
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stop = threading.Event()
+
+    def poll(self):
+        while not self.stop.wait(self.interval):
+            self.peak = max(self.peak, rss_mb())
+
+    def __enter__(self):
+        self.start = self.peak = rss_mb()
+        self.thread = threading.Thread(target=self.poll, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        self.thread.join()
+        self.peak = max(self.peak, rss_mb())
+
+
+def measure(results, name, fn, repeat=1):
+    timings, peaks = [], []
+    for _ in range(repeat):
+        with PeakRSS() as memory:
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        peaks.append(memory.peak - memory.start)
+    results[name] = {"seconds": min(timings), "peak_mb": max(peaks)}
+    print(f"{name:<40} {min(timings):>10.4f}s {max(peaks):>9.1f} MB", file=sys.stderr)
+
+
+def run_scale(scale, batch_sizes, repeat):
+    import numpy as np
+    from accident_severity.config.configuration import ConfigurationManager
+    from accident_severity.components.synthetic_data import SyntheticDataGenerator
+    from accident_severity.components.data_ingestion import DataIngestion
+    from accident_severity.components.data_transformation import DataTransformation
+    from accident_severity.components.model_trainer import ModelTrainer
+    from accident_severity.components.model_evaluation import ModelEvaluation
+    from accident_severity.pipeline.predictions import PredictionPipeline
+    from accident_severity.utils.common import load_frame
+
+    configuration = ConfigurationManager()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        synthetic_config = configuration.get_synthetic_data_config()
+        raw_name = Path(configuration.get_data_transformation_config().data_path).name
+        generator = SyntheticDataGenerator(synthetic_config).fit()
+        n_source_rows = sum(1 for _ in open(synthetic_config.source_path, "rb")) - 1
+        raw_path = generator.generate(n_rows=n_source_rows * scale, output_path=Path(tmp, raw_name))
+        zip_path = Path(tmp, "RTA_data.zip")
+        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zip_file:
+            zip_file.write(raw_path, raw_name)
+        os.remove(raw_path)
+
+        ingestion = DataIngestion(dataclasses.replace(configuration.get_data_ingestion_config(),
+                                                      local_data_file=str(zip_path), unzip_dir=tmp))
+        measure(results, "ingestion.extract_zip_file", ingestion.extract_zip_file, repeat)
+
+        transformation_config = dataclasses.replace(configuration.get_data_transformation_config(),
+                                                    root_dir=str(Path(tmp, "transform")), data_path=str(raw_path),
+                                                    zip_path=None,
+                                                    preprocessor_path=str(Path(tmp, "transform", "preprocessor.joblib")))
+        os.makedirs(transformation_config.root_dir)
+        transformation = DataTransformation(transformation_config)
+        measure(results, "transformation.get_data_transformation", transformation.get_data_transformation, repeat)
+        transformation.split_data()
+        measure(results, "transformation.handle_data_imbalance", transformation.handle_data_imbalance, repeat)
+        transformation.save_preprocessor()
+        transformation.train_test_split()
+
+        trainer_config = dataclasses.replace(configuration.get_model_trainer_config(),
+                                             root_dir=str(Path(tmp, "trainer")), tuned_params_path=None,
+                                             train_data_path=transformation.artifact_path("train_resampled"),
+                                             test_data_path=transformation.artifact_path("test"),
+                                             validation_data_path=transformation.artifact_path("validation"))
+        os.makedirs(trainer_config.root_dir)
+        model_path = Path(trainer_config.root_dir, trainer_config.model_name)
+        measure(results, "model_trainer.train", ModelTrainer(trainer_config).train, repeat)
+
+        evaluation_config = dataclasses.replace(configuration.get_model_evaluation_config(),
+                                                test_data_path=trainer_config.test_data_path,
+                                                model_path=str(model_path),
+                                                metric_file_name=str(Path(tmp, "metrics.json")))
+        measure(results, "model_evaluation.evaluate_model", ModelEvaluation(evaluation_config).evaluate_model, repeat)
+
+        # Serving does not depend on the training scale, it is measured once at scale 1
+        if scale == 1:
+            pipeline = PredictionPipeline(model_path=model_path,
+                                          preprocessor_path=transformation_config.preprocessor_path)
+            codes = load_frame(Path(trainer_config.test_data_path))
+            codes = codes.drop(columns=[trainer_config.target_column]).to_numpy(dtype=np.float32)
+            for batch_size in batch_sizes:
+                batch = codes[np.arange(batch_size) % len(codes)]
+                measure(results, f"prediction_pipeline.predict[batch={batch_size}]",
+                        lambda: pipeline.predict(batch), max(repeat, 5 if batch_size <= 1000 else 1))
+
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=Path(__file__).resolve().parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def run(args):
+    results = {}
+    for scale in args.scales:
+        command = [sys.executable, __file__, "--scale", str(scale), "--repeat", str(args.repeat),
+                   "--batch-sizes", *map(str, args.batch_sizes)]
+        print(f"scale {scale}", file=sys.stderr)
+        stdout = subprocess.run(command, stdout=subprocess.PIPE, text=True, check=True).stdout
+        for name, result in json.loads(stdout.strip().splitlines()[-1]).items():
+            results[f"{name}@x{scale}"] = result
+
+    record = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "label": args.label,
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(args.history) or ".", exist_ok=True)
+    with open(args.history, "a") as f:
+        f.write(json.dumps(record) + "\n")
+    print(f"Appended run {len(load_history(args.history)) - 1} ({record['commit']}) to {args.history}")
+
+
+def compare(args):
+    history = load_history(args.history)
+    if len(history) < 2:
+        sys.exit(f"Need at least two runs in {args.history} to compare, found {len(history)}")
+    baseline, current = history[args.baseline], history[args.current]
+
+    print(f"baseline {baseline['timestamp']} ({baseline['commit']}) -> current {current['timestamp']} "
+          f"({current['commit']}), threshold {args.threshold:.0%}")
+    print(f"{'case':<52} {'seconds':>21} {'change':>8} {'peak MB':>17} {'change':>8}")
+    regressions = []
+    for name in sorted(set(baseline["results"]) & set(current["results"])):
+        before, after = baseline["results"][name], current["results"][name]
+        flags = []
+        time_change = after["seconds"] / before["seconds"] - 1 if before["seconds"] else 0.0
+        if time_change > args.threshold and after["seconds"] - before["seconds"] > args.min_seconds:
+            flags.append("time")
+        memory_change = after["peak_mb"] / before["peak_mb"] - 1 if before["peak_mb"] > args.min_mb else 0.0
+        if memory_change > args.threshold and after["peak_mb"] - before["peak_mb"] > args.min_mb:
+            flags.append("memory")
+        if flags:
+            regressions.append(name)
+        print(f"{name:<52} {before['seconds']:>10.4f}{after['seconds']:>11.4f} {time_change:>+8.1%} "
+              f"{before['peak_mb']:>8.1f}{after['peak_mb']:>9.1f} {memory_change:>+8.1%}"
+              f"{'  REGRESSION (' + ', '.join(flags) + ')' if flags else ''}")
+
+    missing = set(baseline["results"]) - set(current["results"])
+    if missing:
+        print(f"Not in the current run: {', '.join(sorted(missing))}")
+    if regressions:
+        sys.exit(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--repeat", type=int, default=1, help=argparse.SUPPRESS)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 10000, 100000],
+                        help=argparse.SUPPRESS)
+    subparsers = parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser("run", help="Run the suite and append the results to the history")
+    run_parser.add_argument("--scales", type=int, nargs="+", default=[1, 10],
+                            help="Dataset sizes as multiples of the source CSV")
+    run_parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 10000, 100000])
+    run_parser.add_argument("--repeat", type=int, default=1, help="Best of this many runs per case")
+    run_parser.add_argument("--label", default=None, help="Free-form tag stored with the run")
+    run_parser.add_argument("--history", default=HISTORY)
+    run_parser.set_defaults(func=run)
+
+    compare_parser = subparsers.add_parser("compare", help="Flag regressions between two runs in the history")
+    compare_parser.add_argument("--baseline", type=int, default=-2, help="History index of the baseline run")
+    compare_parser.add_argument("--current", type=int, default=-1, help="History index of the run to check")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown that fails")
+    compare_parser.add_argument("--min-seconds", type=float, default=0.005,
+                                help="Ignore slowdowns smaller than this in absolute terms")
+    compare_parser.add_argument("--min-mb", type=float, default=5.0,
+                                help="Ignore memory growth smaller than this in absolute terms")
+    compare_parser.add_argument("--history", default=HISTORY)
+    compare_parser.set_defaults(func=compare)
+    args = parser.parse_args()
+
+    if args.scale is not None:
+        print(json.dumps(run_scale(args.scale, args.batch_sizes, args.repeat)))
+    elif args.command is None:
+        parser.error("choose a command: run or compare")
+    else:
+        args.func(args)
+
+
+if __name__ == "__main__":
+    main()
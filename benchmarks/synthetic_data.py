@@ -0,0 +1,106 @@
+# Throughput, peak memory and fidelity of the synthetic RTA generator. Every
+# run is a fresh subprocess and reports its own VmHWM (ru_maxrss would carry
+# over the parent's peak through exec on Linux). Fidelity is the largest
+# total variation distance between source and synthetic frequencies, over the
+# single columns and over every (feature, target) pair, so a generator that
+# loses the feature-target dependency shows up in the second number.
+#
+#   python benchmarks/synthetic_data.py --rows 1000000 5000000 --formats parquet csv
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import dataclasses
+import warnings
+import pandas as pd
+from pathlib import Path
+warnings.filterwarnings("ignore")
+
+
+def frequencies(series):
+    return series.astype(str).value_counts(normalize=True)
+
+
+def total_variation(p, q):
+    return float(p.sub(q, fill_value=0).abs().sum() / 2)
+
+
+def peak_mb():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmHWM")) / 1024
+
+
+def run(n_rows, output_path, dependencies):
+    from accident_severity.config.configuration import ConfigurationManager
+    from accident_severity.components.synthetic_data import SyntheticDataGenerator
+
+    config = dataclasses.replace(ConfigurationManager().get_synthetic_data_config(), dependencies=dependencies)
+    generator = SyntheticDataGenerator(config).fit()
+    start = time.perf_counter()
+    generator.generate(n_rows=n_rows, output_path=output_path)
+    return {
+        "seconds": time.perf_counter() - start,
+        "peak_mb": peak_mb(),
+    }
+
+
+def fidelity(source, synthetic, features, target):
+    marginal = max(total_variation(frequencies(source[col]), frequencies(synthetic[col])) for col in source)
+    pairs = max(total_variation(frequencies(source[col].astype(str) + "|" + source[target].astype(str)),
+                                frequencies(synthetic[col].astype(str) + "|" + synthetic[target].astype(str)))
+                for col in features)
+    return marginal, pairs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 5_000_000])
+    parser.add_argument("--formats", nargs="+", choices=["parquet", "csv"], default=["parquet", "csv"])
+    parser.add_argument("--dependencies", nargs="+", choices=["tree", "independent"], default=["tree", "independent"])
+    parser.add_argument("--run", nargs=3, metavar=("ROWS", "OUTPUT", "DEPENDENCIES"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run(int(args.run[0]), args.run[1], args.run[2])))
+        return
+
+    from accident_severity.config.configuration import ConfigurationManager
+
+    config = ConfigurationManager().get_synthetic_data_config()
+    source = pd.read_csv(config.source_path, dtype=str, keep_default_na=False)
+    target = {name: raw for raw, name in config.column_mapping.items()}[config.target_column]
+    features = [col for col in source.columns if col != target]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'rows':>9} {'format':<8} {'dependencies':<12} {'seconds':>8} {'rows/s':>11} {'peak MB':>8} "
+              f"{'max TV col':>10} {'max TV pair':>11}")
+        for n_rows in args.rows:
+            for output_format in args.formats:
+                for dependencies in args.dependencies:
+                    output_path = Path(tmp, f"synthetic.{output_format}")
+                    stdout = subprocess.run([sys.executable, __file__, "--run", str(n_rows), str(output_path),
+                                             dependencies], capture_output=True, text=True, check=True).stdout
+                    result = json.loads(stdout.strip().splitlines()[-1])
+
+                    sample = pd.read_parquet(output_path) if output_format == "parquet" else \
+                        pd.read_csv(output_path, dtype=str, keep_default_na=False, nrows=1_000_000)
+                    sample = sample.head(1_000_000).astype(object).fillna("").astype(str)
+                    marginal, pairs = fidelity(source, sample, features, target)
+                    print(f"{n_rows:>9} {output_format:<8} {dependencies:<12} {result['seconds']:>8.2f} "
+                          f"{n_rows / result['seconds']:>11,.0f} {result['peak_mb']:>8.1f} {marginal:>10.4f} "
+                          f"{pairs:>11.4f}")
+
+        # Same seed and chunksize must give the same bytes
+        digests = []
+        for _ in range(2):
+            output_path = Path(tmp, "repeat.parquet")
+            subprocess.run([sys.executable, __file__, "--run", "100000", str(output_path), "tree"],
+                           capture_output=True, check=True)
+            digests.append(pd.read_parquet(output_path).astype(str).sum(axis=1).str.len().sum())
+        print(f"\nreproducible with a fixed seed: {digests[0] == digests[1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Training time of XGBoost configurations on the encoded train set, through
+# ModelTrainer.fit so the binned DMatrix/QuantileDMatrix is built once per
+# (tree method, max_bin, enable_categorical) and reused by later fits.
+#
+#   python benchmarks/training.py --scale 1 10
+import argparse
+import warnings
+import dataclasses
+import pandas as pd
+from xgboost.core import XGBoostError
+from sklearn.metrics import f1_score
+from accident_severity.config.configuration import ConfigurationManager
+from accident_severity.components.model_trainer import ModelTrainer
+from accident_severity.utils.common import load_frame
+warnings.filterwarnings("ignore")
+
+CONFIGURATIONS = [
+    {"tree_method": "exact", "enable_categorical": False},
+    {"tree_method": "approx", "enable_categorical": False},
+    {"tree_method": "hist", "max_bin": 256, "enable_categorical": False},
+    {"tree_method": "hist", "max_bin": 64, "enable_categorical": False},
+    {"tree_method": "hist", "max_bin": 256, "enable_categorical": False, "n_jobs": 1},
+    {"tree_method": "hist", "max_bin": 256, "enable_categorical": True},
+    {"tree_method": "approx", "enable_categorical": True},
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, nargs="+", default=[1],
+                        help="Replicate the train set this many times to time larger inputs")
+    parser.add_argument("--early-stopping-rounds", type=int, default=None)
+    args = parser.parse_args()
+
+    configuration = ConfigurationManager()
+    config = configuration.get_model_trainer_config()
+    config = dataclasses.replace(config, early_stopping_rounds=args.early_stopping_rounds)
+    test = load_frame(config.test_data_path)
+    X_test, y_test = test.drop(columns=[config.target_column]), test[config.target_column]
+
+    print(f"{'rows':>9} {'configuration':<70} {'bin s':>7} {'train s':>8} {'rounds':>7} {'weighted F1':>12}")
+    for scale in args.scale:
+        trainer = ModelTrainer(config)
+        X_train, y_train, X_valid, y_valid = trainer.load_data()
+        trainer.data = (pd.concat([X_train] * scale, ignore_index=True),
+                        pd.concat([y_train] * scale, ignore_index=True), X_valid, y_valid)
+
+        for overrides in CONFIGURATIONS:
+            try:
+                model, report = trainer.fit(**overrides)
+            except (ValueError, XGBoostError) as e:
+                print(f"{len(trainer.data[0]):>9} {str(overrides):<70} skipped: {str(e).splitlines()[0]}")
+                continue
+            f1 = f1_score(y_test, model.predict(X_test), average="weighted")
+            print(f"{report['train_rows']:>9} {str(overrides):<70} {report['dmatrix_seconds']:>7.3f} "
+                  f"{report['train_seconds']:>8.3f} {report['boosted_rounds']:>7} {f1:>12.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import argparse
+import dataclasses
+from accident_severity.logging import logger, configure as configure_logging
+from accident_severity.pipeline.stages import STAGE_NAMES
+from accident_severity.utils.instrumentation import configure as configure_instrumentation
+
+
+def run(args):
+    from accident_severity.pipeline.stages import run_stages
+
+    run_stages(args.stage, force=args.force)
+
+
+def generate(args):
+    from accident_severity.config.configuration import ConfigurationManager
+    from accident_severity.components.synthetic_data import SyntheticDataGenerator
+
+    config = ConfigurationManager()
+    configure_logging(config.get_logging_config())
+    configure_instrumentation(config.get_instrumentation_config())
+    synthetic_data_config = config.get_synthetic_data_config()
+    overrides = {key: value for key, value in vars(args).items()
+                 if key in ("seed", "dependencies", "columns") and value is not None}
+    generator = SyntheticDataGenerator(config=dataclasses.replace(synthetic_data_config, **overrides))
+    generator.generate(n_rows=args.rows, output_path=args.output, chunksize=args.chunksize)
+
+
+def score(args):
+    from accident_severity.config.configuration import ConfigurationManager
+    from accident_severity.components.batch_scoring import BatchScoring
+
+    config = ConfigurationManager()
+    configure_logging(config.get_logging_config())
+    configure_instrumentation(config.get_instrumentation_config())
+    batch_scoring_config = config.get_batch_scoring_config()
+    if args.compiled_dir is not None:
+        batch_scoring_config = dataclasses.replace(batch_scoring_config, compiled_dir=args.compiled_dir)
+    batch_scoring = BatchScoring(config=batch_scoring_config)
+    batch_scoring.score(args.input, args.output, chunksize=args.chunksize, n_workers=args.workers)
+
+
+def serve(args):
+    from accident_severity.config.configuration import ConfigurationManager
+    from accident_severity.pipeline import serving
+
+    config = ConfigurationManager()
+    configure_logging(config.get_logging_config())
+    serving_config = config.get_serving_config()
+    overrides = {key: value for key, value in vars(args).items()
+                 if key in ("host", "port", "max_batch_size", "max_wait_ms", "compiled_dir") and value is not None}
+    serving.serve(dataclasses.replace(serving_config, **overrides))
+
+
+def update(args):
+    from accident_severity.config.configuration import ConfigurationManager
+    from accident_severity.components.model_trainer import ModelTrainer
+
+    config = ConfigurationManager()
+    configure_logging(config.get_logging_config())
+    configure_instrumentation(config.get_instrumentation_config())
+    incremental_training_config = config.get_incremental_training_config()
+    overrides = {key: value for key, value in vars(args).items()
+                 if key in ("n_rounds", "learning_rate") and value is not None}
+    model_trainer = ModelTrainer(config=config.get_model_trainer_config(),
+                                 incremental_config=dataclasses.replace(incremental_training_config, **overrides))
+    reports = [model_trainer.train_incremental(batch_path) for batch_path in args.batch]
+    if not any(report and report["accepted"] for report in reports):
+        return
+
+    # The Model Trainer Stage keeps the updated model as its output instead of
+    # restoring the cached one, and the stages reading the model pick it up
+    from accident_severity.pipeline.stages import MODEL_STAGES, refresh_stage_outputs, run_stages
+
+    refresh_stage_outputs("train")
+    if not args.no_stages:
+        run_stages(MODEL_STAGES)
+
+
+def registry(args):
+    from accident_severity.config.configuration import ConfigurationManager
+    from accident_severity.components.model_registry import ModelRegistry
+
+    config = ConfigurationManager()
+    configure_logging(config.get_logging_config())
+    model_registry = ModelRegistry(config.get_model_registry_config().root_dir)
+    if args.action == "promote":
+        model_registry.promote(args.version)
+        return
+
+    current = model_registry.current()
+    for version in model_registry.versions():
+        manifest = model_registry.manifest(version)
+        metrics = ", ".join(f"{name} {value:.4f}" for name, value in manifest["metrics"].items())
+        print(f"{'*' if version == current else ' '} {version}  {manifest['created']}  {metrics}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="accident_severity")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the training pipeline stages")
+    run_parser.add_argument("--stage", action="append", choices=STAGE_NAMES, default=None,
+                            help="Only run this stage, may be repeated (default: every stage in order)")
+    run_parser.add_argument("--force", action="store_true",
+                            help="Run the stages even if their inputs have not changed")
+    run_parser.set_defaults(func=run)
+
+    generate_parser = subparsers.add_parser("generate", help="Write synthetic rows in the raw RTA format")
+    generate_parser.add_argument("--rows", type=int, default=None,
+                                 help="Rows to generate (default: synthetic_data.n_rows in config.yaml)")
+    generate_parser.add_argument("-o", "--output", default=None,
+                                 help="Output .csv or .parquet file (default: synthetic_data.output_path)")
+    generate_parser.add_argument("--chunksize", type=int, default=None)
+    generate_parser.add_argument("--seed", type=int, default=None)
+    generate_parser.add_argument("--dependencies", choices=["tree", "independent"], default=None)
+    generate_parser.add_argument("--columns", choices=["all", "selected"], default=None)
+    generate_parser.set_defaults(func=generate)
+
+    score_parser = subparsers.add_parser("score", help="Score a raw RTA-format CSV or Parquet file in chunks")
+    score_parser.add_argument("input", help="Path to the raw .csv or .parquet file")
+    score_parser.add_argument("-o", "--output", default=None,
+                              help="Output .parquet or .csv file (default: artifacts/batch_scoring/predictions.parquet)")
+    score_parser.add_argument("--chunksize", type=int, default=None,
+                              help="Rows per chunk (default: batch_scoring.chunksize in config.yaml)")
+    score_parser.add_argument("--workers", type=int, default=None,
+                              help="Forked scoring processes per chunk (default: batch_scoring.n_workers in config.yaml)")
+    score_parser.add_argument("--compiled-dir", default=None,
+                              help="Score with the NumPy trees from the Model Export Stage (default: batch_scoring.compiled_dir)")
+    score_parser.set_defaults(func=score)
+
+    serve_parser = subparsers.add_parser("serve", help="Run the micro-batching HTTP prediction service")
+    serve_parser.add_argument("--host", default=None)
+    serve_parser.add_argument("--port", type=int, default=None)
+    serve_parser.add_argument("--max-batch-size", type=int, default=None,
+                              help="Rows that flush a micro-batch (default: serving.max_batch_size)")
+    serve_parser.add_argument("--max-wait-ms", type=float, default=None,
+                              help="Longest a request waits for its batch to fill (default: serving.max_wait_ms)")
+    serve_parser.add_argument("--compiled-dir", default=None,
+                              help="Serve the NumPy trees from the Model Export Stage (default: serving.compiled_dir)")
+    serve_parser.set_defaults(func=serve)
+
+    update_parser = subparsers.add_parser("update", help="Add boosting rounds to the trained model from new raw RTA-format "
+                                                         "batches, without retraining on the history")
+    update_parser.add_argument("batch", nargs="+", help="Raw .csv or .parquet batches, applied in order")
+    update_parser.add_argument("--rounds", dest="n_rounds", type=int, default=None,
+                               help="Rounds added per batch (default: incremental.n_rounds in params.yaml)")
+    update_parser.add_argument("--learning-rate", type=float, default=None,
+                               help="Learning rate of the added rounds (default: incremental.learning_rate)")
+    update_parser.add_argument("--no-stages", action="store_true",
+                               help="Do not rerun the evaluate, prediction_table, export and register stages "
+                                    "after an accepted update")
+    update_parser.set_defaults(func=update)
+
+    registry_parser = subparsers.add_parser("registry", help="List the registered model versions or promote one")
+    registry_parser.add_argument("action", choices=["list", "promote"])
+    registry_parser.add_argument("version", nargs="?", default=None,
+                                 help="Version to promote, serving processes swap to it on their next poll")
+    registry_parser.set_defaults(func=registry)
+
+    args = parser.parse_args(argv)
+    if getattr(args, "action", None) == "promote" and args.version is None:
+        parser.error("registry promote needs a version")
+    try:
+        args.func(args)
+    except Exception as e:
+        logger.exception(e)
+        raise e
+
+
+if __name__ == "__main__":
+    main()
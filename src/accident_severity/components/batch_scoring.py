@@ -0,0 +1,92 @@
+
+import os
+import time
+import pandas as pd
+from pathlib import Path
+from accident_severity.logging import logger
+from accident_severity.utils.common import select_columns, source_columns
+from accident_severity.pipeline.predictions import PredictionPipeline
+from accident_severity.components.parallel_scoring import ParallelScoring
+from accident_severity.entity.config_entity import BatchScoringConfig
+from accident_severity.utils.instrumentation import instrument, record_rows, record_artifact
+
+
+class BatchScoring:
+    def __init__(self, config: BatchScoringConfig):
+        self.config = config
+        self.pipeline = PredictionPipeline(model_path=config.model_path,
+                                           preprocessor_path=config.preprocessor_path,
+                                           unknown_value=config.unknown_value,
+                                           compiled_dir=config.compiled_dir)
+        self.class_names = {code: name for name, code in config.target_mapping.items()}
+        self.parallel = ParallelScoring(self.pipeline, n_workers=config.n_workers)
+
+    def read_chunks(self, input_path, chunksize):
+        # Only the raw columns behind the selected features are parsed
+        usecols = source_columns(self.config.column_mapping, self.config.feature_columns)
+
+        if Path(input_path).suffix == ".parquet":
+            import pyarrow.parquet as pq
+
+            parquet_file = pq.ParquetFile(input_path)
+            for batch in parquet_file.iter_batches(batch_size=chunksize, columns=usecols):
+                yield batch.to_pandas()
+        else:
+            yield from pd.read_csv(input_path, usecols=usecols, dtype=str, chunksize=chunksize)
+
+    def score_chunk(self, chunk, offset):
+        X = select_columns(chunk, self.config.column_mapping, self.config.feature_columns)
+        proba = self.parallel.predict_proba(X)
+        labels = proba.argmax(axis=1)
+
+        result = pd.DataFrame({"row_id": range(offset, offset + len(chunk)),
+                               "prediction": labels})
+        result["predicted_severity"] = result["prediction"].map(self.class_names)
+        for code, name in self.class_names.items():
+            result[f"proba_{name.lower().replace(' ', '_')}"] = proba[:, code]
+
+        return result
+
+    @instrument("batch_scoring.score")
+    def score(self, input_path, output_path=None, chunksize=None, n_workers=None):
+        chunksize = chunksize or self.config.chunksize
+        if n_workers is not None:
+            self.parallel.n_workers = n_workers
+        output_path = Path(output_path or os.path.join(self.config.root_dir, "predictions.parquet"))
+        os.makedirs(output_path.parent, exist_ok=True)
+
+        writer = None
+        n_rows = 0
+        start = time.perf_counter()
+
+        # One worker pool for the whole file, not one per chunk
+        self.parallel.open()
+        try:
+            for chunk in self.read_chunks(input_path, chunksize):
+                result = self.score_chunk(chunk, n_rows)
+
+                # Results are appended chunk by chunk so memory stays bounded by the chunk size
+                if output_path.suffix == ".parquet":
+                    import pyarrow as pa
+                    import pyarrow.parquet as pq
+
+                    table = pa.Table.from_pandas(result, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(output_path, table.schema)
+                    writer.write_table(table)
+                else:
+                    result.to_csv(output_path, mode="w" if n_rows == 0 else "a",
+                                  header=n_rows == 0, index=False)
+
+                n_rows += len(chunk)
+                elapsed = time.perf_counter() - start
+                logger.info(f"Scored {n_rows} rows ({n_rows / elapsed:,.0f} rows/s)")
+        finally:
+            self.parallel.close()
+            if writer is not None:
+                writer.close()
+
+        record_rows(rows_in=n_rows)
+        record_artifact(output_path)
+        logger.info(f"Predictions for {n_rows} rows written to {output_path}")
+        return n_rows
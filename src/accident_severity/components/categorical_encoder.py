@@ -0,0 +1,101 @@
+
+import json
+import numpy as np
+import pandas as pd
+
+
+class CategoricalLookupEncoder:
+    # unknown_value: "error" (same as the fitted OrdinalEncoder), "most_frequent"
+    # (map to the code of the imputer fill value) or an integer sentinel such as -1
+    def __init__(self, feature_columns, categories, fill_values, unknown_value="error"):
+        self.feature_columns = list(feature_columns)
+        self.categories = [np.asarray(cats, dtype=str) for cats in categories]
+        self.fill_values = [str(value) for value in fill_values]
+        self.unknown_value = unknown_value
+
+        n_levels = max(len(cats) for cats in self.categories)
+        self.dtype = np.int8 if n_levels < np.iinfo(np.int8).max else np.int16
+
+        # One hash table per column, so a whole column is encoded in a single lookup call
+        self._lookups = [pd.Index(cats) for cats in self.categories]
+        self._fill_codes = [self._lookups[j].get_loc(value) for j, value in enumerate(self.fill_values)]
+
+    @classmethod
+    def from_preprocessor(cls, preprocessor, unknown_value="error"):
+        cat_pipeline = preprocessor.named_transformers_["cat_pipeline"]
+        imputer = cat_pipeline.named_steps["imputer"]
+        encoder = cat_pipeline.named_steps["ordinalencoder"]
+
+        feature_columns = {name: columns for name, _, columns in preprocessor.transformers_}["cat_pipeline"]
+
+        return cls(feature_columns=feature_columns,
+                   categories=encoder.categories_,
+                   fill_values=imputer.statistics_,
+                   unknown_value=unknown_value)
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({
+                "feature_columns": self.feature_columns,
+                "categories": [cats.tolist() for cats in self.categories],
+                "fill_values": self.fill_values,
+            }, f, indent=4)
+
+    @classmethod
+    def load(cls, path, unknown_value="error"):
+        # Rebuilds the encoder without unpickling the sklearn preprocessor
+        with open(path) as f:
+            return cls(unknown_value=unknown_value, **json.load(f))
+
+    def _as_array(self, X):
+        if isinstance(X, pd.DataFrame):
+            X = X[self.feature_columns].to_numpy(dtype=object)
+        X = np.asarray(X, dtype=object)
+        if X.ndim != 2 or X.shape[1] != len(self.feature_columns):
+            raise ValueError(f"Expected a 2-D array with {len(self.feature_columns)} columns, got shape {X.shape}")
+        return X
+
+    def transform(self, X):
+        X = self._as_array(X)
+        codes = np.empty(X.shape, dtype=self.dtype)
+
+        for j, column in enumerate(self.feature_columns):
+            column_codes = self._lookups[j].get_indexer(X[:, j])
+            unmatched = column_codes < 0
+
+            if unmatched.any():
+                # Missing values get the imputer's most frequent category, as in the sklearn pipeline
+                missing = pd.isna(X[:, j])
+                column_codes[missing] = self._fill_codes[j]
+                unknown = unmatched & ~missing
+
+                if unknown.any():
+                    if self.unknown_value == "error":
+                        values = pd.unique(X[unknown, j])[:5].tolist()
+                        raise ValueError(f"Found unknown categories {values} in column {column}")
+                    elif self.unknown_value == "most_frequent":
+                        column_codes[unknown] = self._fill_codes[j]
+                    else:
+                        column_codes[unknown] = self.unknown_value
+
+            codes[:, j] = column_codes
+
+        return codes
+
+    def probe_frame(self):
+        # Every category of every column at least once, and a row of missing values
+        n_rows = max(len(cats) for cats in self.categories)
+        X = pd.DataFrame({column: np.resize(cats, n_rows).astype(object)
+                          for column, cats in zip(self.feature_columns, self.categories)})
+        X.loc[n_rows] = np.nan
+        return X
+
+    def verify(self, preprocessor, X=None):
+        if X is None:
+            X = self.probe_frame()
+        expected = preprocessor.transform(X)
+        actual = self.transform(X)
+        if not np.array_equal(np.asarray(expected), actual.astype(np.float64)):
+            mismatched = int((np.asarray(expected) != actual).any(axis=1).sum())
+            raise ValueError(f"Lookup encoder disagrees with the preprocessor on {mismatched} rows")
+        return True
@@ -0,0 +1,140 @@
+import os
+import time
+import resource
+import functools
+import dataclasses
+import multiprocessing as mp
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import StratifiedKFold
+from accident_severity.logging import logger
+from accident_severity.utils.instrumentation import instrument, worker_call, merge_worker_results
+from accident_severity.entity.config_entity import CrossValidationConfig, ModelTrainerConfig
+from accident_severity.components.model_trainer import ModelTrainer
+from accident_severity.components.model_evaluation import ModelEvaluation
+from accident_severity.components.resampling import resample
+from accident_severity.utils.common import load_frame, save_json
+
+
+# Filled in by the parent right before the pool is forked. Only paths and fold
+# indices are shared, every worker maps the arrays itself and copies just its fold
+_SHARED = {}
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def _run_fold(fold):
+    cv = _SHARED["cross_validation"]
+    train_index, test_index = _SHARED["folds"][fold]
+    X = np.load(cv.features_path, mmap_mode="r")
+    y = np.load(cv.target_path, mmap_mode="r")
+
+    start = time.perf_counter()
+    # Fancy indexing on the mapped arrays only reads this fold's rows into memory
+    X_train = pd.DataFrame(X[train_index], columns=cv.feature_names)
+    y_train = pd.Series(y[train_index], name=cv.config.target_column)
+
+    # Resampling sees the training rows of this fold only, never its held-out rows
+    X_train, y_train = resample(cv.config.resampling_strategy, X_train, y_train,
+                                list(range(X_train.shape[1])), random_state=cv.config.random_state,
+                                k_neighbors=cv.config.k_neighbors)
+    trainer = ModelTrainer(cv.trainer_config, data=(X_train, pd.Series(np.asarray(y_train)), None, None))
+    model, _ = trainer.fit(n_jobs=_SHARED["n_jobs"], **trainer.tuned_params())
+
+    X_test = pd.DataFrame(X[test_index], columns=cv.feature_names)
+    f1, acc = ModelEvaluation.evaluation_metrics(y[test_index], np.ravel(model.predict(X_test)))
+
+    return {
+        "fold": fold,
+        "train_rows": len(train_index),
+        "resampled_rows": len(X_train),
+        "test_rows": len(test_index),
+        "f1_score": f1,
+        "accuracy_score": acc,
+        "seconds": time.perf_counter() - start,
+        "worker_peak_rss_mb": peak_rss_mb(),
+    }
+
+
+class CrossValidation:
+    def __init__(self, config: CrossValidationConfig, trainer_config: ModelTrainerConfig):
+        self.config = config
+        # Folds train for the configured number of rounds, there is no fold left for early stopping
+        self.trainer_config = dataclasses.replace(trainer_config, early_stopping_rounds=None)
+        self.features_path = Path(config.root_dir, "features.npy")
+        self.target_path = Path(config.root_dir, "target.npy")
+        self.feature_names = None
+
+    def write_arrays(self):
+        # Every encoded row (before resampling) is written once, the folds are index slices of it
+        paths = [Path(path) for path in self.config.data_paths if os.path.exists(path)]
+        n_rows = 0
+        for path in paths:
+            n_rows += len(load_frame(path, columns=[self.config.target_column]))
+
+        frame = load_frame(paths[0])
+        self.feature_names = [col for col in frame.columns if col != self.config.target_column]
+        X = np.lib.format.open_memmap(self.features_path, mode="w+", dtype=np.float32,
+                                      shape=(n_rows, len(self.feature_names)))
+        y = np.lib.format.open_memmap(self.target_path, mode="w+", dtype=np.int64, shape=(n_rows,))
+
+        offset = 0
+        for path in paths:
+            frame = load_frame(path)
+            X[offset:offset + len(frame)] = frame[self.feature_names].to_numpy(dtype=np.float32)
+            y[offset:offset + len(frame)] = frame[self.config.target_column].to_numpy()
+            offset += len(frame)
+        X.flush()
+        y.flush()
+        del X, y
+
+        logger.info(f"Wrote {n_rows} encoded rows to {self.features_path} and {self.target_path}")
+
+    def folds(self):
+        y = np.load(self.target_path, mmap_mode="r")
+        splitter = StratifiedKFold(n_splits=self.config.n_splits, shuffle=True, random_state=self.config.random_state)
+        return list(splitter.split(np.zeros(len(y)), y))
+
+    def run_folds(self, folds):
+        n_workers = max(1, min(self.config.n_workers, len(folds)))
+        _SHARED.update(cross_validation=self, folds=folds, n_jobs=max(1, os.cpu_count() // n_workers))
+
+        try:
+            if n_workers == 1:
+                return [_run_fold(fold) for fold in range(len(folds))]
+
+            with ProcessPoolExecutor(n_workers, mp_context=mp.get_context("fork")) as pool:
+                return merge_worker_results(pool.map(functools.partial(worker_call, _run_fold), range(len(folds))))
+        finally:
+            _SHARED.clear()
+
+    @instrument("cross_validation.cross_validate")
+    def cross_validate(self):
+        start = time.perf_counter()
+        self.write_arrays()
+        results = self.run_folds(self.folds())
+        wall_seconds = time.perf_counter() - start
+
+        f1 = np.array([result["f1_score"] for result in results])
+        acc = np.array([result["accuracy_score"] for result in results])
+        scores = {
+            "n_splits": self.config.n_splits,
+            "n_workers": self.config.n_workers,
+            "f1_score_mean": f1.mean(),
+            "f1_score_std": f1.std(),
+            "accuracy_score_mean": acc.mean(),
+            "accuracy_score_std": acc.std(),
+            "wall_seconds": wall_seconds,
+            "parent_peak_rss_mb": peak_rss_mb(),
+            "worker_peak_rss_mb": max(result["worker_peak_rss_mb"] for result in results),
+            "folds": results,
+        }
+        save_json(Path(self.config.metric_file_name), scores)
+
+        logger.info(f"{self.config.n_splits}-fold CV: f1 {f1.mean():.4f} +/- {f1.std():.4f}, "
+                    f"accuracy {acc.mean():.4f} +/- {acc.std():.4f} in {wall_seconds:.1f}s")
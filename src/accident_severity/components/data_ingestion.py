@@ -1,30 +1,106 @@
-
 import os, sys 
-import urllib.request as request 
+import time
 import zipfile
+import urllib.request as request 
+from urllib.error import HTTPError
+from http.client import HTTPException, IncompleteRead
 from pathlib import Path
 from accident_severity.logging import logger
-from accident_severity.utils.common import get_size
+from accident_severity.utils.common import get_size, hash_file
+from accident_severity.utils.instrumentation import instrument, record_artifact
 from accident_severity.entity.config_entity import DataIngestionConfig
 
 class DataIngestion:
     def __init__(self, config: DataIngestionConfig):
         self.config = config 
+        self.partial_file = Path(f"{self.config.local_data_file}.part")
+
+    def is_valid(self, path):
+        if self.config.sha256:
+            return hash_file(path) == self.config.sha256.lower()
+
+        # Without a pinned digest, a truncated or corrupt archive still fails its CRCs
+        try:
+            with zipfile.ZipFile(path) as zip_ref:
+                return zip_ref.testzip() is None
+        except zipfile.BadZipFile:
+            return False
+
+    def fetch(self):
+        # Continue from whatever an interrupted attempt left in the .part file
+        offset = self.partial_file.stat().st_size if self.partial_file.exists() else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+        try:
+            response = request.urlopen(request.Request(self.config.source_url, headers=headers),
+                                       timeout=self.config.timeout)
+        except HTTPError as e:
+            if e.code == 416 and offset:
+                # The range starts at the end of the file, the previous attempt got all of it
+                return
+            raise
 
+        with response:
+            if offset and response.status != 206:
+                logger.info("Server ignored the Range request, restarting the download")
+                offset = 0
+            length = response.headers.get("Content-Length")
+            total = offset + int(length) if length is not None else None
+
+            received, next_report = offset, 0.1
+            with open(self.partial_file, "ab" if offset else "wb") as f:
+                while chunk := response.read(self.config.chunk_size):
+                    f.write(chunk)
+                    received += len(chunk)
+                    if total and received / total >= next_report:
+                        logger.info(f"Downloaded {received}/{total} bytes ({received / total:.0%})")
+                        next_report += 0.1
+
+            # A dropped connection just ends the body early, it does not raise
+            if total is not None and received < total:
+                raise IncompleteRead(b"", total - received)
+
+    @instrument("data_ingestion.download_file")
     def download_file(self):
-        if not os.path.exists(self.config.local_data_file):
-            filename, headers = request.urlretrieve(
-                url = self.config.source_url,
-                filename = self.config.local_data_file
-            )
+        if os.path.exists(self.config.local_data_file):
+            if self.is_valid(self.config.local_data_file):
+                record_artifact(self.config.local_data_file)
+                logger.info(f"file already exists of size: {get_size(Path(self.config.local_data_file))}")
+                return
+            logger.warning(f"{self.config.local_data_file} failed verification, downloading it again")
+            os.remove(self.config.local_data_file)
 
-            logger.info(f"{filename} downloaded succesfully with following headers: \n{headers}")
-        else:
-            logger.info(f"file already exists of size: {get_size(Path(self.config.local_data_file))}")
+        start = time.perf_counter()
+        for attempt in range(1, self.config.max_retries + 1):
+            try:
+                self.fetch()
+                break
+            except (OSError, HTTPException) as e:
+                # HTTPError is an OSError too, but a client error (bar 416, see fetch) will not go away on retry
+                client_error = isinstance(e, HTTPError) and 400 <= e.code < 500 and e.code != 416
+                if client_error or attempt == self.config.max_retries:
+                    raise
+                logger.warning(f"Download attempt {attempt} failed ({e!r}), resuming")
+                time.sleep(min(2 ** attempt, 30))
+
+        if not self.is_valid(self.partial_file):
+            self.partial_file.unlink()
+            raise ValueError(f"{self.config.source_url} failed verification"
+                             + (f", expected sha256 {self.config.sha256}" if self.config.sha256 else ""))
+
+        os.replace(self.partial_file, self.config.local_data_file)
+        record_artifact(self.config.local_data_file)
+        logger.info(f"{self.config.local_data_file} downloaded and verified in {time.perf_counter() - start:.1f}s, "
+                    f"size: {get_size(Path(self.config.local_data_file))}")
 
     
+    @instrument("data_ingestion.extract_zip_file")
     def extract_zip_file(self):
+        if not self.config.extract_zip:
+            logger.info(f"extract_zip is off, {self.config.local_data_file} is read without extracting it")
+            return
+
         unzip_path = self.config.unzip_dir
         os.makedirs(unzip_path, exist_ok=True)
         with zipfile.ZipFile(self.config.local_data_file, "r") as zip_ref:
-            zip_ref.extractall(unzip_path)
\ No newline at end of file
+            zip_ref.extractall(unzip_path)
@@ -1,5 +1,7 @@
 
 import os
+import zipfile
+import numpy as np
 import pandas as pd
 from sklearn.pipeline import Pipeline
 from sklearn.impute import SimpleImputer
@@ -7,90 +9,62 @@ from sklearn.preprocessing import OrdinalEncoder, RobustScaler
 from sklearn.compose import ColumnTransformer
 from sklearn.model_selection import train_test_split
 from accident_severity.logging import logger
-from imblearn.over_sampling import SMOTE
 import joblib
+from pathlib import Path
+from accident_severity.utils.common import (ARTIFACT_FORMATS, compact_codes, save_frame, select_columns,
+                                           source_columns)
+from accident_severity.components.resampling import resample
+from accident_severity.utils.instrumentation import instrument, record_rows, record_artifact
 import warnings
 warnings.filterwarnings("ignore")
 
+
 class DataTransformation:
     def __init__(self, config):
         self.config = config
         self.preprocessor = None
         self.transformed_df = None
+        self.train_index = None
+        self.test_index = None
+        self.validation_index = None
+        self.split_slices = None
+
+    def artifact_path(self, name):
+        return Path(self.config.root_dir, name + ARTIFACT_FORMATS[self.config.artifact_format])
+
+    def save_artifact(self, df, name):
+        # Codes and target are stored as small integers in the configured format
+        save_frame(compact_codes(df, df.columns.to_list()), self.artifact_path(name))
+
+    def read_raw(self, usecols):
+        if self.config.zip_path is None:
+            return pd.read_csv(self.config.data_path, usecols=usecols, dtype="category")
 
+        # Decompress the CSV member on the fly, nothing is extracted to disk
+        with zipfile.ZipFile(self.config.zip_path) as zip_file, zip_file.open(self.config.zip_member) as f:
+            return pd.read_csv(f, usecols=usecols, dtype="category")
+
+    @instrument("data_transformation.get_data_transformation")
     def get_data_transformation(self):
         try:
-            # Load the dataset
-            df = pd.read_csv(self.config.data_path)
-
-            # Renaming the columns
-            col_map={
-                'Time': 'time',
-                'Day_of_week': 'day_of_week',
-                'Age_band_of_driver': 'driver_age',
-                'Sex_of_driver': 'driver_sex',
-                'Educational_level': 'educational_level',
-                'Vehicle_driver_relation': 'vehicle_driver_relation',
-                'Driving_experience': 'driving_experience',
-                'Type_of_vehicle': 'vehicle_type',
-                'Owner_of_vehicle': 'vehicle_owner',
-                'Service_year_of_vehicle': 'service_year',
-                'Defect_of_vehicle': 'vehicle_defect',
-                'Area_accident_occured': 'accident_area',
-                'Lanes_or_Medians': 'lanes',
-                'Road_allignment': 'road_allignment',
-                'Types_of_Junction': 'junction_type',
-                'Road_surface_type': 'surface_type',
-                'Road_surface_conditions': 'road_surface_conditions',
-                'Light_conditions': 'light_condition',
-                'Weather_conditions': 'weather_condition',
-                'Type_of_collision': 'collision_type',
-                'Number_of_vehicles_involved': 'vehicles_involved',
-                'Number_of_casualties': 'casualties',
-                'Vehicle_movement': 'vehicle_movement',
-                'Casualty_class': 'casualty_class',
-                'Sex_of_casualty': 'casualty_sex' ,
-                'Age_band_of_casualty': 'casualty_age',
-                'Casualty_severity': 'casualty_severity',
-                'Work_of_casuality': 'casualty_work',
-                'Fitness_of_casuality': 'casualty_fitness',
-                'Pedestrian_movement': 'pedestrian_movement',
-                'Cause_of_accident': 'accident_cause',
-                'Accident_severity': 'accident_severity'
-            }
-
-            df.rename(columns=col_map, inplace=True)
-
-            # Drop some columns
-            df.drop(columns=["time"], axis=1, inplace=True)
-
-            # Feature Selection 
-            selected_columns = ['driver_age',
-                               'vehicle_owner',
-                                'vehicle_defect',
-                               'accident_area',
-                                'lanes',
-                                'surface_type',
-                                'light_condition',
-                                'casualty_sex',
-                                'casualty_work',
-                                'pedestrian_movement',
-                                'accident_severity']
-
-
-            # Drop columns that are not in selected_columns
-            df = df[selected_columns]
+            feature_columns = list(self.config.feature_columns)
+            target_column = self.config.target_column
 
-            # Define the target_variable
-            X = df.drop(columns=["accident_severity"], axis=1)
-            y = df["accident_severity"]
+            # Load only the raw columns behind the selected features and target, as categoricals
+            usecols = source_columns(self.config.column_mapping, feature_columns + [target_column])
+            df = self.read_raw(usecols)
+            record_rows(rows_in=len(df))
 
-            # Map the target variable manually
-            y.replace({'Slight Injury': 0, 'Serious Injury': 1, 'Fatal injury': 2}, inplace=True)
+            # Rename the columns and keep the selected features and target
+            df = select_columns(df, self.config.column_mapping, feature_columns + [target_column])
 
-            # Define numerical and categorical features
-            numerical_features = X.select_dtypes(exclude="object").columns
-            categorical_features = X.select_dtypes(include="object").columns
+            # Define the target_variable
+            X = df.drop(columns=[target_column], axis=1)
+            y = df[target_column].map(self.config.target_mapping).astype("int64")
+
+            # All selected features are categorical
+            numerical_features = []
+            categorical_features = feature_columns
 
             # Define the pipeline
             num_pipeline = Pipeline(
@@ -124,38 +98,84 @@ class DataTransformation:
             X_transformed = preprocessor.fit_transform(X)
 
             # Get the updated column names after ordinal encoding
-            column_names = numerical_features.to_list() + categorical_features.to_list()
+            column_names = numerical_features + categorical_features
 
             # Combine X_transformed and y back into one Dataframe
             self.transformed_df = pd.DataFrame(X_transformed, columns=column_names)
-            self.transformed_df["accident_severity"] = y
+            self.transformed_df[target_column] = y.to_numpy()
 
             logger.info("Data preprocessing completed")
 
         except Exception as e:
             raise e
 
+    def split_data(self):
+        if self.transformed_df is None:
+            raise ValueError("Data transformation is not available. Please call get_data_transformation.")
+
+        # One seeded split, kept as row positions that every later step slices from
+        self.train_index, self.test_index = train_test_split(np.arange(len(self.transformed_df)),
+                                                             test_size=self.config.test_size,
+                                                             random_state=self.config.random_state)
+
+        # The early stopping fold is carved out before resampling so it never shares
+        # oversampled duplicates with the training rows
+        self.validation_index = np.array([], dtype=self.train_index.dtype)
+        if self.config.validation_size:
+            target = self.transformed_df[self.config.target_column].to_numpy()[self.train_index]
+            self.train_index, self.validation_index = train_test_split(self.train_index,
+                                                                       test_size=self.config.validation_size,
+                                                                       stratify=target,
+                                                                       random_state=self.config.random_state)
+
+        np.savez(os.path.join(self.config.root_dir, "split_indices.npz"),
+                 train=self.train_index, test=self.test_index, validation=self.validation_index)
+
+        # The frame is reordered once into contiguous train, validation and test blocks,
+        # so every split after that is a positional slice of it instead of a copy
+        self.transformed_df = self.transformed_df.take(np.concatenate([self.train_index, self.validation_index,
+                                                                       self.test_index]))
+        n_train, n_validation = len(self.train_index), len(self.validation_index)
+        self.split_slices = {"train": slice(0, n_train),
+                             "validation": slice(n_train, n_train + n_validation),
+                             "test": slice(n_train + n_validation, len(self.transformed_df))}
+
+        logger.info(f"Split the data into {len(self.train_index)} train, {len(self.validation_index)} validation "
+                    f"and {len(self.test_index)} test rows")
+
+    def get_split(self, name):
+        # A view of the reordered frame, callers copy before changing it
+        return self.transformed_df.iloc[self.split_slices[name]]
+
+    @instrument("data_transformation.handle_data_imbalance")
     def handle_data_imbalance(self):
         if self.transformed_df is None:
             raise ValueError("Data transformation is not available. Please call get_data_transformation.")
 
-        # Split the data into train and test sets
-        train, test = train_test_split(self.transformed_df)
+        if self.train_index is None:
+            self.split_data()
+        train = self.get_split("train")
 
         # Separate features and target in the train set
-        X_train = train.drop(columns=["accident_severity"])
-        y_train = train["accident_severity"]
+        X_train = train.drop(columns=[self.config.target_column])
+        y_train = train[self.config.target_column]
 
-        # Handle data imbalance using SMOTE
-        smote = SMOTE(sampling_strategy='auto', random_state=42)
-        X_train_resampled, y_train_resampled = smote.fit_resample(X_train, y_train)
+        # Handle data imbalance with the strategy selected in params.yaml
+        categorical_features = [X_train.columns.get_loc(col) for col in self.config.feature_columns]
+        X_train_resampled, y_train_resampled = resample(self.config.resampling_strategy, X_train, y_train,
+                                                        categorical_features,
+                                                        random_state=self.config.random_state,
+                                                        k_neighbors=self.config.k_neighbors)
 
-        # Save the resampled train set in a CSV file
+        # Save the resampled train set
         train_resampled = pd.DataFrame(X_train_resampled, columns=X_train.columns)
-        train_resampled["accident_severity"] = y_train_resampled
-        train_resampled.to_csv(os.path.join(self.config.root_dir, "train_resampled.csv"), index=False)
+        train_resampled[self.config.target_column] = np.asarray(y_train_resampled)
+        self.save_artifact(train_resampled, "train_resampled")
+        record_rows(rows_in=len(train), rows_out=len(train_resampled))
+        record_artifact(self.artifact_path("train_resampled"))
 
-        logger.info("Handling data imbalance using SMOTE completed")
+        logger.info(f"Handling data imbalance using {self.config.resampling_strategy} completed, "
+                    f"{len(train)} -> {len(train_resampled)} rows")
 
     def save_preprocessor(self):
         if self.preprocessor is not None:
@@ -164,17 +184,25 @@ class DataTransformation:
         else:
             logger.warning("Preprocessor is not available. Please call get_data_transformation to create it.")
 
+    @instrument("data_transformation.train_test_split")
     def train_test_split(self):
         if self.preprocessor is None:
             raise ValueError("Preprocessor is not available. Please call get_data_transformation.")
 
-        # Split the data into train and test sets
-        train, test = train_test_split(self.transformed_df)
-
-        # Save the encoded train and test sets in the form of CSV files
-        train.to_csv(os.path.join(self.config.root_dir, "train.csv"), index=False)
-        test.to_csv(os.path.join(self.config.root_dir, "test.csv"), index=False)
-
-        logger.info("Split the data into train and test sets.")
+        if self.train_index is None:
+            self.split_data()
+        train = self.get_split("train")
+        test = self.get_split("test")
+
+        # Save the encoded train and test sets
+        self.save_artifact(train, "train")
+        self.save_artifact(test, "test")
+        if len(self.validation_index):
+            self.save_artifact(self.get_split("validation"), "validation")
+        elif self.artifact_path("validation").exists():
+            self.artifact_path("validation").unlink()
+
+        for name in ("train", "test", "validation"):
+            record_artifact(self.artifact_path(name))
         logger.info(f"Shape of train data: {train.shape}")
         logger.info(f"Shape of test data: {test.shape}")
@@ -8,15 +8,17 @@ import json
 import numpy as np 
 import joblib 
 from accident_severity.constants import * 
-from accident_severity.utils.common import read_yaml, create_directories, save_json
+from accident_severity.utils.common import read_yaml, create_directories, save_json, load_frame
 from accident_severity.entity.config_entity import ModelEvaluationConfig
+from accident_severity.utils.instrumentation import instrument, record_rows
 
 
 class ModelEvaluation:
     def __init__(self, config: ModelEvaluationConfig):
         self.config = config 
 
-    def evaluation_metrics(self, actual, predicted):
+    @staticmethod
+    def evaluation_metrics(actual, predicted):
         f1 = f1_score(actual, predicted, average="weighted")
         acc = accuracy_score(actual, predicted)
 
@@ -31,10 +33,12 @@ class ModelEvaluation:
         with open(self.config.metric_file_name, "w") as f:
             json.dump(scores, f)
 
+    @instrument("model_evaluation.evaluate_model")
     def evaluate_model(self):
-        test_data = pd.read_csv(self.config.test_data_path)
+        test_data = load_frame(Path(self.config.test_data_path))
         model = joblib.load(self.config.model_path)
 
+        record_rows(rows_in=len(test_data))
         X_test = test_data.drop(self.config.target_column, axis=1)
         y_test = test_data[[self.config.target_column]]
 
@@ -0,0 +1,54 @@
+import os
+import numpy as np
+import joblib
+from pathlib import Path
+from accident_severity.logging import logger
+from accident_severity.utils.instrumentation import instrument
+from accident_severity.entity.config_entity import ModelExportConfig
+from accident_severity.components.categorical_encoder import CategoricalLookupEncoder
+from accident_severity.components.tree_ensemble import TreeEnsemble, COMPILED_MODEL_FILE, ENCODER_FILE
+from accident_severity.utils.common import load_frame, save_json
+
+
+class ModelExport:
+    def __init__(self, config: ModelExportConfig):
+        self.config = config
+
+    @instrument("model_export.export")
+    def export(self):
+        model = joblib.load(self.config.model_path)
+        preprocessor = joblib.load(self.config.preprocessor_path)
+        model_path = Path(self.config.root_dir, COMPILED_MODEL_FILE)
+        encoder_path = Path(self.config.root_dir, ENCODER_FILE)
+
+        if not hasattr(model, "get_booster"):
+            # A non-XGBoost candidate won the model selection, serve it through joblib instead
+            for path in (model_path, encoder_path):
+                if path.exists():
+                    path.unlink()
+            logger.warning(f"{type(model).__name__} cannot be compiled to NumPy trees, skipping the export")
+            return
+
+        test_data = load_frame(Path(self.config.verify_data_path))
+        X = test_data.drop(columns=[self.config.target_column]).to_numpy(dtype=np.float32)
+
+        ensemble = TreeEnsemble.from_model(model, probe=X[:256])
+        max_error = ensemble.verify(model, X, atol=self.config.atol)
+
+        # The served encoder must give the preprocessor's codes for every category
+        encoder = CategoricalLookupEncoder.from_preprocessor(preprocessor)
+        encoder.verify(preprocessor)
+
+        ensemble.save(model_path)
+        encoder.save(encoder_path)
+
+        save_json(Path(self.config.root_dir, self.config.report_name), {
+            "trees": len(ensemble.roots),
+            "nodes": len(ensemble.feature),
+            "max_depth": ensemble.max_depth,
+            "verified_rows": len(X),
+            "max_abs_error": max_error,
+            "size_bytes": os.path.getsize(model_path),
+        })
+        logger.info(f"Exported {len(ensemble.roots)} trees to {model_path}, "
+                    f"max probability error {max_error:.2e} on {len(X)} rows")
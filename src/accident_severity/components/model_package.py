@@ -0,0 +1,136 @@
+import io
+import os
+import bz2
+import gzip
+import json
+import lzma
+import numpy as np
+from pathlib import Path
+from accident_severity.components.categorical_encoder import CategoricalLookupEncoder
+from accident_severity.utils.common import hash_file
+
+PACKAGE_FILE = "package.json"
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("The zstd codec needs the zstandard package: pip install zstandard") from e
+    return zstandard
+
+
+# codec: (file suffix, compress(data, level), decompress(data)), level None is the codec's default
+CODECS = {
+    "none": ("", lambda data, level: data, lambda data: data),
+    "gzip": (".gz", lambda data, level: gzip.compress(data, compresslevel=6 if level is None else level),
+             gzip.decompress),
+    "bz2": (".bz2", lambda data, level: bz2.compress(data, compresslevel=9 if level is None else level),
+            bz2.decompress),
+    "lzma": (".xz", lambda data, level: lzma.compress(data, preset=6 if level is None else level), lzma.decompress),
+    "zstd": (".zst", lambda data, level: _zstandard().ZstdCompressor(level=3 if level is None else level).compress(data),
+             lambda data: _zstandard().ZstdDecompressor().decompress(data)),
+}
+
+
+class ModelPackage:
+    # A directory that loads without unpickling anything: the booster in xgboost's
+    # UBJSON format (compressed with the chosen codec) and the encoder's category
+    # arrays as .npy files (read into the encoder's lookup indexes), instead of the pickled
+    # XGBClassifier and ColumnTransformer. Non-XGBoost models fall back to a joblib
+    # pickle under the same codec.
+    def __init__(self, model, encoder, manifest):
+        self.model = model
+        self.encoder = encoder
+        self.manifest = manifest
+
+    @staticmethod
+    def save(model, preprocessor, package_dir, codec="none", level=None):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec {codec!r}, expected one of {sorted(CODECS)}")
+        suffix, compress, _ = CODECS[codec]
+        package_dir = Path(package_dir)
+        os.makedirs(package_dir / "categories", exist_ok=True)
+
+        if hasattr(model, "get_booster"):
+            model_format, model_file = "xgboost", f"booster.ubj{suffix}"
+            # save_model also stores the XGBClassifier attributes (classes, best iteration)
+            model.save_model(package_dir / "booster.ubj")
+            if codec != "none":
+                with open(package_dir / "booster.ubj", "rb") as f:
+                    data = f.read()
+                os.remove(package_dir / "booster.ubj")
+                with open(package_dir / model_file, "wb") as f:
+                    f.write(compress(data, level))
+        else:
+            import joblib
+
+            model_format, model_file = "joblib", f"model.joblib{suffix}"
+            buffer = io.BytesIO()
+            joblib.dump(model, buffer)
+            with open(package_dir / model_file, "wb") as f:
+                f.write(compress(buffer.getvalue(), level))
+
+        encoder = CategoricalLookupEncoder.from_preprocessor(preprocessor)
+        category_files = []
+        for j, categories in enumerate(encoder.categories):
+            name = f"categories/{j:02d}.npy"
+            np.save(package_dir / name, np.asarray(categories, dtype=str))
+            category_files.append(name)
+
+        manifest = {
+            "format": 1,
+            "codec": codec,
+            "level": level,
+            "model_format": model_format,
+            "model_file": model_file,
+            "feature_columns": encoder.feature_columns,
+            "fill_values": encoder.fill_values,
+            "category_files": category_files,
+            "files": {name: hash_file(package_dir / name) for name in [model_file] + category_files},
+        }
+        with open(package_dir / PACKAGE_FILE, "w") as f:
+            json.dump(manifest, f, indent=4)
+        return manifest
+
+    @staticmethod
+    def read_manifest(package_dir):
+        with open(Path(package_dir, PACKAGE_FILE)) as f:
+            return json.load(f)
+
+    @classmethod
+    def load_model(cls, manifest_path):
+        package_dir = Path(manifest_path).parent
+        manifest = cls.read_manifest(package_dir)
+        model_path = package_dir / manifest["model_file"]
+
+        if manifest["model_format"] == "xgboost":
+            from xgboost import XGBClassifier
+
+            model = XGBClassifier()
+            if manifest["codec"] == "none":
+                # xgboost reads the file itself, no copy of it is held in Python
+                model.load_model(model_path)
+            else:
+                with open(model_path, "rb") as f:
+                    model.load_model(bytearray(CODECS[manifest["codec"]][2](f.read())))
+            return model
+
+        import joblib
+
+        with open(model_path, "rb") as f:
+            return joblib.load(io.BytesIO(CODECS[manifest["codec"]][2](f.read())))
+
+    @classmethod
+    def load_encoder(cls, package_dir, unknown_value="error"):
+        # The arrays are small and the encoder copies them into pd.Index lookups, so they are read, not mapped
+        manifest = cls.read_manifest(package_dir)
+        categories = [np.load(Path(package_dir, name)) for name in manifest["category_files"]]
+        return CategoricalLookupEncoder(manifest["feature_columns"], categories, manifest["fill_values"],
+                                        unknown_value=unknown_value)
+
+    @classmethod
+    def load(cls, package_dir, unknown_value="error"):
+        return cls(cls.load_model(Path(package_dir, PACKAGE_FILE)),
+                   cls.load_encoder(package_dir, unknown_value=unknown_value),
+                   cls.read_manifest(package_dir))
@@ -0,0 +1,159 @@
+import os
+import json
+import uuid
+import shutil
+from pathlib import Path
+from datetime import datetime, timezone
+from accident_severity.logging import logger, run_id
+from accident_severity.utils.instrumentation import instrument
+from accident_severity.entity.config_entity import ModelRegistryConfig
+from accident_severity.utils.common import hash_file
+
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+MODEL_FILE = "rta_model.joblib"
+PREPROCESSOR_FILE = "preprocessor.joblib"
+PACKAGE_DIR = "package"
+
+
+class ModelRegistry:
+    # root_dir/v0001, v0002, ... each hold a model, its preprocessor and a manifest
+    # (file hashes, metrics, feature list). A version directory is assembled under a
+    # staging name and renamed into place, and the CURRENT pointer is replaced
+    # atomically, so readers never see a half-written version.
+    def __init__(self, root_dir):
+        self.root_dir = Path(root_dir)
+
+    def version_dirs(self):
+        # Every vNNNN directory, including ones without a manifest, in numeric order
+        if not self.root_dir.exists():
+            return []
+        return sorted((path for path in self.root_dir.iterdir()
+                       if path.is_dir() and path.name[:1] == "v" and path.name[1:].isdigit()),
+                      key=lambda path: int(path.name[1:]))
+
+    def versions(self):
+        return [path.name for path in self.version_dirs() if (path / MANIFEST_FILE).exists()]
+
+    def next_version(self):
+        # Numbers taken by directories without a manifest (a manual copy, an interrupted
+        # prune) are skipped too, renaming onto them would fail
+        dirs = self.version_dirs()
+        return f"v{int(dirs[-1].name[1:]) + 1 if dirs else 1:04d}"
+
+    def path(self, version):
+        path = self.root_dir / version
+        if not (path / MANIFEST_FILE).exists():
+            raise ValueError(f"Unknown model version {version!r}, registered: {self.versions()}")
+        return path
+
+    def manifest(self, version):
+        with open(self.path(version) / MANIFEST_FILE) as f:
+            return json.load(f)
+
+    def current(self):
+        try:
+            with open(self.root_dir / CURRENT_FILE) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def promote(self, version):
+        self.path(version)
+        tmp_path = self.root_dir / f"{CURRENT_FILE}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(version + "\n")
+        os.replace(tmp_path, self.root_dir / CURRENT_FILE)
+        logger.info(f"Promoted model version {version}")
+
+    def find(self, model_sha256, preprocessor_sha256):
+        for version in self.versions():
+            files = self.manifest(version)["files"]
+            if files["model"]["sha256"] == model_sha256 and files["preprocessor"]["sha256"] == preprocessor_sha256:
+                return version
+        return None
+
+    def register(self, model_path, preprocessor_path, metrics=None, feature_columns=None, target_mapping=None,
+                 package_codec=None, package_level=None):
+        hashes = {"model": hash_file(model_path), "preprocessor": hash_file(preprocessor_path)}
+        existing = self.find(hashes["model"], hashes["preprocessor"])
+        if existing is not None:
+            logger.info(f"Model is already registered as {existing}")
+            return existing
+
+        os.makedirs(self.root_dir, exist_ok=True)
+        staging = self.root_dir / f".staging-{uuid.uuid4().hex}"
+        staging.mkdir()
+        try:
+            files = {}
+            for key, source, name in (("model", model_path, MODEL_FILE),
+                                      ("preprocessor", preprocessor_path, PREPROCESSOR_FILE)):
+                shutil.copy2(source, staging / name)
+                files[key] = {"name": name, "sha256": hashes[key], "bytes": os.path.getsize(staging / name)}
+
+            if package_codec is not None:
+                import joblib
+                from accident_severity.components.model_package import ModelPackage
+
+                package = ModelPackage.save(joblib.load(staging / MODEL_FILE), joblib.load(staging / PREPROCESSOR_FILE),
+                                            staging / PACKAGE_DIR, codec=package_codec, level=package_level)
+                files["package"] = {"name": PACKAGE_DIR, "codec": package_codec, "files": package["files"]}
+
+            for attempt in range(100):
+                version = self.next_version()
+                manifest = {
+                    "version": version,
+                    "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    "run_id": run_id(),
+                    "files": files,
+                    "metrics": metrics or {},
+                    "feature_columns": list(feature_columns or []),
+                    "target_mapping": dict(target_mapping or {}),
+                    "source": {"model_path": str(model_path), "preprocessor_path": str(preprocessor_path)},
+                }
+                with open(staging / MANIFEST_FILE, "w") as f:
+                    json.dump(manifest, f, indent=4)
+                try:
+                    # Fails if another process took this version number meanwhile
+                    os.rename(staging, self.root_dir / version)
+                    break
+                except OSError:
+                    if not (self.root_dir / version).exists():
+                        raise
+            else:
+                raise RuntimeError(f"Could not claim a version number in {self.root_dir}")
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        logger.info(f"Registered model version {version} in {self.root_dir}")
+        return version
+
+    def prune(self, keep):
+        current = self.current()
+        old = [version for version in self.versions() if version != current]
+        for version in old[:max(len(old) - keep, 0)]:
+            shutil.rmtree(self.root_dir / version)
+            logger.info(f"Removed model version {version}")
+
+
+class ModelRegistration:
+    def __init__(self, config: ModelRegistryConfig):
+        self.config = config
+        self.registry = ModelRegistry(config.root_dir)
+
+    @instrument("model_registry.register")
+    def register(self):
+        metrics = {}
+        if os.path.exists(self.config.metrics_path):
+            with open(self.config.metrics_path) as f:
+                metrics = json.load(f)
+
+        version = self.registry.register(self.config.model_path, self.config.preprocessor_path,
+                                         metrics=metrics, feature_columns=self.config.feature_columns,
+                                         target_mapping=self.config.target_mapping,
+                                         package_codec=self.config.package_codec,
+                                         package_level=self.config.package_level)
+        if self.config.promote and self.registry.current() != version:
+            self.registry.promote(version)
+        self.registry.prune(self.config.keep)
+        return version
@@ -0,0 +1,148 @@
+import os
+import time
+import shutil
+import functools
+import importlib
+import multiprocessing as mp
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import joblib
+from threadpoolctl import threadpool_limits
+from accident_severity.logging import logger
+from accident_severity.utils.instrumentation import instrument, worker_call, merge_worker_results
+from accident_severity.components.model_trainer import ModelTrainer
+from accident_severity.components.model_evaluation import ModelEvaluation
+from accident_severity.components.resampling import balanced_sample_weight
+from accident_severity.utils.common import load_frame, save_json, limit_threads
+
+
+# Filled in by the parent right before the pool is forked, so workers inherit the
+# loaded data and the binned XGBoost matrices instead of reloading them
+_SHARED = {}
+
+
+def build_estimator(spec):
+    module_name, class_name = spec["class"].rsplit(".", 1)
+    estimator_class = getattr(importlib.import_module(module_name), class_name)
+    return estimator_class(**spec.get("params", {}))
+
+
+def predict_latency(model, X, repeat=50):
+    start = time.perf_counter()
+    model.predict_proba(X)
+    batch_seconds = time.perf_counter() - start
+
+    single = []
+    for i in range(min(repeat, len(X))):
+        start = time.perf_counter()
+        model.predict_proba(X.iloc[[i]])
+        single.append(time.perf_counter() - start)
+
+    return {
+        "predict_ms_per_1k_rows": batch_seconds / len(X) * 1000 * 1000,
+        "predict_ms_single_row_p50": float(np.median(single)) * 1000,
+    }
+
+
+def _train_candidate(spec):
+    selection = _SHARED["selection"]
+    trainer = selection.trainer
+    n_threads = _SHARED["n_threads"]
+    X_train, y_train, _, _ = trainer.load_data()
+
+    with threadpool_limits(limits=n_threads):
+        start = time.perf_counter()
+        report = None
+        if spec["class"] == "xgboost.XGBClassifier":
+            # The configured XGBClassifier goes through ModelTrainer, with its cached DMatrix and tuned params
+            model, report = trainer.fit(n_jobs=n_threads, **{**trainer.tuned_params(), **spec.get("params", {})})
+        else:
+            model = build_estimator(spec)
+            limit_threads(model, n_threads)
+            fit_params = {}
+            if trainer.config.resampling_strategy == "class_weight":
+                fit_params["sample_weight"] = balanced_sample_weight(y_train)
+            model.fit(X_train, y_train, **fit_params)
+        fit_seconds = time.perf_counter() - start
+
+        X_eval, y_eval = selection.eval_data
+        f1, acc = ModelEvaluation.evaluation_metrics(y_eval, np.ravel(model.predict(X_eval)))
+        latency = predict_latency(model, X_eval)
+
+    model_path = Path(selection.candidates_dir, f"{spec['name']}.joblib")
+    joblib.dump(model, model_path)
+
+    return {
+        "name": spec["name"],
+        "class": spec["class"],
+        "params": spec.get("params", {}),
+        "model_path": str(model_path),
+        "fit_seconds": fit_seconds,
+        **latency,
+        "f1_score": f1,
+        "accuracy_score": acc,
+        "training_report": report,
+    }
+
+
+class ModelSelection:
+    def __init__(self, config, trainer: ModelTrainer):
+        self.config = config
+        self.trainer = trainer
+        self.candidates_dir = Path(config.root_dir, "candidates")
+        self.eval_data = None
+
+    def candidate_specs(self):
+        xgboost_spec = {"name": "xgboost", "class": "xgboost.XGBClassifier"}
+        return [xgboost_spec] + [dict(spec) for spec in self.config.candidates]
+
+    def load_eval_data(self):
+        # Candidates are ranked on the validation fold, the test split stays unseen
+        # until Model Evaluation reports on it
+        _, _, X_valid, y_valid = self.trainer.load_data()
+        if X_valid is not None:
+            return X_valid, y_valid
+
+        if not os.path.exists(self.config.validation_data_path):
+            raise ValueError("Ranking candidates needs a validation fold, "
+                             "set train_test_split.validation_size in params.yaml")
+        valid_data = load_frame(Path(self.config.validation_data_path))
+        return valid_data.drop([self.config.target_column], axis=1), valid_data[self.config.target_column]
+
+    @instrument("model_selection.train_candidates")
+    def train_candidates(self):
+        os.makedirs(self.candidates_dir, exist_ok=True)
+        specs = self.candidate_specs()
+        n_workers = max(1, min(self.config.n_workers, len(specs)))
+
+        self.eval_data = self.load_eval_data()
+        self.trainer.build_dmatrices(self.trainer.model_params())
+        _SHARED.update(selection=self, n_threads=max(1, os.cpu_count() // n_workers))
+
+        try:
+            if n_workers == 1:
+                results = [_train_candidate(spec) for spec in specs]
+            else:
+                with ProcessPoolExecutor(n_workers, mp_context=mp.get_context("fork")) as pool:
+                    results = merge_worker_results(pool.map(functools.partial(worker_call, _train_candidate), specs))
+        finally:
+            _SHARED.clear()
+
+        leaderboard = sorted(results, key=lambda result: result[self.config.selection_metric], reverse=True)
+        winner = leaderboard[0]
+        shutil.copy2(winner["model_path"], os.path.join(self.config.root_dir, self.config.model_name))
+
+        save_json(Path(self.config.root_dir, self.config.leaderboard_name), {
+            "selection_metric": self.config.selection_metric,
+            "winner": winner["name"],
+            "candidates": leaderboard,
+        })
+        xgboost_result = next(result for result in results if result["name"] == "xgboost")
+        save_json(Path(self.config.root_dir, self.config.report_name), xgboost_result["training_report"])
+
+        for result in leaderboard:
+            logger.info(f"Candidate {result['name']}: {self.config.selection_metric} "
+                        f"{result[self.config.selection_metric]:.4f}, fit {result['fit_seconds']:.2f}s, "
+                        f"predict {result['predict_ms_per_1k_rows']:.2f} ms/1k rows")
+        logger.info(f"Promoted {winner['name']} to {self.config.model_name}")
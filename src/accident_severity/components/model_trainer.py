@@ -1,29 +1,304 @@
-
 import pandas as pd
-import os, sys 
+import os, sys
+import json
+import time
+import uuid
 from pathlib import Path
-from accident_severity.logging import logger
+from datetime import datetime, timezone
+from accident_severity.logging import logger, run_id
+from accident_severity.utils.instrumentation import instrument, record_rows, record_artifact
+import xgboost as xgb
 from xgboost import XGBClassifier
 import joblib
-from accident_severity.entity.config_entity import ModelTrainerConfig
+from accident_severity.entity.config_entity import ModelTrainerConfig, IncrementalTrainingConfig
+from accident_severity.utils.common import load_frame, save_json, load_json, hash_file, select_columns, source_columns
+from accident_severity.components.resampling import balanced_sample_weight
+from accident_severity.components.categorical_encoder import CategoricalLookupEncoder
+from accident_severity.components.model_evaluation import ModelEvaluation
 
 
 class ModelTrainer:
-    def __init__(self, config: ModelTrainerConfig):
-        self.config = config 
+    def __init__(self, config: ModelTrainerConfig, data=None, incremental_config: IncrementalTrainingConfig = None):
+        self.config = config
+        # (X_train, y_train, X_valid, y_valid), loaded from the configured artifacts when not given
+        self.data = data
+        self.dmatrix_cache = {}
+        self.incremental_config = incremental_config
 
-    def train(self):
-        train_data = pd.read_csv(self.config.train_data_path)
-        test_data = pd.read_csv(self.config.test_data_path)
+    def load_data(self):
+        if self.data is not None:
+            return self.data
 
+        train_data = load_frame(Path(self.config.train_data_path))
         X_train = train_data.drop([self.config.target_column], axis=1)
-        X_test = test_data.drop([self.config.target_column], axis=1)
-        y_train = train_data[[self.config.target_column]]
-        y_test = test_data[[self.config.target_column]]
+        y_train = train_data[self.config.target_column]
+
+        # Early stopping watches the validation fold of the transformation stage,
+        # the test set stays untouched for model evaluation
+        X_valid, y_valid = None, None
+        if self.config.early_stopping_rounds:
+            if not os.path.exists(self.config.validation_data_path):
+                raise ValueError("early_stopping_rounds needs a validation fold, "
+                                 "set train_test_split.validation_size in params.yaml")
+            valid_data = load_frame(Path(self.config.validation_data_path))
+            X_valid = valid_data.drop([self.config.target_column], axis=1)
+            y_valid = valid_data[self.config.target_column]
+
+        self.data = X_train, y_train, X_valid, y_valid
+        return self.data
+
+    def feature_types(self, enable_categorical, n_features):
+        # The inputs are ordinal codes, so native categorical splits only need the column types
+        return ["c"] * n_features if enable_categorical else None
+
+    def dmatrix(self, name, X, y, tree_method, max_bin, enable_categorical, ref=None):
+        # Quantile sketches depend only on the data, max_bin and the column types,
+        # so repeated fits on the same data reuse the binned matrix. Only hist can
+        # train from a QuantileDMatrix, the other tree methods get a plain DMatrix
+        quantile = tree_method == "hist"
+        key = (name, quantile, max_bin, enable_categorical)
+        if key not in self.dmatrix_cache:
+            weight = None
+            if self.config.resampling_strategy == "class_weight":
+                weight = balanced_sample_weight(y)
+            feature_types = self.feature_types(enable_categorical, X.shape[1])
+            if quantile:
+                self.dmatrix_cache[key] = xgb.QuantileDMatrix(X, y, weight=weight, max_bin=max_bin, ref=ref,
+                                                              enable_categorical=enable_categorical,
+                                                              feature_types=feature_types)
+            else:
+                self.dmatrix_cache[key] = xgb.DMatrix(X, y, weight=weight, enable_categorical=enable_categorical,
+                                                      feature_types=feature_types)
+        return self.dmatrix_cache[key]
+
+    def model_params(self, **overrides):
+        params = {
+            "n_estimators": self.config.n_estimators,
+            "max_depth": self.config.max_depth,
+            "learning_rate": self.config.learning_rate,
+            "tree_method": self.config.tree_method,
+            "n_jobs": self.config.n_jobs,
+            "max_bin": self.config.max_bin,
+            "enable_categorical": self.config.enable_categorical,
+        }
+        params.update(overrides)
+        return params
+
+    def build_dmatrices(self, params):
+        X_train, y_train, X_valid, y_valid = self.load_data()
+        if params["enable_categorical"] and (X_train.to_numpy() % 1).any():
+            raise ValueError("enable_categorical needs integral category codes, SMOTE interpolates between them. "
+                             "Use the smotenc, random or class_weight resampling strategy.")
+
+        dtrain = self.dmatrix("train", X_train, y_train, params["tree_method"], params["max_bin"],
+                              params["enable_categorical"])
+        evals = []
+        if X_valid is not None:
+            dvalid = self.dmatrix("validation", X_valid, y_valid, params["tree_method"], params["max_bin"],
+                                  params["enable_categorical"], ref=dtrain)
+            evals = [(dvalid, "validation")]
+        return dtrain, evals
+
+    def fit(self, callbacks=None, **overrides):
+        params = self.model_params(**overrides)
+        X_train, y_train, X_valid, y_valid = self.load_data()
+        n_classes = int(y_train.nunique())
+
+        start = time.perf_counter()
+        dtrain, evals = self.build_dmatrices(params)
+        dmatrix_seconds = time.perf_counter() - start
+
+        booster_params = {
+            "objective": "multi:softprob",
+            "num_class": n_classes,
+            "eval_metric": "mlogloss",
+        }
+        booster_params.update({key: value for key, value in params.items()
+                               if key not in ("n_estimators", "n_jobs", "enable_categorical") and value is not None})
+        if params["n_jobs"] is not None:
+            booster_params["nthread"] = params["n_jobs"]
+
+        start = time.perf_counter()
+        booster = xgb.train(booster_params, dtrain, num_boost_round=params["n_estimators"], evals=evals,
+                            early_stopping_rounds=self.config.early_stopping_rounds if evals else None,
+                            callbacks=callbacks, verbose_eval=False)
+        train_seconds = time.perf_counter() - start
+
+        # Hand the booster back as an XGBClassifier so the rest of the pipeline is unchanged
+        model = XGBClassifier(**params, feature_types=self.feature_types(params["enable_categorical"],
+                                                                          X_train.shape[1]))
+        model.load_model(booster.save_raw("ubj"))
+
+        report = {
+            "params": params,
+            "train_rows": len(X_train),
+            "validation_rows": 0 if X_valid is None else len(X_valid),
+            "dmatrix_seconds": dmatrix_seconds,
+            "train_seconds": train_seconds,
+            "boosted_rounds": booster.num_boosted_rounds(),
+            "best_iteration": booster.best_iteration if evals else None,
+            "best_score": booster.best_score if evals else None,
+        }
+        return model, report
+
+    def tuned_params(self):
+        if self.config.tuned_params_path is None:
+            return {}
+        if not os.path.exists(self.config.tuned_params_path):
+            raise ValueError(f"Tuned parameters {self.config.tuned_params_path} not found, run the model tuning stage")
+        return dict(load_json(Path(self.config.tuned_params_path)))
+
+    @instrument("model_trainer.train")
+    def train(self):
+        model, report = self.fit(**self.tuned_params())
+
+        joblib.dump(model, os.path.join(self.config.root_dir, self.config.model_name))
+        save_json(Path(self.config.root_dir, self.config.report_name), report)
+        record_rows(rows_in=report["train_rows"])
+        record_artifact(os.path.join(self.config.root_dir, self.config.model_name))
+
+        logger.info(f"Trained {report['boosted_rounds']} rounds in {report['train_seconds']:.2f}s "
+                    f"(+{report['dmatrix_seconds']:.2f}s binning) with {report['params']}")
+
+    def load_batch(self, batch_path, preprocessor):
+        # A batch of new records in the raw RTA format (.csv or .parquet), encoded with
+        # the saved preprocessor's categories rather than refitted, so the codes mean
+        # what they meant when the model was trained
+        config = self.incremental_config
+        columns = config.feature_columns + [config.target_column]
+        usecols = source_columns(config.column_mapping, columns)
+        if Path(batch_path).suffix == ".parquet":
+            batch = pd.read_parquet(batch_path, columns=usecols)
+        else:
+            batch = pd.read_csv(batch_path, usecols=usecols, dtype=str)
+        batch = select_columns(batch, config.column_mapping, columns)
+
+        encoder = CategoricalLookupEncoder.from_preprocessor(preprocessor, unknown_value=-1)
+        codes = encoder.transform(batch[encoder.feature_columns])
+        labels = batch[config.target_column].map(config.target_mapping)
+
+        invalid = pd.DataFrame(codes < 0, columns=encoder.feature_columns)
+        invalid[config.target_column] = labels.isna().to_numpy()
+        invalid_rows = invalid.any(axis=1).to_numpy()
+        if invalid_rows.any():
+            values = {column: pd.unique(batch[column].to_numpy()[invalid[column].to_numpy()])[:5].tolist()
+                      for column in invalid.columns if invalid[column].any()}
+            if config.unknown_categories == "error":
+                raise ValueError(f"{int(invalid_rows.sum())} rows of {batch_path} have values the model was not "
+                                 f"trained on: {values}. Set incremental.unknown_categories to drop to skip them, "
+                                 f"or retrain from scratch to learn the new categories")
+            logger.warning(f"Dropping {int(invalid_rows.sum())} rows of {batch_path} with unknown values {values}")
+
+        X = pd.DataFrame(codes[~invalid_rows], columns=encoder.feature_columns)
+        y = labels.to_numpy()[~invalid_rows].astype("int64")
+        if not len(X):
+            raise ValueError(f"No usable rows in {batch_path}")
+        return X, y, int(invalid_rows.sum())
+
+    def evaluate(self, model, X_test, y_test):
+        f1, acc = ModelEvaluation.evaluation_metrics(y_test, model.predict(X_test))
+        return {"f1_score": f1, "accuracy_score": acc}
+
+    @instrument("model_trainer.train_incremental")
+    def train_incremental(self, batch_path):
+        # Adds boosting rounds fitted on the batch alone to the trained model, so the
+        # cost grows with the batch and not with the history. The test set evaluation
+        # (a fixed cost) keeps the current model when the update makes it worse.
+        config = self.incremental_config
+        if config is None:
+            raise ValueError("Incremental training needs an IncrementalTrainingConfig")
+        start = time.perf_counter()
+
+        model = joblib.load(config.model_path)
+        if not hasattr(model, "get_booster"):
+            raise ValueError(f"Incremental training continues an XGBoost model, "
+                             f"{config.model_path} holds a {type(model).__name__}")
+        booster = model.get_booster()
+        lineage = json.loads(booster.attr("lineage") or "[]")
+
+        batch_sha256 = hash_file(batch_path)
+        if any(entry["batch_sha256"] == batch_sha256 for entry in lineage):
+            logger.warning(f"{batch_path} is already part of {config.model_path}, skipping it")
+            return None
+
+        X, y, dropped_rows = self.load_batch(batch_path, joblib.load(config.preprocessor_path))
+        if booster.feature_names:
+            X = X[booster.feature_names]
+
+        # Early stopping leaves rounds past the best one in the booster that predictions
+        # ignore, new rounds continue from the best one
+        best_iteration = booster.attr("best_iteration")
+        if best_iteration is not None:
+            booster = booster[:int(best_iteration) + 1]
+
+        params = {key: value for key, value in model.get_xgb_params().items()
+                  if value is not None and key not in ("base_score", "n_jobs", "eval_metric")}
+        params.update({"num_class": int(model.n_classes_), "eval_metric": "mlogloss"})
+        if config.learning_rate is not None:
+            params["learning_rate"] = config.learning_rate
+        if config.n_jobs is not None:
+            params["nthread"] = config.n_jobs
+
+        # The model was trained on resampled, class-balanced data; the batch is left
+        # as it is and balanced with sample weights instead
+        feature_types = booster.feature_types
+        dtrain = xgb.DMatrix(X, y, weight=balanced_sample_weight(y), feature_types=feature_types,
+                             enable_categorical=bool(feature_types) and "c" in feature_types)
+
+        train_start = time.perf_counter()
+        updated_booster = xgb.train(params, dtrain, num_boost_round=config.n_rounds, xgb_model=booster,
+                                    verbose_eval=False)
+        train_seconds = time.perf_counter() - train_start
+        updated_booster.set_attr(best_iteration=None, best_score=None)
+
+        updated = XGBClassifier(**model.get_params())
+        updated.load_model(updated_booster.save_raw("ubj"))
+
+        test_data = load_frame(Path(config.test_data_path))
+        X_test, y_test = test_data[X.columns], test_data[config.target_column]
+        entry = {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "run_id": run_id(),
+            "parent_sha256": hash_file(config.model_path),
+            "parent_rounds": booster.num_boosted_rounds(),
+            "batch_path": str(batch_path),
+            "batch_sha256": batch_sha256,
+            "batch_rows": len(X),
+            "dropped_rows": dropped_rows,
+            "rounds_added": config.n_rounds,
+            "total_rounds": updated_booster.num_boosted_rounds(),
+            "learning_rate": params.get("learning_rate"),
+            "metrics_before": self.evaluate(model, X_test, y_test),
+            "metrics_after": self.evaluate(updated, X_test, y_test),
+        }
+        # Stored with the booster, so it travels with the joblib file, the registry copies and their packages
+        updated.get_booster().set_attr(lineage=json.dumps(lineage + [entry]))
+
+        # The budget is measured from the full retrain at the root of the lineage, so a
+        # chain of updates cannot drift down by max_regression at every step
+        metric = config.selection_metric
+        metrics_root = (lineage[0] if lineage else entry)["metrics_before"]
+        metrics_before, metrics_after = entry["metrics_before"], entry["metrics_after"]
+        accepted = metrics_after[metric] >= metrics_root[metric] - config.max_regression
+        report = {**entry, "metrics_root": metrics_root, "accepted": accepted, "selection_metric": metric,
+                  "max_regression": config.max_regression, "train_seconds": train_seconds,
+                  "total_seconds": time.perf_counter() - start}
+        save_json(Path(config.root_dir, config.report_name), report)
+        record_rows(rows_in=len(X))
 
-        xgb = XGBClassifier(n_estimators=self.config.n_estimators, max_depth=self.config.max_depth,
-                                learning_rate=self.config.learning_rate)
+        if not accepted:
+            logger.warning(f"Rejected the update from {batch_path}: {metric} {metrics_after[metric]:.4f} is more "
+                           f"than max_regression {config.max_regression} below {metrics_root[metric]:.4f} of the "
+                           f"last full retrain. {config.model_path} is unchanged")
+            return report
 
-        xgb.fit(X_train, y_train)
+        tmp_path = f"{config.model_path}.{uuid.uuid4().hex}.tmp"
+        joblib.dump(updated, tmp_path)
+        os.replace(tmp_path, config.model_path)
+        save_json(Path(config.root_dir, config.lineage_name),
+                  {"model_sha256": hash_file(config.model_path), "lineage": lineage + [entry]})
+        record_artifact(config.model_path)
 
-        joblib.dump(xgb, os.path.join(self.config.root_dir, self.config.model_name))
+        logger.info(f"Added {config.n_rounds} rounds from {len(X)} rows of {batch_path} in {train_seconds:.2f}s, "
+                    f"{metric} {metrics_before[metric]:.4f} -> {metrics_after[metric]:.4f}")
+        return report
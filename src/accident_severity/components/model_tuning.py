@@ -0,0 +1,154 @@
+import os
+import time
+import dataclasses
+import multiprocessing as mp
+from pathlib import Path
+import optuna
+import xgboost as xgb
+from sqlalchemy.pool import NullPool
+from accident_severity.logging import logger
+from accident_severity.utils.instrumentation import instrument
+from accident_severity.entity.config_entity import ModelTuningConfig, ModelTrainerConfig
+from accident_severity.components.model_trainer import ModelTrainer
+from accident_severity.utils.common import save_json
+
+
+# Filled in by the parent right before the workers are forked, so every worker
+# inherits the trainer with its binned train/validation matrices already built
+_SHARED = {}
+
+
+class PruningCallback(xgb.callback.TrainingCallback):
+    def __init__(self, trial, data_name="validation", metric_name="mlogloss"):
+        self.trial = trial
+        self.data_name = data_name
+        self.metric_name = metric_name
+
+    def after_iteration(self, model, epoch, evals_log):
+        score = evals_log[self.data_name][self.metric_name][-1]
+        self.trial.report(score, step=epoch)
+        if self.trial.should_prune():
+            raise optuna.TrialPruned(f"Trial was pruned at iteration {epoch}")
+        return False
+
+
+def suggest_params(trial, search_space):
+    params = {}
+    for name, spec in search_space.items():
+        if spec["type"] == "int":
+            params[name] = trial.suggest_int(name, spec["low"], spec["high"], log=spec.get("log", False))
+        elif spec["type"] == "float":
+            params[name] = trial.suggest_float(name, spec["low"], spec["high"], log=spec.get("log", False))
+        elif spec["type"] == "categorical":
+            params[name] = trial.suggest_categorical(name, spec["choices"])
+        else:
+            raise ValueError(f"Unknown search space type {spec['type']!r} for {name}")
+    return params
+
+
+def _objective(trial):
+    tuning = _SHARED["tuning"]
+    params = suggest_params(trial, tuning.config.search_space)
+    _, report = tuning.trainer.fit(callbacks=[PruningCallback(trial)], n_jobs=_SHARED["n_jobs"], **params)
+
+    trial.set_user_attr("best_iteration", report["best_iteration"])
+    trial.set_user_attr("train_seconds", report["train_seconds"])
+    return report["best_score"]
+
+
+def _run_worker(worker_id):
+    tuning = _SHARED["tuning"]
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+
+    study = optuna.load_study(study_name=tuning.config.study_name, storage=tuning.storage(),
+                              sampler=optuna.samplers.TPESampler(seed=tuning.config.seed + worker_id),
+                              pruner=tuning.pruner())
+    study.optimize(_objective, timeout=tuning.config.timeout,
+                   callbacks=[optuna.study.MaxTrialsCallback(tuning.config.n_trials, states=None)])
+
+
+class ModelTuning:
+    def __init__(self, config: ModelTuningConfig, trainer_config: ModelTrainerConfig):
+        self.config = config
+        # Every trial early stops on the validation fold, tuned parameters never feed back into the search
+        self.trainer = ModelTrainer(dataclasses.replace(trainer_config,
+                                                        early_stopping_rounds=config.early_stopping_rounds,
+                                                        tuned_params_path=None))
+
+    def storage(self):
+        # No pooled connections, so nothing open in the parent leaks into the forked workers
+        return optuna.storages.RDBStorage(f"sqlite:///{self.config.storage_path}",
+                                          engine_kwargs={"poolclass": NullPool, "connect_args": {"timeout": 60}})
+
+    def pruner(self):
+        return optuna.pruners.MedianPruner(n_startup_trials=self.config.n_startup_trials,
+                                           n_warmup_steps=self.config.n_warmup_steps)
+
+    def create_study(self):
+        storage = self.storage()
+        try:
+            optuna.delete_study(study_name=self.config.study_name, storage=storage)
+        except KeyError:
+            pass
+        return optuna.create_study(study_name=self.config.study_name, storage=storage, direction="minimize")
+
+    def run_workers(self):
+        n_workers = max(1, self.config.n_workers)
+        _SHARED.update(tuning=self, n_jobs=max(1, os.cpu_count() // n_workers))
+
+        try:
+            if n_workers == 1:
+                _run_worker(0)
+                return
+
+            context = mp.get_context("fork")
+            workers = [context.Process(target=_run_worker, args=(worker_id,)) for worker_id in range(n_workers)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+
+            failed = [worker.exitcode for worker in workers if worker.exitcode != 0]
+            if failed:
+                raise RuntimeError(f"{len(failed)} tuning workers failed with exit codes {failed}")
+        finally:
+            _SHARED.clear()
+
+    @instrument("model_tuning.tune")
+    def tune(self):
+        if self.config.early_stopping_rounds is None:
+            raise ValueError("Tuning scores trials on the validation fold, set tuning.early_stopping_rounds")
+        if self.trainer.load_data()[2] is None:
+            raise ValueError("Tuning needs a validation fold, set train_test_split.validation_size in params.yaml")
+
+        # Bin the data once, the forked workers share it across all trials
+        self.trainer.build_dmatrices(self.trainer.model_params())
+
+        self.create_study()
+        start = time.perf_counter()
+        self.run_workers()
+        elapsed = time.perf_counter() - start
+
+        study = optuna.load_study(study_name=self.config.study_name, storage=self.storage())
+        states = [trial.state for trial in study.trials]
+        finished = states.count(optuna.trial.TrialState.COMPLETE) + states.count(optuna.trial.TrialState.PRUNED)
+
+        # The early stopped round count replaces the searched upper bound
+        best_params = dict(study.best_params)
+        best_params["n_estimators"] = study.best_trial.user_attrs["best_iteration"] + 1
+        save_json(Path(self.config.best_params_path), best_params)
+
+        report = {
+            "n_workers": self.config.n_workers,
+            "complete": states.count(optuna.trial.TrialState.COMPLETE),
+            "pruned": states.count(optuna.trial.TrialState.PRUNED),
+            "failed": states.count(optuna.trial.TrialState.FAIL),
+            "elapsed_seconds": elapsed,
+            "trials_per_minute": finished / elapsed * 60,
+            "best_value": study.best_value,
+            "best_params": best_params,
+        }
+        save_json(Path(self.config.root_dir, self.config.report_name), report)
+
+        logger.info(f"Tuning finished {finished} trials ({report['pruned']} pruned) in {elapsed:.1f}s, "
+                    f"{report['trials_per_minute']:.1f} trials/min, best validation mlogloss {study.best_value:.4f}")
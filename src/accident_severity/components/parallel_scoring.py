@@ -0,0 +1,115 @@
+import os
+import functools
+import numpy as np
+import multiprocessing as mp
+from multiprocessing.shared_memory import SharedMemory
+from accident_severity.utils.common import limit_threads
+from accident_severity.utils.instrumentation import worker_call, merge_worker_results
+
+
+# Filled in by the parent right before the pool is forked, so workers inherit the
+# loaded model and preprocessor copy-on-write instead of unpickling them. The pool
+# lives for a whole scoring run; each call puts its encoded rows and the output
+# array on shared memory mappings that the workers attach to by name.
+_SHARED = {}
+
+
+def _init_worker():
+    # One thread per worker process, otherwise the pool oversubscribes the cores
+    model = _SHARED["pipeline"].model
+    if hasattr(model, "get_booster"):
+        model.n_jobs = 1
+        model.get_booster().set_param({"nthread": 1})
+    else:
+        limit_threads(model, 1)
+
+
+def _attach(name, shape, dtype):
+    shm = SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _score_shard(inputs, outputs, start, stop):
+    codes_shm, codes = _attach(*inputs)
+    out_shm, out = _attach(*outputs)
+    try:
+        out[start:stop] = _SHARED["pipeline"].predict_proba_codes(codes[start:stop])
+    finally:
+        del codes, out
+        codes_shm.close()
+        out_shm.close()
+
+
+def _share(array):
+    shm = SharedMemory(create=True, size=max(1, array.nbytes))
+    shared = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+    shared[:] = array
+    return shm, shared
+
+
+class ParallelScoring:
+    def __init__(self, pipeline, n_workers=None, shard_size=50_000):
+        self.pipeline = pipeline
+        self.n_workers = n_workers or os.cpu_count()
+        self.shard_size = shard_size
+        self.pool = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def open(self):
+        # Fork the workers once, every predict_proba until close() reuses them
+        if self.n_workers > 1 and self.pool is None:
+            _SHARED.update(pipeline=self.pipeline)
+            self.pool = mp.get_context("fork").Pool(self.n_workers, initializer=_init_worker)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+            _SHARED.clear()
+
+    def shards(self, n_rows):
+        # At least one shard per worker, never more rows per shard than shard_size
+        size = max(1, min(self.shard_size, -(-n_rows // self.n_workers)))
+        return [(start, min(start + size, n_rows)) for start in range(0, n_rows, size)]
+
+    def predict_proba(self, records):
+        X = self.pipeline.to_array(records)
+
+        if self.n_workers <= 1 or len(X) == 0:
+            return self.pipeline.predict_proba_batch(X)
+        if self.pool is None:
+            # A single call gets a pool of its own
+            with self:
+                return self.predict_proba(X)
+
+        # Rows are encoded here, the workers only run the model. The output keeps
+        # the dtype the pipeline returns, as on the serial path
+        codes = self.pipeline.transform_batch(X)
+        dtype = self.pipeline.predict_proba_codes(codes[:1]).dtype
+        codes_shm, shared_codes = _share(codes)
+        out_shm = SharedMemory(create=True, size=len(X) * len(self.pipeline.model.classes_) * dtype.itemsize)
+        out = np.ndarray((len(X), len(self.pipeline.model.classes_)), dtype=dtype, buffer=out_shm.buf)
+
+        try:
+            inputs = (codes_shm.name, codes.shape, codes.dtype.str)
+            outputs = (out_shm.name, out.shape, out.dtype.str)
+            merge_worker_results(self.pool.starmap(functools.partial(worker_call, _score_shard),
+                                                   [(inputs, outputs, start, stop) for start, stop in self.shards(len(X))]))
+            proba = out.copy()
+        finally:
+            del shared_codes, out
+            for shm in (codes_shm, out_shm):
+                shm.close()
+                shm.unlink()
+
+        return proba
+
+    def predict(self, records):
+        return self.predict_proba(records).argmax(axis=1)
@@ -0,0 +1,144 @@
+
+import os
+import json
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from accident_severity.logging import logger
+from accident_severity.utils.instrumentation import instrument
+from accident_severity.utils.common import load_frame, hash_file
+from accident_severity.components.categorical_encoder import CategoricalLookupEncoder
+from accident_severity.entity.config_entity import PredictionTableConfig
+
+
+class PredictionTable:
+    # Labels and class probabilities for every encoded input, indexed by the
+    # mixed-radix code sum(codes[:, j] * strides[j]). A pruned table only holds
+    # the codes listed in `keys` and is looked up with a binary search.
+    def __init__(self, feature_columns, radices, labels, probabilities, keys=None):
+        self.feature_columns = list(feature_columns)
+        self.radices = np.asarray(radices, dtype=np.int64)
+        self.strides = np.concatenate([np.cumprod(self.radices[::-1])[::-1][1:], [1]]).astype(np.int64)
+        self.labels = labels
+        self.probabilities = probabilities
+        self.keys = keys
+
+    @property
+    def size(self):
+        return int(np.prod(self.radices))
+
+    def encode(self, codes):
+        codes = np.asarray(codes)
+        if codes.dtype.kind == "f":
+            # Float codes must be whole numbers, NaN and fractional codes have no row
+            whole = (codes == np.floor(codes)).all(axis=1)
+            codes = np.where(np.isfinite(codes), codes, -1).astype(np.int64)
+        else:
+            whole = True
+            codes = codes.astype(np.int64)
+        valid = whole & ((codes >= 0) & (codes < self.radices)).all(axis=1)
+        return np.where(valid, codes @ self.strides, -1), valid
+
+    def decode(self, index):
+        index = np.asarray(index, dtype=np.int64)
+        return (index[:, None] // self.strides) % self.radices
+
+    def lookup(self, codes):
+        index, found = self.encode(codes)
+
+        if self.keys is None:
+            rows = np.where(found, index, 0)
+        elif not len(self.keys):
+            # Nothing was observed, every row falls back to the model
+            return (np.zeros(len(index), dtype=self.labels.dtype),
+                    np.zeros((len(index), self.probabilities.shape[1]), dtype=self.probabilities.dtype),
+                    np.zeros(len(index), dtype=bool))
+        else:
+            rows = np.searchsorted(self.keys, index).clip(max=len(self.keys) - 1)
+            found &= self.keys[rows] == index
+
+        return self.labels[rows], self.probabilities[rows], found
+
+    @classmethod
+    def build(cls, model, encoder, root_dir, observed_codes=None, batch_size=1_000_000, sources=None):
+        radices = [len(cats) for cats in encoder.categories]
+        table = cls(encoder.feature_columns, radices, labels=None, probabilities=None)
+        n_classes = len(model.classes_)
+
+        if observed_codes is None:
+            keys = None
+            n_rows = table.size
+        else:
+            index, valid = table.encode(observed_codes)
+            keys = np.unique(index[valid])
+            n_rows = len(keys)
+            np.save(os.path.join(root_dir, "keys.npy"), keys)
+
+        labels = np.lib.format.open_memmap(os.path.join(root_dir, "labels.npy"), mode="w+",
+                                           dtype=np.int8, shape=(n_rows,))
+        probabilities = np.lib.format.open_memmap(os.path.join(root_dir, "probabilities.npy"), mode="w+",
+                                                  dtype=np.float32, shape=(n_rows, n_classes))
+
+        for start in range(0, n_rows, batch_size):
+            stop = min(start + batch_size, n_rows)
+            index = np.arange(start, stop) if keys is None else keys[start:stop]
+            proba = model.predict_proba(table.decode(index).astype(encoder.dtype))
+            probabilities[start:stop] = proba
+            labels[start:stop] = proba.argmax(axis=1)
+            logger.info(f"Scored {stop}/{n_rows} input combinations")
+
+        labels.flush()
+        probabilities.flush()
+
+        with open(os.path.join(root_dir, "table.json"), "w") as f:
+            json.dump({"feature_columns": table.feature_columns, "radices": radices,
+                       "n_rows": n_rows, "pruned": keys is not None, "sources": sources or {}}, f, indent=4)
+
+        return cls.load(root_dir)
+
+    @classmethod
+    def load(cls, root_dir, sources=None):
+        # sources ({"model": path, "preprocessor": path}) are checked against the files
+        # the table was built from, a table of another model would answer silently
+        with open(os.path.join(root_dir, "table.json")) as f:
+            meta = json.load(f)
+
+        for name, path in (sources or {}).items():
+            expected = meta.get("sources", {}).get(name)
+            if expected != hash_file(path):
+                raise ValueError(f"Prediction table {root_dir} was not built from {name} {path}, "
+                                 f"rebuild it with the Prediction Table Stage")
+
+        keys = np.load(os.path.join(root_dir, "keys.npy")) if meta["pruned"] else None
+
+        return cls(feature_columns=meta["feature_columns"],
+                   radices=meta["radices"],
+                   labels=np.load(os.path.join(root_dir, "labels.npy"), mmap_mode="r"),
+                   probabilities=np.load(os.path.join(root_dir, "probabilities.npy"), mmap_mode="r"),
+                   keys=keys)
+
+
+class PredictionTableBuilder:
+    def __init__(self, config: PredictionTableConfig):
+        self.config = config
+
+    @instrument("prediction_table.build_table")
+    def build_table(self):
+        import joblib
+
+        model = joblib.load(self.config.model_path)
+        preprocessor = joblib.load(self.config.preprocessor_path)
+        encoder = CategoricalLookupEncoder.from_preprocessor(preprocessor)
+
+        observed_codes = None
+        if self.config.prune_to_observed:
+            frames = [load_frame(Path(path), columns=encoder.feature_columns) for path in self.config.observed_data_paths]
+            observed_codes = pd.concat(frames)[encoder.feature_columns].to_numpy()
+
+        table = PredictionTable.build(model, encoder, self.config.root_dir,
+                                      observed_codes=observed_codes,
+                                      batch_size=self.config.batch_size,
+                                      sources={"model": hash_file(self.config.model_path),
+                                               "preprocessor": hash_file(self.config.preprocessor_path)})
+
+        logger.info(f"Prediction table with {len(table.labels)} rows saved to {self.config.root_dir}")
@@ -0,0 +1,62 @@
+
+import numpy as np
+import pandas as pd
+from sklearn.utils.class_weight import compute_sample_weight
+
+
+def smote_resample(X, y, categorical_features, random_state=42, k_neighbors=5):
+    from imblearn.over_sampling import SMOTE
+
+    smote = SMOTE(sampling_strategy="auto", k_neighbors=k_neighbors, random_state=random_state)
+    return smote.fit_resample(X, y)
+
+
+def smotenc_resample(X, y, categorical_features, random_state=42, k_neighbors=5):
+    from imblearn.over_sampling import SMOTEN, SMOTENC
+
+    # SMOTENC needs at least one continuous column, SMOTEN is its all-categorical counterpart
+    if len(categorical_features) == X.shape[1]:
+        sampler = SMOTEN(sampling_strategy="auto", k_neighbors=k_neighbors, random_state=random_state)
+    else:
+        sampler = SMOTENC(categorical_features=categorical_features, sampling_strategy="auto",
+                          k_neighbors=k_neighbors, random_state=random_state)
+    return sampler.fit_resample(X, y)
+
+
+def random_oversample(X, y, categorical_features=None, random_state=42, k_neighbors=None):
+    # Duplicate minority rows up to the majority count with a single gather
+    rng = np.random.default_rng(random_state)
+    labels = np.asarray(y)
+    classes, counts = np.unique(labels, return_counts=True)
+    target = counts.max()
+
+    index = [np.arange(len(labels))]
+    for cls, count in zip(classes, counts):
+        if count < target:
+            index.append(rng.choice(np.flatnonzero(labels == cls), size=target - count, replace=True))
+    index = np.concatenate(index)
+
+    return X.take(index).reset_index(drop=True), pd.Series(labels[index], name=getattr(y, "name", None))
+
+
+def no_resample(X, y, categorical_features=None, random_state=None, k_neighbors=None):
+    # Rows are kept as they are, the imbalance is handled by sample weights at training time
+    return X, y
+
+
+def balanced_sample_weight(y):
+    return compute_sample_weight("balanced", np.ravel(y))
+
+
+RESAMPLERS = {
+    "smote": smote_resample,
+    "smotenc": smotenc_resample,
+    "random": random_oversample,
+    "class_weight": no_resample,
+}
+
+
+def resample(strategy, X, y, categorical_features, random_state=42, k_neighbors=5):
+    if strategy not in RESAMPLERS:
+        raise ValueError(f"Unknown resampling strategy {strategy!r}, expected one of {list(RESAMPLERS)}")
+    return RESAMPLERS[strategy](X, y, categorical_features, random_state=random_state, k_neighbors=k_neighbors)
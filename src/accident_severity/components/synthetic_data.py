@@ -0,0 +1,178 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from accident_severity.logging import logger
+from accident_severity.entity.config_entity import SyntheticDataConfig
+
+
+def mutual_information(a, b, n_a, n_b):
+    joint = np.bincount(a * n_b + b, minlength=n_a * n_b).reshape(n_a, n_b) / len(a)
+    outer = joint.sum(axis=1, keepdims=True) @ joint.sum(axis=0, keepdims=True)
+    nonzero = joint > 0
+    return float((joint[nonzero] * np.log(joint[nonzero] / outer[nonzero])).sum())
+
+
+def chow_liu_tree(codes, n_categories, root):
+    # Maximum spanning tree over pairwise mutual information (Prim), so every
+    # column is sampled conditioned on the one column it depends on most
+    n_columns = codes.shape[1]
+    weights = np.zeros((n_columns, n_columns))
+    for i in range(n_columns):
+        for j in range(i + 1, n_columns):
+            weights[i, j] = weights[j, i] = mutual_information(codes[:, i], codes[:, j],
+                                                               n_categories[i], n_categories[j])
+
+    parents = np.full(n_columns, -1)
+    order = [root]
+    best = weights[root].copy()
+    best_parent = np.full(n_columns, root)
+    in_tree = np.zeros(n_columns, dtype=bool)
+    in_tree[root] = True
+    while len(order) < n_columns:
+        candidates = np.where(in_tree, -np.inf, best)
+        column = int(candidates.argmax())
+        parents[column] = best_parent[column]
+        order.append(column)
+        in_tree[column] = True
+        closer = weights[column] > best
+        best[closer] = weights[column][closer]
+        best_parent[closer] = column
+    return parents, order
+
+
+class SyntheticDataGenerator:
+    # Category frequencies (and with dependencies: tree, the conditional frequencies
+    # given a parent column) learnt from the source CSV. Missing values are kept as
+    # their own category and written back as empty fields.
+    def __init__(self, config: SyntheticDataConfig):
+        self.config = config
+        self.columns = None
+        self.categories = None
+        self.parents = None
+        self.order = None
+        self.tables = None
+
+    def source_columns(self):
+        if self.config.columns == "all":
+            return list(self.config.column_mapping)
+        names = {name: raw for raw, name in self.config.column_mapping.items()}
+        return [names[col] for col in self.config.feature_columns + [self.config.target_column]]
+
+    def fit(self, df=None):
+        if df is None:
+            df = pd.read_csv(self.config.source_path, usecols=self.source_columns(), dtype="category")
+        self.columns = list(df.columns)
+
+        self.categories, codes = [], []
+        for col in self.columns:
+            values = df[col].cat.categories.astype(str).tolist()
+            col_codes = df[col].cat.codes.to_numpy().astype(np.int64)
+            missing = col_codes < 0
+            if missing.any():
+                col_codes[missing] = len(values)
+                values.append(None)
+            self.categories.append(values)
+            codes.append(col_codes)
+        codes = np.column_stack(codes)
+        n_categories = [len(values) for values in self.categories]
+
+        target = {name: raw for raw, name in self.config.column_mapping.items()}[self.config.target_column]
+        root = self.columns.index(target) if target in self.columns else 0
+        if self.config.dependencies == "tree":
+            self.parents, self.order = chow_liu_tree(codes, n_categories, root)
+        elif self.config.dependencies == "independent":
+            self.parents, self.order = np.full(len(self.columns), -1), list(range(len(self.columns)))
+        else:
+            raise ValueError(f"Unknown dependencies {self.config.dependencies!r}, expected 'tree' or 'independent'")
+
+        # Per column, the observed child codes grouped by parent category. A row is
+        # drawn by picking a uniform position inside its parent's group: the exact
+        # empirical conditional distribution, sampled with one gather per column
+        self.tables = []
+        for col, parent in enumerate(self.parents):
+            n_parent = n_categories[parent] if parent >= 0 else 1
+            parent_codes = codes[:, parent] if parent >= 0 else np.zeros(len(codes), dtype=np.int64)
+            counts = np.bincount(parent_codes * n_categories[col] + codes[:, col],
+                                 minlength=n_parent * n_categories[col]).reshape(n_parent, n_categories[col])
+            group_sizes = counts.sum(axis=1)
+            lookup = np.repeat(np.tile(np.arange(n_categories[col], dtype=np.int32), n_parent), counts.ravel())
+            offsets = np.concatenate([[0], np.cumsum(group_sizes)[:-1]])
+            self.tables.append((lookup, offsets, group_sizes.astype(np.float32)))
+
+        logger.info(f"Learnt {len(self.columns)} columns from {len(df)} rows with {self.config.dependencies} dependencies")
+        return self
+
+    def sample_codes(self, n_rows, rng):
+        # Column-major, every column is filled and read as one contiguous block
+        codes = np.empty((n_rows, len(self.columns)), dtype=np.int32, order="F")
+        for col in self.order:
+            lookup, offsets, group_sizes = self.tables[col]
+            group = codes[:, self.parents[col]] if self.parents[col] >= 0 else 0
+            sizes = group_sizes[group]
+            # float32 rounding can land exactly on the group size, keep the draw inside the group
+            draw = np.minimum(rng.random(n_rows, dtype=np.float32) * sizes, sizes - 1)
+            codes[:, col] = lookup[offsets[group] + draw.astype(np.int64)]
+        return codes
+
+    def chunks(self, n_rows, chunksize):
+        # Chunk k draws from its own stream, so the output only depends on the seed and chunksize
+        for index, start in enumerate(range(0, n_rows, chunksize)):
+            rng = np.random.default_rng([self.config.seed, index])
+            yield self.sample_codes(min(chunksize, n_rows - start), rng)
+
+    def to_arrow(self, codes):
+        import pyarrow as pa
+
+        arrays = []
+        for col, values in enumerate(self.categories):
+            missing = codes[:, col] == values.index(None) if None in values else None
+            dictionary = pa.array([value for value in values if value is not None], type=pa.string())
+            indices = np.where(missing, 0, codes[:, col]) if missing is not None else codes[:, col]
+            arrays.append(pa.DictionaryArray.from_arrays(pa.array(indices, mask=missing), dictionary))
+        return pa.Table.from_arrays(arrays, names=self.columns)
+
+    def write_csv(self, chunks, output_path):
+        import pyarrow.csv as pa_csv
+
+        with open(output_path, "wb") as f:
+            # Header written by hand and values left unquoted like the raw file, unless
+            # some category needs quoting (Arrow then quotes every string)
+            f.write((",".join(self.columns) + "\n").encode())
+            needs_quotes = any(value is not None and any(char in value for char in ',"\r\n')
+                               for values in self.categories for value in values)
+            options = pa_csv.WriteOptions(include_header=False, quoting_style="needed" if needs_quotes else "none")
+            for codes in chunks:
+                pa_csv.write_csv(self.to_arrow(codes), f, options)
+
+    def write_parquet(self, chunks, output_path):
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for codes in chunks:
+                table = self.to_arrow(codes)
+                writer = writer or pq.ParquetWriter(output_path, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def generate(self, n_rows=None, output_path=None, chunksize=None):
+        n_rows = n_rows or self.config.n_rows
+        output_path = Path(output_path or self.config.output_path)
+        chunksize = chunksize or self.config.chunksize
+        writers = {".csv": self.write_csv, ".parquet": self.write_parquet}
+        if output_path.suffix not in writers:
+            raise ValueError(f"Unsupported output format: {output_path.suffix}")
+        if self.tables is None:
+            self.fit()
+        os.makedirs(output_path.parent, exist_ok=True)
+
+        start = time.perf_counter()
+        writers[output_path.suffix](self.chunks(n_rows, chunksize), output_path)
+        seconds = time.perf_counter() - start
+        logger.info(f"Generated {n_rows} rows to {output_path} in {seconds:.1f}s "
+                    f"({n_rows / max(seconds, 1e-9):,.0f} rows/s)")
+        return output_path
@@ -0,0 +1,151 @@
+import json
+import numpy as np
+
+COMPILED_MODEL_FILE = "rta_model.npz"
+ENCODER_FILE = "encoder.json"
+
+
+class TreeEnsemble:
+    # A softprob XGBoost booster as flat node arrays. All trees are laid end to end:
+    # roots[t] is the first node of tree t and the right child of a node always
+    # follows its left child. Leaves point back at themselves with an infinite
+    # threshold, so a fixed number of steps walks every tree of a batch to its leaf.
+    def __init__(self, feature, threshold, left, default_left, value, roots, tree_class,
+                 base_margin, max_depth, chunk_size=1024):
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float32)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.default_left = np.asarray(default_left, dtype=bool)
+        self.value = np.asarray(value, dtype=np.float32)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.tree_class = np.asarray(tree_class, dtype=np.int32)
+        self.base_margin = np.asarray(base_margin, dtype=np.float32)
+        self.max_depth = int(max_depth)
+        self.chunk_size = chunk_size
+
+        self.n_classes = len(self.base_margin)
+        self.classes_ = np.arange(self.n_classes)
+        self.class_matrix = np.eye(self.n_classes, dtype=np.float32)[self.tree_class]
+        self.n_features_in_ = int(self.feature.max()) + 1 if len(self.feature) else 0
+
+    @classmethod
+    def from_booster(cls, booster, iteration_range=None, probe=None):
+        model = json.loads(booster.save_raw("json"))
+        learner = model["learner"]
+        if learner["objective"]["name"] != "multi:softprob":
+            raise ValueError(f"Only multi:softprob boosters can be compiled, got {learner['objective']['name']}")
+
+        trees_model = learner["gradient_booster"]["model"]
+        indptr = trees_model["iteration_indptr"]
+        start, stop = iteration_range or (0, len(indptr) - 1)
+        trees = trees_model["trees"][indptr[start]:indptr[stop]]
+        tree_class = trees_model["tree_info"][indptr[start]:indptr[stop]]
+
+        feature, threshold, left, default_left, value, roots = [], [], [], [], [], []
+        max_depth = 0
+        for tree in trees:
+            if any(tree["split_type"]):
+                raise ValueError("Categorical splits cannot be compiled, train with enable_categorical: false")
+
+            offset = len(feature)
+            roots.append(offset)
+            lefts = np.asarray(tree["left_children"])
+            rights = np.asarray(tree["right_children"])
+            is_leaf = lefts == -1
+            nodes = np.arange(len(lefts))
+            if (rights[~is_leaf] != lefts[~is_leaf] + 1).any():
+                raise ValueError("Expected the right child of every node to follow its left child")
+
+            feature.extend(np.where(is_leaf, 0, tree["split_indices"]))
+            threshold.extend(np.where(is_leaf, np.inf, tree["split_conditions"]))
+            left.extend(np.where(is_leaf, nodes, lefts) + offset)
+            default_left.extend(np.where(is_leaf, 1, tree["default_left"]))
+            # split_conditions holds the leaf weight on leaf nodes
+            value.extend(np.where(is_leaf, tree["split_conditions"], 0.0))
+
+            depth = np.zeros(len(lefts), dtype=np.int32)
+            for node in nodes:
+                if not is_leaf[node]:
+                    depth[lefts[node]] = depth[rights[node]] = depth[node] + 1
+            max_depth = max(max_depth, int(depth.max()))
+
+        n_classes = int(learner["learner_model_param"]["num_class"])
+        ensemble = cls(feature, threshold, left, default_left, value, roots, tree_class,
+                       np.zeros(n_classes), max_depth)
+
+        # The intercept encoding differs between xgboost versions, so read it off the
+        # booster: its raw margins minus the summed leaves of the compiled trees
+        import xgboost as xgb
+
+        if probe is None:
+            probe = np.zeros((1, int(learner["learner_model_param"]["num_feature"])), dtype=np.float32)
+        dmatrix = xgb.DMatrix(probe, feature_names=booster.feature_names)
+        margin = booster.predict(dmatrix, output_margin=True, iteration_range=(start, stop))
+        ensemble.base_margin = (margin - ensemble.predict_margin(probe)).mean(axis=0).astype(np.float32)
+        return ensemble
+
+    @classmethod
+    def from_model(cls, model, probe=None):
+        # Same trees XGBClassifier.predict_proba uses, up to the early stopped round if any
+        booster = model.get_booster()
+        iteration_range = None
+        best_iteration = booster.attr("best_iteration")
+        if best_iteration is not None:
+            iteration_range = (0, int(best_iteration) + 1)
+        return cls.from_booster(booster, iteration_range=iteration_range, probe=probe)
+
+    def _leaf_values(self, X):
+        n_rows, n_features = X.shape
+        node = np.broadcast_to(self.roots, (n_rows, len(self.roots))).copy()
+        # Gather from the raveled batch, row offsets are added once instead of per step
+        flat = X.ravel()
+        row_offsets = (np.arange(n_rows, dtype=np.int32) * n_features)[:, None]
+        has_nan = np.isnan(flat).any()
+
+        for _ in range(self.max_depth):
+            values = flat[row_offsets + self.feature[node]]
+            go_right = values >= self.threshold[node]
+            if has_nan:
+                go_right = np.where(np.isnan(values), ~self.default_left[node], go_right)
+            node = self.left[node] + go_right
+
+        return self.value[node]
+
+    def predict_margin(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2:
+            raise ValueError(f"Expected a 2-D array, got shape {X.shape}")
+
+        margin = np.empty((len(X), self.n_classes), dtype=np.float32)
+        for start in range(0, len(X), self.chunk_size):
+            leaves = self._leaf_values(X[start:start + self.chunk_size])
+            margin[start:start + len(leaves)] = leaves @ self.class_matrix + self.base_margin
+        return margin
+
+    def predict_proba(self, X):
+        margin = self.predict_margin(X)
+        margin -= margin.max(axis=1, keepdims=True)
+        np.exp(margin, out=margin)
+        margin /= margin.sum(axis=1, keepdims=True)
+        return margin
+
+    def predict(self, X):
+        return self.predict_proba(X).argmax(axis=1)
+
+    def verify(self, model, X, atol=1e-5):
+        expected = model.predict_proba(X)
+        actual = self.predict_proba(X)
+        error = float(np.abs(expected - actual).max()) if len(X) else 0.0
+        if error > atol:
+            raise ValueError(f"Compiled model differs from the booster by {error:.2e} (> {atol:.0e})")
+        return error
+
+    def save(self, path):
+        np.savez(path, feature=self.feature, threshold=self.threshold, left=self.left,
+                 default_left=self.default_left, value=self.value, roots=self.roots, tree_class=self.tree_class,
+                 base_margin=self.base_margin, max_depth=self.max_depth)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            return cls(**{name: arrays[name] for name in arrays.files})
@@ -1,10 +1,22 @@
 
 from accident_severity.constants import * 
-from accident_severity.utils.common import read_yaml, create_directories
+from accident_severity.utils.common import read_yaml, create_directories, ARTIFACT_FORMATS
 from accident_severity.entity.config_entity import (DataIngestionConfig,
                                                     DataTransformationConfig,
                                                     ModelTrainerConfig,
-                                                    ModelEvaluationConfig)
+                                                    IncrementalTrainingConfig,
+                                                    ModelTuningConfig,
+                                                    ModelEvaluationConfig,
+                                                    CrossValidationConfig,
+                                                    PredictionTableConfig,
+                                                    ModelExportConfig,
+                                                    ModelRegistryConfig,
+                                                    SyntheticDataConfig,
+                                                    LoggingConfig,
+                                                    InstrumentationConfig,
+                                                    BatchScoringConfig,
+                                                    ServingConfig,
+                                                    StageCacheConfig)
 
 class ConfigurationManager:
     def __init__(
@@ -19,6 +31,24 @@ class ConfigurationManager:
 
         create_directories([self.config.artifacts_root])
 
+    def artifact_path(self, path) -> Path:
+        # Stage data paths are configured without extension, see artifact_format
+        return Path(str(path) + ARTIFACT_FORMATS[self.config.artifact_format])
+
+    def get_stage_cache_config(self) -> StageCacheConfig:
+        config = self.config.stage_cache
+
+        create_directories([config.root_dir])
+
+        stage_cache_config = StageCacheConfig(
+            root_dir=config.root_dir,
+            manifest_path=config.manifest_path,
+            keep=config.keep
+        )
+
+        return stage_cache_config
+
+
     def get_data_ingestion_config(self) -> DataIngestionConfig:
         config = self.config.data_ingestion 
 
@@ -28,7 +58,12 @@ class ConfigurationManager:
             root_dir=config.root_dir,
             source_url=config.source_url,
             local_data_file=config.local_data_file,
-            unzip_dir=config.unzip_dir
+            unzip_dir=config.unzip_dir,
+            sha256=config.sha256,
+            chunk_size=config.chunk_size,
+            timeout=config.timeout,
+            max_retries=config.max_retries,
+            extract_zip=config.extract_zip
         )
 
         return data_ingestion_config
@@ -36,13 +71,29 @@ class ConfigurationManager:
 
     def get_data_transformation_config(self)-> DataTransformationConfig:
         config = self.config.data_transformation
+        schema = self.schema
+        params = self.params.train_test_split
+        ingestion = self.config.data_ingestion
 
         create_directories([config.root_dir])
 
         data_transformation_config = DataTransformationConfig(
             root_dir=config.root_dir,
             data_path=config.data_path,
-            preprocessor_path=config.preprocessor_path
+            # Read straight from the archive when the ingestion stage leaves it packed
+            zip_path=None if ingestion.extract_zip else ingestion.local_data_file,
+            zip_member=config.zip_member,
+            preprocessor_path=config.preprocessor_path,
+            artifact_format=self.config.artifact_format,
+            column_mapping=dict(schema.COLUMNS),
+            feature_columns=list(schema.FEATURES),
+            target_column=schema.TARGET_COLUMN.name,
+            target_mapping=dict(schema.TARGET_MAPPING),
+            test_size=params.test_size,
+            random_state=params.random_state,
+            validation_size=params.validation_size,
+            resampling_strategy=self.params.resampling.strategy,
+            k_neighbors=self.params.resampling.k_neighbors
         )
         
         return data_transformation_config
@@ -57,18 +108,85 @@ class ConfigurationManager:
 
         model_trainer_config = ModelTrainerConfig(
             root_dir=config.root_dir,
-            train_data_path=config.train_data_path,
-            test_data_path=config.test_data_path,
+            train_data_path=self.artifact_path(config.train_data_path),
+            test_data_path=self.artifact_path(config.test_data_path),
+            validation_data_path=self.artifact_path(config.validation_data_path),
             model_name=config.model_name,
             n_estimators=params.n_estimators,
             max_depth=params.max_depth,
             learning_rate=params.learning_rate,
-            target_column=schema.name
+            tree_method=params.tree_method,
+            n_jobs=params.n_jobs,
+            max_bin=params.max_bin,
+            enable_categorical=params.enable_categorical,
+            early_stopping_rounds=params.early_stopping_rounds,
+            target_column=schema.name,
+            resampling_strategy=self.params.resampling.strategy,
+            report_name=config.report_name,
+            tuned_params_path=self.config.model_tuning.best_params_path if self.params.tuning.enabled else None,
+            candidates=[candidate.to_dict() for candidate in self.params.candidates.models],
+            n_workers=self.params.candidates.n_workers,
+            selection_metric=self.params.candidates.selection_metric,
+            leaderboard_name=config.leaderboard_name
         )
 
         return model_trainer_config
 
 
+    def get_incremental_training_config(self) -> IncrementalTrainingConfig:
+        config = self.config.model_trainer
+        params = self.params.incremental
+
+        create_directories([config.root_dir])
+
+        incremental_training_config = IncrementalTrainingConfig(
+            root_dir=config.root_dir,
+            model_path=Path(config.root_dir, config.model_name),
+            preprocessor_path=self.config.data_transformation.preprocessor_path,
+            test_data_path=self.artifact_path(config.test_data_path),
+            lineage_name=config.lineage_name,
+            report_name=config.incremental_report_name,
+            column_mapping=dict(self.schema.COLUMNS),
+            feature_columns=list(self.schema.FEATURES),
+            target_column=self.schema.TARGET_COLUMN.name,
+            target_mapping=dict(self.schema.TARGET_MAPPING),
+            n_rounds=params.n_rounds,
+            learning_rate=params.learning_rate,
+            n_jobs=self.params.XGBClassifier.n_jobs,
+            unknown_categories=params.unknown_categories,
+            max_regression=params.max_regression,
+            selection_metric=self.params.candidates.selection_metric
+        )
+
+        return incremental_training_config
+
+
+    def get_model_tuning_config(self) -> ModelTuningConfig:
+        config = self.config.model_tuning
+        params = self.params.tuning
+
+        create_directories([config.root_dir])
+
+        model_tuning_config = ModelTuningConfig(
+            root_dir=config.root_dir,
+            storage_path=config.storage_path,
+            study_name=config.study_name,
+            best_params_path=config.best_params_path,
+            report_name=config.report_name,
+            enabled=params.enabled,
+            n_trials=params.n_trials,
+            n_workers=params.n_workers,
+            timeout=params.timeout,
+            early_stopping_rounds=params.early_stopping_rounds,
+            seed=params.seed,
+            n_startup_trials=params.pruner.n_startup_trials,
+            n_warmup_steps=params.pruner.n_warmup_steps,
+            search_space=params.search_space.to_dict()
+        )
+
+        return model_tuning_config
+
+
     def get_model_evaluation_config(self) -> ModelEvaluationConfig:
         config = self.config.model_evaluation 
         params = self.params.XGBClassifier
@@ -78,7 +196,7 @@ class ConfigurationManager:
 
         model_evaluation_config = ModelEvaluationConfig(
             root_dir=config.root_dir,
-            test_data_path=config.test_data_path,
+            test_data_path=self.artifact_path(config.test_data_path),
             model_path=config.model_path,
             all_params=params,
             metric_file_name=config.metric_file_name,
@@ -86,4 +204,176 @@ class ConfigurationManager:
             model_name=config.model_name
         )
 
-        return model_evaluation_config  
\ No newline at end of file
+        return model_evaluation_config
+
+
+    def get_cross_validation_config(self) -> CrossValidationConfig:
+        config = self.config.cross_validation
+        params = self.params.cross_validation
+
+        create_directories([config.root_dir])
+
+        cross_validation_config = CrossValidationConfig(
+            root_dir=config.root_dir,
+            data_paths=[self.artifact_path(path) for path in config.data_paths],
+            metric_file_name=config.metric_file_name,
+            target_column=self.schema.TARGET_COLUMN.name,
+            n_splits=params.n_splits,
+            n_workers=params.n_workers,
+            random_state=self.params.train_test_split.random_state,
+            resampling_strategy=self.params.resampling.strategy,
+            k_neighbors=self.params.resampling.k_neighbors
+        )
+
+        return cross_validation_config
+
+
+    def get_prediction_table_config(self) -> PredictionTableConfig:
+        config = self.config.prediction_table
+
+        create_directories([config.root_dir])
+
+        prediction_table_config = PredictionTableConfig(
+            enabled=config.enabled,
+            root_dir=config.root_dir,
+            model_path=config.model_path,
+            preprocessor_path=config.preprocessor_path,
+            observed_data_paths=[self.artifact_path(path) for path in config.observed_data_paths],
+            prune_to_observed=config.prune_to_observed,
+            batch_size=config.batch_size
+        )
+
+        return prediction_table_config
+
+
+    def get_model_export_config(self) -> ModelExportConfig:
+        config = self.config.model_export
+
+        create_directories([config.root_dir])
+
+        model_export_config = ModelExportConfig(
+            root_dir=config.root_dir,
+            model_path=config.model_path,
+            preprocessor_path=config.preprocessor_path,
+            verify_data_path=self.artifact_path(config.verify_data_path),
+            target_column=self.schema.TARGET_COLUMN.name,
+            atol=config.atol,
+            report_name=config.report_name
+        )
+
+        return model_export_config
+
+
+    def get_model_registry_config(self) -> ModelRegistryConfig:
+        config = self.config.model_registry
+
+        create_directories([config.root_dir])
+
+        model_registry_config = ModelRegistryConfig(
+            root_dir=config.root_dir,
+            model_path=config.model_path,
+            preprocessor_path=config.preprocessor_path,
+            metrics_path=config.metrics_path,
+            feature_columns=list(self.schema.FEATURES),
+            target_mapping=dict(self.schema.TARGET_MAPPING),
+            promote=config.promote,
+            package_codec=config.package_codec,
+            package_level=config.package_level,
+            keep=config.keep
+        )
+
+        return model_registry_config
+
+    def get_synthetic_data_config(self) -> SyntheticDataConfig:
+        config = self.config.synthetic_data
+
+        create_directories([config.root_dir])
+
+        synthetic_data_config = SyntheticDataConfig(
+            root_dir=config.root_dir,
+            source_path=config.source_path,
+            output_path=config.output_path,
+            column_mapping=dict(self.schema.COLUMNS),
+            feature_columns=list(self.schema.FEATURES),
+            target_column=self.schema.TARGET_COLUMN.name,
+            columns=config.columns,
+            dependencies=config.dependencies,
+            n_rows=config.n_rows,
+            chunksize=config.chunksize,
+            seed=config.seed
+        )
+
+        return synthetic_data_config
+
+
+    def get_logging_config(self) -> LoggingConfig:
+        config = self.config.logging
+
+        logging_config = LoggingConfig(
+            log_dir=config.log_dir,
+            file_name=config.file_name,
+            level=config.level,
+            max_bytes=config.max_bytes,
+            backup_count=config.backup_count,
+            queue_size=config.queue_size,
+            console=config.console,
+            prediction_sample_rate=config.prediction_sample_rate
+        )
+
+        return logging_config
+
+    def get_instrumentation_config(self) -> InstrumentationConfig:
+        config = self.config.instrumentation
+
+        instrumentation_config = InstrumentationConfig(
+            enabled=config.enabled,
+            root_dir=config.root_dir,
+            prometheus_file=config.prometheus_file,
+            profile=config.profile,
+            profile_dir=config.profile_dir,
+            sample_interval_ms=config.sample_interval_ms
+        )
+
+        return instrumentation_config
+
+
+    def get_batch_scoring_config(self) -> BatchScoringConfig:
+        config = self.config.batch_scoring
+
+        create_directories([config.root_dir])
+
+        batch_scoring_config = BatchScoringConfig(
+            root_dir=config.root_dir,
+            model_path=config.model_path,
+            preprocessor_path=config.preprocessor_path,
+            chunksize=config.chunksize,
+            unknown_value=config.unknown_value,
+            n_workers=config.n_workers,
+            column_mapping=dict(self.schema.COLUMNS),
+            feature_columns=list(self.schema.FEATURES),
+            target_mapping=dict(self.schema.TARGET_MAPPING),
+            compiled_dir=config.compiled_dir
+        )
+
+        return batch_scoring_config
+
+
+    def get_serving_config(self) -> ServingConfig:
+        config = self.config.serving
+
+        serving_config = ServingConfig(
+            model_path=config.model_path,
+            preprocessor_path=config.preprocessor_path,
+            unknown_value=config.unknown_value,
+            host=config.host,
+            port=config.port,
+            max_batch_size=config.max_batch_size,
+            max_wait_ms=config.max_wait_ms,
+            target_mapping=dict(self.schema.TARGET_MAPPING),
+            compiled_dir=config.compiled_dir,
+            registry_dir=config.registry_dir,
+            registry_poll_s=config.registry_poll_s,
+            warmup_rows=config.warmup_rows
+        )
+
+        return serving_config
@@ -1,6 +1,6 @@
 import os, sys
 from pathlib import Path 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
  
 
 @dataclass(frozen=True)
@@ -9,13 +9,30 @@ class DataIngestionConfig:
     source_url: str 
     local_data_file: Path 
     unzip_dir: Path
+    sha256: str
+    chunk_size: int
+    timeout: float
+    max_retries: int
+    extract_zip: bool
 
 
 @dataclass(frozen=True)
 class DataTransformationConfig:
     root_dir: Path 
     data_path: Path
+    zip_path: Path
+    zip_member: str
     preprocessor_path: Path
+    artifact_format: str
+    column_mapping: dict
+    feature_columns: list
+    target_column: str
+    target_mapping: dict
+    test_size: float
+    random_state: int
+    validation_size: float
+    resampling_strategy: str
+    k_neighbors: int
 
 
 @dataclass(frozen=True)
@@ -23,11 +40,62 @@ class ModelTrainerConfig:
     root_dir: Path 
     train_data_path: Path 
     test_data_path: Path 
+    validation_data_path: Path
     model_name: str 
     n_estimators: int
     max_depth: int 
     learning_rate: float
+    tree_method: str
+    n_jobs: int
+    max_bin: int
+    enable_categorical: bool
+    early_stopping_rounds: int
     target_column: str
+    resampling_strategy: str
+    report_name: str
+    tuned_params_path: Path
+    candidates: list
+    n_workers: int
+    selection_metric: str
+    leaderboard_name: str
+
+
+@dataclass(frozen=True)
+class IncrementalTrainingConfig:
+    root_dir: Path
+    model_path: Path
+    preprocessor_path: Path
+    test_data_path: Path
+    lineage_name: str
+    report_name: str
+    column_mapping: dict
+    feature_columns: list
+    target_column: str
+    target_mapping: dict
+    n_rounds: int
+    learning_rate: float
+    n_jobs: int
+    unknown_categories: str
+    max_regression: float
+    selection_metric: str
+
+
+@dataclass(frozen=True)
+class ModelTuningConfig:
+    root_dir: Path
+    storage_path: Path
+    study_name: str
+    best_params_path: Path
+    report_name: str
+    enabled: bool
+    n_trials: int
+    n_workers: int
+    timeout: float
+    early_stopping_rounds: int
+    seed: int
+    n_startup_trials: int
+    n_warmup_steps: int
+    search_space: dict
 
 
 @dataclass(frozen=True)
@@ -39,3 +107,136 @@ class ModelEvaluationConfig:
     metric_file_name: Path 
     target_column: str
     model_name: Path
+
+
+@dataclass(frozen=True)
+class CrossValidationConfig:
+    root_dir: Path
+    data_paths: list
+    metric_file_name: Path
+    target_column: str
+    n_splits: int
+    n_workers: int
+    random_state: int
+    resampling_strategy: str
+    k_neighbors: int
+
+
+@dataclass(frozen=True)
+class PredictionTableConfig:
+    enabled: bool
+    root_dir: Path
+    model_path: Path
+    preprocessor_path: Path
+    observed_data_paths: list
+    prune_to_observed: bool
+    batch_size: int
+
+
+@dataclass(frozen=True)
+class ModelExportConfig:
+    root_dir: Path
+    model_path: Path
+    preprocessor_path: Path
+    verify_data_path: Path
+    target_column: str
+    atol: float
+    report_name: str
+
+
+@dataclass(frozen=True)
+class ModelRegistryConfig:
+    root_dir: Path
+    model_path: Path
+    preprocessor_path: Path
+    metrics_path: Path
+    feature_columns: list
+    target_mapping: dict
+    promote: bool
+    package_codec: str
+    package_level: int
+    keep: int
+
+
+@dataclass(frozen=True)
+class SyntheticDataConfig:
+    root_dir: Path
+    source_path: Path
+    output_path: Path
+    column_mapping: dict
+    feature_columns: list
+    target_column: str
+    columns: str
+    dependencies: str
+    n_rows: int
+    chunksize: int
+    seed: int
+
+
+@dataclass(frozen=True)
+class LoggingConfig:
+    log_dir: Path
+    file_name: str
+    level: str
+    max_bytes: int
+    backup_count: int
+    queue_size: int
+    console: bool
+    prediction_sample_rate: float
+
+
+@dataclass(frozen=True)
+class InstrumentationConfig:
+    enabled: bool
+    root_dir: Path
+    prometheus_file: str
+    profile: str
+    profile_dir: Path
+    sample_interval_ms: float
+
+
+@dataclass(frozen=True)
+class BatchScoringConfig:
+    root_dir: Path
+    model_path: Path
+    preprocessor_path: Path
+    chunksize: int
+    unknown_value: str
+    n_workers: int
+    column_mapping: dict
+    feature_columns: list
+    target_mapping: dict
+    compiled_dir: Path
+
+
+@dataclass(frozen=True)
+class ServingConfig:
+    model_path: Path
+    preprocessor_path: Path
+    unknown_value: str
+    host: str
+    port: int
+    max_batch_size: int
+    max_wait_ms: float
+    target_mapping: dict
+    compiled_dir: Path
+    registry_dir: Path
+    registry_poll_s: float
+    warmup_rows: int
+
+
+@dataclass(frozen=True)
+class StageCacheConfig:
+    root_dir: Path
+    manifest_path: Path
+    keep: int
+
+
+@dataclass(frozen=True)
+class StageSpec:
+    files: list = field(default_factory=list)
+    config_sections: list = field(default_factory=list)
+    params_sections: list = field(default_factory=list)
+    schema_sections: list = field(default_factory=list)
+    modules: list = field(default_factory=list)
+    outputs: list = field(default_factory=list)
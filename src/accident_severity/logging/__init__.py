@@ -1,22 +1,258 @@
 import os
 import sys
-import logging 
+import copy
+import json
+import uuid
+import queue
+import atexit
+import random
+import logging
+import threading
+import logging.handlers
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from accident_severity.entity.config_entity import LoggingConfig
 
-logging_str = "[{asctime}s: %(levelname)s: %(module)s: %(message)s]"
+logging_str = "[%(asctime)s: %(levelname)s: %(module)s: %(message)s]"
 
-log_dir = "logs"
-log_filepath = os.path.join(log_dir, "running_logs.log")
-os.makedirs(log_dir, exist_ok=True)
+DEFAULT_CONFIG = LoggingConfig(log_dir="logs", file_name="running_logs.log", level="INFO", max_bytes=10 * 2 ** 20,
+                               backup_count=5, queue_size=10000, console=True, prediction_sample_rate=0.01)
 
+# Shared by every process of a run: forked workers inherit it and child
+# processes can be given it through the environment
+_run_id = os.environ.get("ACCIDENT_SEVERITY_RUN_ID") or uuid.uuid4().hex[:12]
+_stage = contextvars.ContextVar("log_stage", default=None)
+_request_id = contextvars.ContextVar("log_request_id", default=None)
 
-logging.basicConfig(
-    level=logging.INFO,
-    format=logging_str,
 
-    handlers=[
-        logging.FileHandler(log_filepath),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+def run_id():
+    return _run_id
 
-logger = logging.getLogger("Logger")
\ No newline at end of file
+
+@contextmanager
+def log_context(stage=None, request_id=None):
+    tokens = [(var, var.set(value)) for var, value in ((_stage, stage), (_request_id, request_id)) if value is not None]
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    # Runs on the logging thread, before the record is queued, so the ids are the caller's
+    def filter(self, record):
+        record.run_id = _run_id
+        record.stage = _stage.get()
+        record.request_id = _request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    # Keeps a random fraction of INFO and DEBUG records, everything from WARNING up
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "message": record.getMessage(),
+            "run_id": getattr(record, "run_id", None),
+            "stage": getattr(record, "stage", None),
+            "request_id": getattr(record, "request_id", None),
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        # Structured payload: logger.info("...", extra={"fields": {...}})
+        data.update(getattr(record, "fields", None) or {})
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        return json.dumps(data, default=str)
+
+
+class LazyRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    # Neither the log directory nor the file is created until the first record is written
+    def __init__(self, filename, max_bytes, backup_count):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, delay=True)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename) or ".", exist_ok=True)
+        return super()._open()
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    # The calling thread only formats the message and puts the record on the queue;
+    # file and console I/O happen on the listener thread. A full queue drops the record
+    # instead of blocking the caller.
+    def __init__(self, log_queue, max_size):
+        super().__init__(log_queue)
+        self.max_size = max_size
+        self.dropped = 0
+
+    def handle(self, record):
+        # SimpleQueue.put is thread safe, the handler lock is not needed
+        if self.filter(record):
+            self.emit(record)
+            return True
+        return False
+
+    def prepare(self, record):
+        # A copy, as in QueueHandler.prepare, so handlers that see the record later
+        # still get its args and traceback. Unlike QueueHandler.prepare the traceback
+        # is kept apart from the message for the JSON formatter
+        record = copy.copy(record)
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self.queue.qsize() >= self.max_size:
+            self.dropped += 1
+        else:
+            self.queue.put_nowait(record)
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    # Drains the queue every flush_interval seconds instead of blocking on it, so
+    # logging a record never wakes the writer thread and its I/O is done in batches
+    def __init__(self, log_queue, *handlers, flush_interval=0.05):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.flush_interval = flush_interval
+        self.stopping = threading.Event()
+
+    def _monitor(self):
+        while not self.stopping.wait(self.flush_interval):
+            self.drain()
+        self.drain()
+
+    def drain(self):
+        while True:
+            try:
+                record = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            self.handle(record)
+
+    def stop(self):
+        if self._thread is not None:
+            self.stopping.set()
+            self._thread.join()
+            self._thread = None
+
+
+class AsyncLogging:
+    def __init__(self, config: LoggingConfig):
+        self.config = config
+        self.path = os.path.join(config.log_dir, config.file_name)
+        self.handlers = [LazyRotatingFileHandler(self.path, config.max_bytes, config.backup_count)]
+        self.handlers[0].setFormatter(JsonFormatter())
+
+        # The console stays on the calling thread, so log lines and the caller's own
+        # prints reach stdout in the order they were made
+        self.console = None
+        if config.console:
+            self.console = logging.StreamHandler(sys.stdout)
+            self.console.setFormatter(logging.Formatter(logging_str))
+
+        self.queue_handler = DroppingQueueHandler(queue.SimpleQueue(), config.queue_size)
+        self.queue_handler.addFilter(ContextFilter())
+        self.file_handler = self.queue_handler
+        self.start()
+
+    def start(self):
+        self.listener = BatchingQueueListener(self.queue_handler.queue, *self.handlers)
+        self.listener.start()
+
+    def install(self, root):
+        if self.console is not None:
+            root.addHandler(self.console)
+        root.addHandler(self.file_handler)
+
+    def uninstall(self, root):
+        for handler in (self.console, self.file_handler):
+            if handler is not None:
+                root.removeHandler(handler)
+
+    def after_fork(self):
+        # The writer thread does not survive fork, and multiprocessing workers exit
+        # through os._exit, past atexit, so a queue in the child would lose its records.
+        # Forked children append to the log file synchronously and leave rotation to
+        # the parent, the only process renaming the file
+        root = logging.getLogger()
+        root.removeHandler(self.file_handler)
+        self.listener = None
+        self.file_handler = LazyRotatingFileHandler(self.path, 0, 0)
+        self.file_handler.setFormatter(JsonFormatter())
+        self.file_handler.addFilter(ContextFilter())
+        self.handlers = [self.file_handler]
+        root.addHandler(self.file_handler)
+
+    def stop(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        for handler in self.handlers:
+            handler.close()
+        if self.queue_handler.dropped:
+            sys.stderr.write(f"accident_severity.logging: dropped {self.queue_handler.dropped} records, "
+                             f"the log queue was full\n")
+
+
+_backend = None
+
+
+def configure(config: LoggingConfig = None):
+    global _backend
+    config = config or DEFAULT_CONFIG
+    root = logging.getLogger()
+    if _backend is not None:
+        _backend.uninstall(root)
+        _backend.stop()
+
+    _backend = AsyncLogging(config)
+    _backend.install(root)
+    root.setLevel(config.level)
+    prediction_logger.filters = [SamplingFilter(config.prediction_sample_rate)]
+    return _backend
+
+
+def stop():
+    # Writes out the queued records and removes the handlers, until configure is called again
+    global _backend
+    if _backend is not None:
+        _backend.uninstall(logging.getLogger())
+        _backend.stop()
+        _backend = None
+
+
+def _after_fork():
+    if _backend is not None:
+        _backend.after_fork()
+
+
+logger = logging.getLogger("Logger")
+# High-volume per-request records, sampled with logging.prediction_sample_rate
+prediction_logger = logging.getLogger("accident_severity.predictions")
+
+# Nothing is started on import: the entry points (main.py, the CLI, the stage
+# scripts and app.py) call configure, before which only warnings reach stderr.
+# stop runs before logging.shutdown (atexit is last in, first out), so queued
+# records are written out
+atexit.register(stop)
+os.register_at_fork(after_in_child=_after_fork)
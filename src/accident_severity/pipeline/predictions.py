@@ -1,17 +1,125 @@
 
-import joblib 
-import numpy as np 
-import pandas as pd 
-from pathlib import Path 
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from accident_severity.components.categorical_encoder import CategoricalLookupEncoder
+from accident_severity.components.prediction_table import PredictionTable
+from accident_severity.components.model_registry import ModelRegistry, MODEL_FILE, PREPROCESSOR_FILE, PACKAGE_DIR
+from accident_severity.components.model_package import ModelPackage, PACKAGE_FILE
+from accident_severity.components.tree_ensemble import TreeEnsemble, COMPILED_MODEL_FILE, ENCODER_FILE
+from accident_severity.utils.common import load_artifact
+from accident_severity.utils.instrumentation import instrument
 
 
 class PredictionPipeline:
-    def __init__(self):
-        self.model = joblib.load(Path('final_model/rta_model.joblib'))
+    def __init__(self, model_path=Path('final_model/rta_model.joblib'),
+                 preprocessor_path=Path('final_model/preprocessor.joblib'),
+                 unknown_value="error",
+                 table_dir=None,
+                 compiled_dir=None,
+                 package_dir=None):
+        if table_dir is not None and (compiled_dir is not None or package_dir is not None):
+            # The table is checked against the joblib files, not against the model that would serve
+            raise ValueError("table_dir is checked against model_path and preprocessor_path, "
+                             "it cannot be combined with compiled_dir or package_dir")
+        if package_dir is not None:
+            # UBJSON booster and .npy category arrays, the sklearn preprocessor is not unpickled
+            self.model = load_artifact(Path(package_dir, PACKAGE_FILE), loader=ModelPackage.load_model)
+            self.preprocessor = None
+            self.encoder = ModelPackage.load_encoder(package_dir, unknown_value=unknown_value)
+        elif compiled_dir is not None:
+            # Exported NumPy trees and encoder, neither xgboost nor sklearn gets imported
+            self.model = load_artifact(Path(compiled_dir, COMPILED_MODEL_FILE), loader=TreeEnsemble.load)
+            self.preprocessor = None
+            self.encoder = CategoricalLookupEncoder.load(Path(compiled_dir, ENCODER_FILE), unknown_value=unknown_value)
+        else:
+            self.model = load_artifact(model_path)
+            self.preprocessor = load_artifact(preprocessor_path)
+            self.encoder = CategoricalLookupEncoder.from_preprocessor(self.preprocessor, unknown_value=unknown_value)
+        self.feature_columns = self.encoder.feature_columns
+        self.table = None
+        if table_dir is not None:
+            self.table = PredictionTable.load(table_dir, sources={"model": model_path,
+                                                                  "preprocessor": preprocessor_path})
+        self.version = None
 
+    @classmethod
+    def from_registry(cls, registry_dir, version=None, **kwargs):
+        # The promoted version unless one is asked for
+        registry = ModelRegistry(registry_dir)
+        version = version or registry.current()
+        if version is None:
+            raise ValueError(f"No model version has been promoted in {registry_dir}")
+        path = registry.path(version)
+        # A prediction table is checked against the joblib files, so it is served with them
+        package_dir = None
+        if kwargs.get("table_dir") is None and (path / PACKAGE_DIR / PACKAGE_FILE).exists():
+            package_dir = path / PACKAGE_DIR
+        pipeline = cls(model_path=path / MODEL_FILE, preprocessor_path=path / PREPROCESSOR_FILE,
+                       package_dir=package_dir, **kwargs)
+        pipeline.version = version
+        return pipeline
 
+
+    @instrument("prediction_pipeline.predict", hot=True)
     def predict(self, data):
         prediction = self.model.predict(data)
 
 
-        return prediction
\ No newline at end of file
+        return prediction
+
+    def to_array(self, records):
+        # Accept a DataFrame, a list of dicts or a 2-D array of raw categories
+        if isinstance(records, pd.DataFrame):
+            missing = set(self.feature_columns) - set(records.columns)
+            if missing:
+                raise ValueError(f"Missing feature columns: {sorted(missing)}")
+            return records[self.feature_columns].to_numpy(dtype=object)
+
+        if isinstance(records, dict):
+            records = [records]
+        if not isinstance(records, (list, tuple, np.ndarray)):
+            raise ValueError(f"Expected a record, a list of records or a 2-D array, got {type(records).__name__}")
+        if len(records) == 0:
+            return np.empty((0, len(self.feature_columns)), dtype=object)
+
+        if len(records) and isinstance(records[0], dict):
+            # Every feature key is required, a null value is imputed like a missing cell
+            try:
+                return np.array([[record[col] for col in self.feature_columns] for record in records], dtype=object)
+            except (KeyError, TypeError):
+                for i, record in enumerate(records):
+                    if not isinstance(record, dict):
+                        raise ValueError(f"Record {i} is a {type(record).__name__}, expected an object")
+                    missing = [col for col in self.feature_columns if col not in record]
+                    if missing:
+                        raise ValueError(f"Record {i} is missing features {missing}, send null to impute them")
+                raise
+
+        return np.asarray(records, dtype=object)
+
+    def transform_batch(self, records):
+        return self.encoder.transform(self.to_array(records))
+
+    @instrument("prediction_pipeline.predict_proba_codes", hot=True)
+    def predict_proba_codes(self, X):
+        if len(X) == 0:
+            # xgboost gets the class count wrong for zero rows, the empty result is
+            # cut from a one-row prediction so it has the model's columns and dtype
+            return self.model.predict_proba(np.zeros((1, len(self.feature_columns)), dtype=self.encoder.dtype))[:0]
+        if self.table is None:
+            return self.model.predict_proba(X)
+
+        # Answer from the precomputed table, only falling back to the model for
+        # combinations a pruned table does not hold
+        _, proba, found = self.table.lookup(X)
+        if not found.all():
+            proba[~found] = self.model.predict_proba(X[~found])
+        return proba
+
+    def predict_proba_batch(self, records):
+        return self.predict_proba_codes(self.transform_batch(records))
+
+    def predict_batch(self, records):
+        proba = self.predict_proba_batch(records)
+        return proba.argmax(axis=1)
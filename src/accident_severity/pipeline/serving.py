@@ -0,0 +1,291 @@
+
+import time
+import uuid
+import asyncio
+import logging
+import threading
+import numpy as np
+from contextlib import contextmanager
+from flask import Flask, jsonify, request
+from flask_cors import CORS
+from accident_severity.logging import logger, prediction_logger, log_context
+
+
+class MicroBatcher:
+    # Collects rows from concurrent requests on an asyncio queue running in a
+    # background thread and scores them together: a batch is flushed once it
+    # holds max_batch_size rows or max_wait_ms has passed since its first request.
+    def __init__(self, predict_fn, max_batch_size=1024, max_wait_ms=5):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self.ready = threading.Event()
+        self.thread.start()
+        self.ready.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.queue = asyncio.Queue()
+        self.batch_task = self.loop.create_task(self._batch_loop())
+        self.ready.set()
+        self.loop.run_forever()
+
+    async def _enqueue(self, rows):
+        future = self.loop.create_future()
+        await self.queue.put((rows, future))
+        return await future
+
+    async def _batch_loop(self):
+        while True:
+            items = [await self.queue.get()]
+            n_rows = len(items[0][0])
+            deadline = self.loop.time() + self.max_wait
+
+            while n_rows < self.max_batch_size:
+                timeout = deadline - self.loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                items.append(item)
+                n_rows += len(item[0])
+
+            X = np.concatenate([rows for rows, _ in items])
+            try:
+                # Scoring runs off the event loop so the next batch keeps filling up meanwhile
+                proba = await self.loop.run_in_executor(None, self.predict_fn, X)
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for rows, future in items:
+                future.set_result(proba[offset:offset + len(rows)])
+                offset += len(rows)
+
+    def submit(self, rows):
+        return asyncio.run_coroutine_threadsafe(self._enqueue(rows), self.loop)
+
+    def predict_proba(self, rows, timeout=None):
+        return self.submit(rows).result(timeout)
+
+    async def _shutdown(self):
+        self.batch_task.cancel()
+        try:
+            await self.batch_task
+        except asyncio.CancelledError:
+            pass
+        self.loop.stop()
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop)
+        self.thread.join()
+        self.loop.close()
+
+
+class Deployment:
+    # One loaded model version with its own micro-batcher, so the rows of a batch
+    # are always encoded and scored by the same version
+    def __init__(self, pipeline, batcher, version=None):
+        self.pipeline = pipeline
+        self.batcher = batcher
+        self.version = version
+        self.in_flight = 0
+
+    @classmethod
+    def load(cls, config, version=None):
+        from accident_severity.pipeline.predictions import PredictionPipeline
+
+        if version is not None:
+            pipeline = PredictionPipeline.from_registry(config.registry_dir, version,
+                                                        unknown_value=config.unknown_value)
+        else:
+            pipeline = PredictionPipeline(model_path=config.model_path,
+                                          preprocessor_path=config.preprocessor_path,
+                                          unknown_value=config.unknown_value,
+                                          compiled_dir=config.compiled_dir)
+        batcher = MicroBatcher(pipeline.predict_proba_codes,
+                               max_batch_size=config.max_batch_size,
+                               max_wait_ms=config.max_wait_ms)
+        deployment = cls(pipeline, batcher, version)
+        try:
+            deployment.warm_up(config.warmup_rows, len(config.target_mapping))
+        except Exception:
+            batcher.close()
+            raise
+        return deployment
+
+    def warm_up(self, n_rows, n_classes, seed=0):
+        # Random valid rows through the encoder, the model and the batcher, so the first
+        # real requests do not pay for lazy initialisation, and a broken model is never swapped in
+        if n_rows <= 0:
+            return
+        rng = np.random.default_rng(seed)
+        categories = self.pipeline.encoder.categories
+        records = [{col: str(cats[rng.integers(len(cats))]) for col, cats in zip(self.pipeline.feature_columns, categories)}
+                   for _ in range(n_rows)]
+        proba = self.batcher.predict_proba(self.pipeline.transform_batch(records), timeout=60)
+        if proba.shape != (n_rows, n_classes) or not np.allclose(proba.sum(axis=1), 1, atol=1e-4):
+            raise ValueError(f"Model version {self.version} failed its warm-up, "
+                             f"predicted probabilities of shape {proba.shape}")
+
+    def close(self):
+        self.batcher.close()
+
+
+class HotSwap:
+    # Requests pin the deployment that was active when they started. A swap only
+    # changes which deployment new requests get; the old one is closed once its last
+    # request has finished. The lock is held for a reference update, never for a load.
+    def __init__(self, deployment):
+        self.deployment = deployment
+        self.condition = threading.Condition()
+
+    @contextmanager
+    def acquire(self):
+        with self.condition:
+            deployment = self.deployment
+            deployment.in_flight += 1
+        try:
+            yield deployment
+        finally:
+            with self.condition:
+                deployment.in_flight -= 1
+                if deployment.in_flight == 0:
+                    self.condition.notify_all()
+
+    def swap(self, deployment):
+        with self.condition:
+            old, self.deployment = self.deployment, deployment
+        threading.Thread(target=self.retire, args=(old,), name="retire-model", daemon=True).start()
+        return old
+
+    def retire(self, deployment):
+        with self.condition:
+            self.condition.wait_for(lambda: deployment.in_flight == 0)
+        deployment.close()
+        logger.info(f"Retired model version {deployment.version}")
+
+
+class RegistryWatcher:
+    # Polls the registry's CURRENT pointer; a newly promoted version is loaded and
+    # warmed up on this thread while the active one keeps serving, then swapped in
+    def __init__(self, config, hot_swap):
+        from accident_severity.components.model_registry import ModelRegistry
+
+        self.config = config
+        self.hot_swap = hot_swap
+        self.registry = ModelRegistry(config.registry_dir)
+        self.failed = None
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="registry-watcher", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stop_event.wait(self.config.registry_poll_s):
+            self.check()
+
+    def check(self):
+        version = self.registry.current()
+        if version is None or version == self.hot_swap.deployment.version or version == self.failed:
+            return False
+        logger.info(f"Loading model version {version}")
+        start = time.perf_counter()
+        try:
+            deployment = Deployment.load(self.config, version)
+        except Exception as e:
+            # Keep serving the active version, and do not retry this one until another is promoted
+            self.failed = version
+            logger.error(f"Model version {version} could not be loaded, still serving "
+                         f"{self.hot_swap.deployment.version}: {e}")
+            return False
+        old = self.hot_swap.swap(deployment)
+        self.failed = None
+        logger.info(f"Swapped model version {old.version} for {version}, "
+                    f"loaded and warmed up in {time.perf_counter() - start:.2f}s")
+        return True
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+
+def create_app(hot_swap, target_mapping):
+    app = Flask(__name__)
+    CORS(app)
+    class_names = {code: name for name, code in target_mapping.items()}
+
+    @app.route("/health", methods=["GET"])
+    def health():
+        return jsonify({"status": "ok"})
+
+    @app.route("/model", methods=["GET"])
+    def model():
+        return jsonify({"version": hot_swap.deployment.version})
+
+    @app.route("/predict", methods=["POST"])
+    def predict():
+        request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+        with log_context(request_id=request_id), hot_swap.acquire() as deployment:
+            start = time.perf_counter()
+            payload = request.get_json(force=True)
+            records = payload.get("records", payload) if isinstance(payload, dict) else payload
+
+            # Encoding happens per request so a bad record only fails its own request;
+            # the encoded rows of all queued requests are then scored in one call
+            try:
+                codes = deployment.pipeline.transform_batch(records)
+            except ValueError as e:
+                logger.warning(f"Rejected request: {e}")
+                return jsonify({"error": str(e)}), 400, {"X-Request-ID": request_id}
+
+            proba = deployment.batcher.predict_proba(codes)
+
+            labels = proba.argmax(axis=1).tolist()
+            severity = [class_names[label] for label in labels]
+            prediction_logger.info("prediction", extra={"fields": {
+                "rows": len(labels), "severity": severity, "model_version": deployment.version,
+                "latency_ms": round((time.perf_counter() - start) * 1000, 3)}})
+            return jsonify({
+                "predictions": labels,
+                "severity": severity,
+                "probabilities": proba.astype(float).round(6).tolist(),
+                "model_version": deployment.version
+            }), 200, {"X-Request-ID": request_id}
+
+    return app
+
+
+def serve(config):
+    from werkzeug.serving import make_server
+    from accident_severity.components.model_registry import ModelRegistry
+
+    watcher = None
+    version = ModelRegistry(config.registry_dir).current() if config.registry_dir else None
+    if config.compiled_dir and config.registry_dir:
+        state = f"ignored, serving its current version {version}" if version else "used until a version is promoted"
+        logger.warning(f"compiled_dir {config.compiled_dir} is {state} from the registry {config.registry_dir}. "
+                       f"Set serving.registry_dir to null to serve the exported trees")
+    hot_swap = HotSwap(Deployment.load(config, version))
+    if config.registry_dir:
+        watcher = RegistryWatcher(config, hot_swap).start()
+
+    # Werkzeug logs every request line, keep that off the hot path
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server(config.host, config.port, create_app(hot_swap, config.target_mapping), threaded=True)
+    logger.info(f"Serving model version {version or config.model_path} on http://{config.host}:{config.port}")
+    try:
+        server.serve_forever()
+    finally:
+        if watcher is not None:
+            watcher.stop()
+        hot_swap.deployment.close()
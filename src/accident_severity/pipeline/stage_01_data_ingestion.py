@@ -1,7 +1,7 @@
 
 from accident_severity.config.configuration import ConfigurationManager
-from accident_severity.components.data_ingestion import DataIngestion
-from accident_severity.logging import logger
+from accident_severity.logging import logger, configure as configure_logging
+from accident_severity.entity.config_entity import StageSpec
 
 STAGE_NAME = "Data Ingestion Stage"
 
@@ -10,14 +10,25 @@ class DataIngestionTrainingPipeline:
         pass 
 
     def main(self):
+        from accident_severity.components.data_ingestion import DataIngestion
+
         config = ConfigurationManager()
         data_ingestion_config = config.get_data_ingestion_config()
         data_ingestion = DataIngestion(config=data_ingestion_config)
         data_ingestion.download_file()
         data_ingestion.extract_zip_file()
 
+    def cache_spec(self, config):
+        data_ingestion_config = config.get_data_ingestion_config()
+        return StageSpec(
+            config_sections=["data_ingestion"],
+            modules=["accident_severity.components.data_ingestion"],
+            outputs=[data_ingestion_config.unzip_dir]
+        )
+
 
 if __name__ == "__main__":
+    configure_logging(ConfigurationManager().get_logging_config())
     try:
         logger.info(f">>>> Stage {STAGE_NAME} Started <<<<")
         obj = DataIngestionTrainingPipeline()
@@ -1,7 +1,7 @@
 
 from accident_severity.config.configuration import ConfigurationManager
-from accident_severity.components.data_transformation import DataTransformation
-from accident_severity.logging import logger
+from accident_severity.logging import logger, configure as configure_logging
+from accident_severity.entity.config_entity import StageSpec
 
 STAGE_NAME = "Data Transformation Stage"
 
@@ -10,16 +10,33 @@ class DataTransformationTrainingPipeline:
         pass 
 
     def main(self):
+        from accident_severity.components.data_transformation import DataTransformation
+
         config = ConfigurationManager()
         data_transformation_config = config.get_data_transformation_config()
         data_transformation = DataTransformation(config=data_transformation_config)
         data_transformation.get_data_transformation()
+        data_transformation.split_data()
         data_transformation.handle_data_imbalance()
         data_transformation.save_preprocessor()
         data_transformation.train_test_split()
 
+    def cache_spec(self, config):
+        data_transformation_config = config.get_data_transformation_config()
+        return StageSpec(
+            files=[data_transformation_config.zip_path or data_transformation_config.data_path],
+            config_sections=["data_transformation", "artifact_format"],
+            params_sections=["train_test_split", "resampling"],
+            schema_sections=["COLUMNS", "FEATURES", "TARGET_COLUMN", "TARGET_MAPPING"],
+            modules=["accident_severity.components.data_transformation",
+                     "accident_severity.components.resampling",
+                     "accident_severity.utils.common"],
+            outputs=[data_transformation_config.root_dir]
+        )
+
 
 if __name__ == "__main__":
+    configure_logging(ConfigurationManager().get_logging_config())
     try:
         logger.info(f">>>> Stage {STAGE_NAME} Started <<<<")
         obj = DataTransformationTrainingPipeline()
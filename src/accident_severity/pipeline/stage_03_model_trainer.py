@@ -1,7 +1,8 @@
 
+import os
 from accident_severity.config.configuration import ConfigurationManager
-from accident_severity.components.model_trainer import ModelTrainer
-from accident_severity.logging import logger
+from accident_severity.logging import logger, configure as configure_logging
+from accident_severity.entity.config_entity import StageSpec
 
 STAGE_NAME = "Model Trainer Stage"
 
@@ -10,13 +11,37 @@ class ModelTrainingPipeline:
         pass 
 
     def main(self):
+        from accident_severity.components.model_trainer import ModelTrainer
+        from accident_severity.components.model_selection import ModelSelection
+
         config = ConfigurationManager()
         model_trainer_config = config.get_model_trainer_config()
-        model_trainer_config = ModelTrainer(config=model_trainer_config)
-        model_trainer_config.train()
+        model_trainer = ModelTrainer(config=model_trainer_config)
+        if model_trainer_config.candidates:
+            model_selection = ModelSelection(config=model_trainer_config, trainer=model_trainer)
+            model_selection.train_candidates()
+        else:
+            model_trainer.train()
+
+    def cache_spec(self, config):
+        model_trainer_config = config.get_model_trainer_config()
+        return StageSpec(
+            files=[path for path in (model_trainer_config.train_data_path,
+                                     model_trainer_config.test_data_path,
+                                     model_trainer_config.validation_data_path,
+                                     model_trainer_config.tuned_params_path) if path and os.path.exists(path)],
+            config_sections=["model_trainer"],
+            params_sections=["XGBClassifier", "resampling", "candidates"],
+            schema_sections=["TARGET_COLUMN"],
+            modules=["accident_severity.components.model_trainer",
+                     "accident_severity.components.model_selection",
+                     "accident_severity.components.resampling"],
+            outputs=[os.path.join(model_trainer_config.root_dir, model_trainer_config.model_name)]
+        )
 
 
 if __name__ == "__main__":
+    configure_logging(ConfigurationManager().get_logging_config())
     try:
         logger.info(f">>>> Stage {STAGE_NAME} Started <<<<")
         obj = ModelTrainingPipeline()
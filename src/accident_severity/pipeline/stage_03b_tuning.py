@@ -0,0 +1,48 @@
+import os
+from accident_severity.config.configuration import ConfigurationManager
+from accident_severity.logging import logger, configure as configure_logging
+from accident_severity.entity.config_entity import StageSpec
+
+STAGE_NAME = "Model Tuning Stage"
+
+class ModelTuningPipeline:
+    def __init__(self):
+        pass
+
+    def main(self):
+        from accident_severity.components.model_tuning import ModelTuning
+
+        config = ConfigurationManager()
+        model_tuning_config = config.get_model_tuning_config()
+        if not model_tuning_config.enabled:
+            logger.info("Model tuning is disabled in params.yaml, skipping")
+            return
+
+        model_tuning = ModelTuning(config=model_tuning_config, trainer_config=config.get_model_trainer_config())
+        model_tuning.tune()
+
+    def cache_spec(self, config):
+        model_tuning_config = config.get_model_tuning_config()
+        model_trainer_config = config.get_model_trainer_config()
+        return StageSpec(
+            files=[path for path in (model_trainer_config.train_data_path,
+                                     model_trainer_config.validation_data_path) if os.path.exists(path)],
+            config_sections=["model_tuning"],
+            params_sections=["tuning", "XGBClassifier", "resampling"],
+            schema_sections=["TARGET_COLUMN"],
+            modules=["accident_severity.components.model_tuning",
+                     "accident_severity.components.model_trainer"],
+            outputs=[model_tuning_config.root_dir]
+        )
+
+
+if __name__ == "__main__":
+    configure_logging(ConfigurationManager().get_logging_config())
+    try:
+        logger.info(f">>>> Stage {STAGE_NAME} Started <<<<")
+        obj = ModelTuningPipeline()
+        obj.main()
+        logger.info(f">>>> Stage {STAGE_NAME} Completed <<<<")
+    except Exception as e:
+        logger.exception(e)
+        raise e
@@ -1,7 +1,7 @@
 
 from accident_severity.config.configuration import ConfigurationManager
-from accident_severity.components.model_evaluation import ModelEvaluation
-from accident_severity.logging import logger
+from accident_severity.logging import logger, configure as configure_logging
+from accident_severity.entity.config_entity import StageSpec
 
 STAGE_NAME = "Model Evaluation Stage"
 
@@ -10,13 +10,26 @@ class ModelEvaluationPipeline:
         pass 
 
     def main(self):
+        from accident_severity.components.model_evaluation import ModelEvaluation
+
         config = ConfigurationManager()
         model_evaluation_config = config.get_model_evaluation_config()
         model_evaluation = ModelEvaluation(config=model_evaluation_config)
         model_evaluation.evaluate_model()
 
+    def cache_spec(self, config):
+        model_evaluation_config = config.get_model_evaluation_config()
+        return StageSpec(
+            files=[model_evaluation_config.test_data_path, model_evaluation_config.model_path],
+            config_sections=["model_evaluation"],
+            schema_sections=["TARGET_COLUMN"],
+            modules=["accident_severity.components.model_evaluation"],
+            outputs=[model_evaluation_config.metric_file_name]
+        )
+
 
 if __name__ == "__main__":
+    configure_logging(ConfigurationManager().get_logging_config())
     try:
         logger.info(f">>>> Stage {STAGE_NAME} Started <<<<")
         obj = ModelEvaluationPipeline()
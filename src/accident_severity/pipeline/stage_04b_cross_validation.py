@@ -0,0 +1,46 @@
+import os
+from accident_severity.config.configuration import ConfigurationManager
+from accident_severity.logging import logger, configure as configure_logging
+from accident_severity.entity.config_entity import StageSpec
+
+STAGE_NAME = "Cross Validation Stage"
+
+class CrossValidationPipeline:
+    def __init__(self):
+        pass
+
+    def main(self):
+        from accident_severity.components.cross_validation import CrossValidation
+
+        config = ConfigurationManager()
+        cross_validation_config = config.get_cross_validation_config()
+        cross_validation = CrossValidation(config=cross_validation_config,
+                                           trainer_config=config.get_model_trainer_config())
+        cross_validation.cross_validate()
+
+    def cache_spec(self, config):
+        cross_validation_config = config.get_cross_validation_config()
+        model_trainer_config = config.get_model_trainer_config()
+        files = cross_validation_config.data_paths + [model_trainer_config.tuned_params_path]
+        return StageSpec(
+            files=[path for path in files if path and os.path.exists(path)],
+            config_sections=["cross_validation"],
+            params_sections=["cross_validation", "XGBClassifier", "resampling", "train_test_split"],
+            schema_sections=["TARGET_COLUMN"],
+            modules=["accident_severity.components.cross_validation",
+                     "accident_severity.components.model_trainer",
+                     "accident_severity.components.resampling"],
+            outputs=[cross_validation_config.metric_file_name]
+        )
+
+
+if __name__ == "__main__":
+    configure_logging(ConfigurationManager().get_logging_config())
+    try:
+        logger.info(f">>>> Stage {STAGE_NAME} Started <<<<")
+        obj = CrossValidationPipeline()
+        obj.main()
+        logger.info(f">>>> Stage {STAGE_NAME} Completed <<<<")
+    except Exception as e:
+        logger.exception(e)
+        raise e
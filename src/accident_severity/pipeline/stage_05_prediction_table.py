@@ -0,0 +1,47 @@
+
+from accident_severity.config.configuration import ConfigurationManager
+from accident_severity.logging import logger, configure as configure_logging
+from accident_severity.entity.config_entity import StageSpec
+
+STAGE_NAME = "Prediction Table Stage"
+
+class PredictionTablePipeline:
+    def __init__(self):
+        pass 
+
+    def main(self):
+        from accident_severity.components.prediction_table import PredictionTableBuilder
+
+        config = ConfigurationManager()
+        prediction_table_config = config.get_prediction_table_config()
+        if not prediction_table_config.enabled:
+            logger.info("Prediction table is disabled in config.yaml, skipping")
+            return
+
+        prediction_table_builder = PredictionTableBuilder(config=prediction_table_config)
+        prediction_table_builder.build_table()
+
+    def cache_spec(self, config):
+        prediction_table_config = config.get_prediction_table_config()
+        files = [prediction_table_config.model_path, prediction_table_config.preprocessor_path]
+        if prediction_table_config.prune_to_observed:
+            files += prediction_table_config.observed_data_paths
+        return StageSpec(
+            files=files,
+            config_sections=["prediction_table"],
+            modules=["accident_severity.components.prediction_table",
+                     "accident_severity.components.categorical_encoder"],
+            outputs=[prediction_table_config.root_dir]
+        )
+
+
+if __name__ == "__main__":
+    configure_logging(ConfigurationManager().get_logging_config())
+    try:
+        logger.info(f">>>> Stage {STAGE_NAME} Started <<<<")
+        obj = PredictionTablePipeline()
+        obj.main()
+        logger.info(f">>>> Stage {STAGE_NAME} Completed <<<<")
+    except Exception as e:
+        logger.exception(e)
+        raise e
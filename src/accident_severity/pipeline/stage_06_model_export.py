@@ -0,0 +1,42 @@
+from accident_severity.config.configuration import ConfigurationManager
+from accident_severity.logging import logger, configure as configure_logging
+from accident_severity.entity.config_entity import StageSpec
+
+STAGE_NAME = "Model Export Stage"
+
+class ModelExportPipeline:
+    def __init__(self):
+        pass
+
+    def main(self):
+        from accident_severity.components.model_export import ModelExport
+
+        config = ConfigurationManager()
+        model_export_config = config.get_model_export_config()
+        model_export = ModelExport(config=model_export_config)
+        model_export.export()
+
+    def cache_spec(self, config):
+        model_export_config = config.get_model_export_config()
+        return StageSpec(
+            files=[model_export_config.model_path, model_export_config.preprocessor_path,
+                   model_export_config.verify_data_path],
+            config_sections=["model_export"],
+            schema_sections=["TARGET_COLUMN"],
+            modules=["accident_severity.components.model_export",
+                     "accident_severity.components.tree_ensemble",
+                     "accident_severity.components.categorical_encoder"],
+            outputs=[model_export_config.root_dir]
+        )
+
+
+if __name__ == "__main__":
+    configure_logging(ConfigurationManager().get_logging_config())
+    try:
+        logger.info(f">>>> Stage {STAGE_NAME} Started <<<<")
+        obj = ModelExportPipeline()
+        obj.main()
+        logger.info(f">>>> Stage {STAGE_NAME} Completed <<<<")
+    except Exception as e:
+        logger.exception(e)
+        raise e
@@ -0,0 +1,41 @@
+from accident_severity.config.configuration import ConfigurationManager
+from accident_severity.logging import logger, configure as configure_logging
+from accident_severity.entity.config_entity import StageSpec
+
+STAGE_NAME = "Model Registry Stage"
+
+class ModelRegistryPipeline:
+    def __init__(self):
+        pass
+
+    def main(self):
+        from accident_severity.components.model_registry import ModelRegistration
+
+        config = ConfigurationManager()
+        model_registry_config = config.get_model_registry_config()
+        model_registration = ModelRegistration(config=model_registry_config)
+        model_registration.register()
+
+    def cache_spec(self, config):
+        model_registry_config = config.get_model_registry_config()
+        # No outputs: the registry is append-only, it is never restored from the stage
+        # cache, and a manual promotion or rollback must not make the stage rerun
+        return StageSpec(
+            files=[model_registry_config.model_path, model_registry_config.preprocessor_path,
+                   model_registry_config.metrics_path],
+            config_sections=["model_registry"],
+            schema_sections=["FEATURES", "TARGET_MAPPING"],
+            modules=["accident_severity.components.model_registry"]
+        )
+
+
+if __name__ == "__main__":
+    configure_logging(ConfigurationManager().get_logging_config())
+    try:
+        logger.info(f">>>> Stage {STAGE_NAME} Started <<<<")
+        obj = ModelRegistryPipeline()
+        obj.main()
+        logger.info(f">>>> Stage {STAGE_NAME} Completed <<<<")
+    except Exception as e:
+        logger.exception(e)
+        raise e
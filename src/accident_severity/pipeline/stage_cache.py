@@ -0,0 +1,139 @@
+
+import os
+import json
+import shutil
+import hashlib
+import importlib.util
+from pathlib import Path
+from accident_severity.logging import logger
+from accident_severity.entity.config_entity import StageCacheConfig
+from accident_severity.utils.common import hash_file
+
+
+def hash_path(path):
+    # Files are hashed by content, directories by the content of every file inside
+    path = Path(path)
+    if path.is_file():
+        return hash_file(path)
+
+    digest = hashlib.sha256()
+    for file in sorted(p for p in path.rglob("*") if p.is_file()):
+        digest.update(str(file.relative_to(path)).encode())
+        digest.update(hash_file(file).encode())
+    return digest.hexdigest()
+
+
+def output_state(path):
+    # Cheap existence/size/mtime signature used to tell whether outputs were touched
+    path = Path(path)
+    files = [path] if path.is_file() else sorted(p for p in path.rglob("*") if p.is_file())
+    return [[str(file), file.stat().st_size, file.stat().st_mtime_ns] for file in files]
+
+
+class StageCache:
+    def __init__(self, config: StageCacheConfig, configuration):
+        self.config = config
+        self.configuration = configuration
+        self.manifest = self.load_manifest()
+
+    def load_manifest(self):
+        if os.path.exists(self.config.manifest_path):
+            with open(self.config.manifest_path) as f:
+                return json.load(f)
+        return {}
+
+    def save_manifest(self):
+        tmp_path = f"{self.config.manifest_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=4)
+        os.replace(tmp_path, self.config.manifest_path)
+
+    def fingerprint(self, stage_name, spec):
+        sources = {
+            "stage": stage_name,
+            "files": {str(path): hash_path(path) for path in spec.files},
+            "config": {key: self.configuration.config.get(key) for key in spec.config_sections},
+            "params": {key: self.configuration.params.get(key) for key in spec.params_sections},
+            "schema": {key: self.configuration.schema.get(key) for key in spec.schema_sections},
+            "code": {module: hash_file(importlib.util.find_spec(module).origin) for module in spec.modules},
+        }
+        payload = json.dumps(sources, sort_keys=True, default=str).encode()
+        return hashlib.sha256(payload).hexdigest()
+
+    def cache_dir(self, stage_name, fingerprint):
+        slug = stage_name.lower().replace(" ", "_")
+        return Path(self.config.root_dir, slug, fingerprint[:16])
+
+    def outputs_current(self, entry, spec):
+        if not all(os.path.exists(path) for path in spec.outputs):
+            return False
+        return entry.get("outputs") == [output_state(path) for path in spec.outputs]
+
+    def store(self, stage_name, fingerprint, spec):
+        if not spec.outputs:
+            return
+        cache_dir = self.cache_dir(stage_name, fingerprint)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        for i, path in enumerate(spec.outputs):
+            target = cache_dir / str(i)
+            if os.path.isdir(path):
+                shutil.copytree(path, target)
+            else:
+                os.makedirs(cache_dir, exist_ok=True)
+                shutil.copy2(path, target)
+
+        # Only keep the most recent fingerprints of each stage
+        stage_dir = cache_dir.parent
+        entries = sorted(stage_dir.iterdir(), key=lambda p: p.stat().st_mtime, reverse=True)
+        for old in entries[self.config.keep:]:
+            shutil.rmtree(old, ignore_errors=True)
+
+    def restore(self, stage_name, fingerprint, spec):
+        cache_dir = self.cache_dir(stage_name, fingerprint)
+        if not cache_dir.exists():
+            return False
+
+        for i, path in enumerate(spec.outputs):
+            source = cache_dir / str(i)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            if source.is_dir():
+                shutil.copytree(source, path, dirs_exist_ok=True)
+            else:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                shutil.copy2(source, path)
+        return True
+
+    def refresh_outputs(self, stage_name, pipeline):
+        # Adopts outputs rewritten outside the stage (an incremental model update) as the
+        # stage's current ones, so the next run keeps them instead of restoring the cached
+        # copy. Only done while the inputs still match, otherwise the stage reruns anyway
+        spec = pipeline.cache_spec(self.configuration)
+        entry = self.manifest.get(stage_name)
+        if entry is None or entry.get("fingerprint") != self.fingerprint(stage_name, spec):
+            return False
+        entry["outputs"] = [output_state(path) for path in spec.outputs]
+        self.save_manifest()
+        return True
+
+    def run(self, stage_name, pipeline, force=False):
+        spec = pipeline.cache_spec(self.configuration)
+        fingerprint = self.fingerprint(stage_name, spec)
+        entry = self.manifest.get(stage_name, {})
+
+        if not force and entry.get("fingerprint") == fingerprint and self.outputs_current(entry, spec):
+            logger.info(f"Stage {stage_name} is up to date, skipping")
+            return False
+
+        if not force and self.restore(stage_name, fingerprint, spec):
+            logger.info(f"Stage {stage_name} restored from cache {self.cache_dir(stage_name, fingerprint)}")
+        else:
+            pipeline.main()
+            self.store(stage_name, fingerprint, spec)
+
+        self.manifest[stage_name] = {
+            "fingerprint": fingerprint,
+            "outputs": [output_state(path) for path in spec.outputs],
+        }
+        self.save_manifest()
+        return True
@@ -0,0 +1,69 @@
+import importlib
+from accident_severity.logging import logger, log_context, configure as configure_logging
+from accident_severity.utils.instrumentation import step, configure as configure_instrumentation
+
+# (cli name, module, pipeline class). Stage modules are imported only when their
+# stage is selected, and they import their components inside main(), so a stage
+# skipped by the cache never loads xgboost, sklearn or optuna. Each module's
+# STAGE_NAME names the stage in the logs and the stage cache
+STAGES = [
+    ("ingest", "accident_severity.pipeline.stage_01_data_ingestion", "DataIngestionTrainingPipeline"),
+    ("transform", "accident_severity.pipeline.stage_02_data_transformation", "DataTransformationTrainingPipeline"),
+    ("tune", "accident_severity.pipeline.stage_03b_tuning", "ModelTuningPipeline"),
+    ("train", "accident_severity.pipeline.stage_03_model_trainer", "ModelTrainingPipeline"),
+    ("evaluate", "accident_severity.pipeline.stage_04_model_evaluation", "ModelEvaluationPipeline"),
+    ("cross_validate", "accident_severity.pipeline.stage_04b_cross_validation", "CrossValidationPipeline"),
+    ("prediction_table", "accident_severity.pipeline.stage_05_prediction_table", "PredictionTablePipeline"),
+    ("export", "accident_severity.pipeline.stage_06_model_export", "ModelExportPipeline"),
+    ("register", "accident_severity.pipeline.stage_07_model_registry", "ModelRegistryPipeline"),
+]
+
+STAGE_NAMES = [name for name, _, _ in STAGES]
+
+# Stages that read the trained model, rerun after an incremental update
+MODEL_STAGES = ["evaluate", "prediction_table", "export", "register"]
+
+
+def load_stage(module_name, class_name):
+    # (stage name, pipeline class)
+    module = importlib.import_module(module_name)
+    return module.STAGE_NAME, getattr(module, class_name)
+
+
+def refresh_stage_outputs(name):
+    from accident_severity.config.configuration import ConfigurationManager
+    from accident_severity.pipeline.stage_cache import StageCache
+
+    _, module_name, class_name = next(stage for stage in STAGES if stage[0] == name)
+    STAGE_NAME, pipeline_class = load_stage(module_name, class_name)
+    config = ConfigurationManager()
+    stage_cache = StageCache(config=config.get_stage_cache_config(), configuration=config)
+    if not stage_cache.refresh_outputs(STAGE_NAME, pipeline_class()):
+        logger.warning(f"Stage {STAGE_NAME} has no cache entry for its current inputs, "
+                       f"its next run retrains and replaces the updated model")
+
+
+def run_stages(names=None, force=False):
+    from accident_severity.config.configuration import ConfigurationManager
+    from accident_severity.pipeline.stage_cache import StageCache
+
+    unknown = set(names or []) - set(STAGE_NAMES)
+    if unknown:
+        raise ValueError(f"Unknown stages {sorted(unknown)}, expected some of {STAGE_NAMES}")
+
+    config = ConfigurationManager()
+    configure_logging(config.get_logging_config())
+    configure_instrumentation(config.get_instrumentation_config())
+    stage_cache = StageCache(config=config.get_stage_cache_config(), configuration=config)
+
+    for name, module_name, class_name in STAGES:
+        if names and name not in names:
+            continue
+        STAGE_NAME, pipeline_class = load_stage(module_name, class_name)
+        # A failure is logged once, by the entry point the exception reaches
+        with log_context(stage=STAGE_NAME):
+            logger.info(f">>>> Stage {STAGE_NAME} Started <<<<")
+            obj = pipeline_class()
+            with step(STAGE_NAME):
+                stage_cache.run(STAGE_NAME, obj, force=force)
+            logger.info(f">>>> Stage {STAGE_NAME} Completed <<<<")
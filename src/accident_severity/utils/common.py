@@ -5,9 +5,11 @@ from accident_severity.logging import logger
 from ensure import ensure_annotations
 from box import ConfigBox
 from pathlib import Path
-from typing import Any
 import json
-import joblib
+import hashlib
+from functools import lru_cache
+import numpy as np
+import pandas as pd
 
 
 
@@ -60,16 +62,20 @@ def load_json(path: Path) -> ConfigBox:
 
 
 @ensure_annotations
-def save_bin(path: Path, data: Any):
-    
-    joblib.dump(value=data, filename=path)
+def save_bin(path: Path, data, compress=0):
+    # compress: 0-9 for zlib or a (codec, level) pair, e.g. ("lz4", 3); numpy arrays in
+    # uncompressed files can be memory-mapped by load_bin
+    import joblib
+
+    joblib.dump(value=data, filename=path, compress=compress)
     logger.info(f"binary file saved at: {path}")
 
 
 @ensure_annotations
-def load_bin(path: Path) -> Any:
+def load_bin(path: Path, mmap_mode=None):
+    import joblib
 
-    data = joblib.load(path)
+    data = joblib.load(path, mmap_mode=mmap_mode)
     logger.info(f"binary file loaded successfully from: {path}")
     return data 
 
@@ -80,4 +86,118 @@ def get_size(path: Path)->str:
     size_in_kb = round(os.path.getsize(path)/1024)
     return f"~{size_in_kb} KB"
 
-    
\ No newline at end of file
+
+def hash_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=8)
+def _load_artifact(path, mtime_ns, loader):
+    return loader(path)
+
+
+def load_artifact(path, loader=None):
+    # Each artifact is unpickled once per process (e.g. across Streamlit reruns),
+    # keyed on its mtime so a retrained model replaces the cached one
+    if loader is None:
+        import joblib
+
+        loader = joblib.load
+    path = Path(path).resolve()
+    return _load_artifact(path, path.stat().st_mtime_ns, loader)
+
+
+ARTIFACT_FORMATS = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather", "npy": ".npy"}
+
+
+@ensure_annotations
+def compact_codes(df: pd.DataFrame, columns: list) -> pd.DataFrame:
+    # Ordinal codes and the target fit in int8/int16, keep them that small on disk.
+    # Non-integral columns (e.g. SMOTE-interpolated codes) become float32, which is
+    # the precision xgboost trains on anyway.
+    df = df.copy()
+    for col in columns:
+        if (df[col] % 1 == 0).all():
+            df[col] = pd.to_numeric(df[col], downcast="integer")
+        else:
+            df[col] = df[col].astype(np.float32)
+    return df
+
+
+@ensure_annotations
+def save_frame(df: pd.DataFrame, path: Path):
+
+    if path.suffix == ".csv":
+        df.to_csv(path, index=False)
+    elif path.suffix == ".parquet":
+        df.to_parquet(path, index=False)
+    elif path.suffix == ".feather":
+        # Uncompressed so that it can be memory-mapped on load
+        df.reset_index(drop=True).to_feather(path, compression="uncompressed")
+    elif path.suffix == ".npy":
+        # A single 2-D array of the smallest common dtype plus its column names and
+        # dtypes, so columns promoted with the others (the int8 target next to float32
+        # codes) are cast back on load
+        np.save(path, df.to_numpy(dtype=np.result_type(*df.dtypes)))
+        with open(path.with_suffix(".json"), "w") as f:
+            json.dump({"columns": df.columns.to_list(), "dtypes": [str(dtype) for dtype in df.dtypes]}, f)
+    else:
+        raise ValueError(f"Unsupported artifact format: {path.suffix}")
+
+    logger.info(f"{path.suffix[1:]} file saved at: {path}")
+
+
+@ensure_annotations
+def load_frame(path: Path, columns=None) -> pd.DataFrame:
+
+    if path.suffix == ".csv":
+        df = pd.read_csv(path, usecols=columns)
+    elif path.suffix == ".parquet":
+        df = pd.read_parquet(path, columns=columns)
+    elif path.suffix == ".feather":
+        import pyarrow.feather as feather
+
+        df = feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+    elif path.suffix == ".npy":
+        with open(path.with_suffix(".json")) as f:
+            meta = json.load(f)
+        # Wrap the memory-mapped array without copying it, only promoted columns are copied back
+        df = pd.DataFrame(np.load(path, mmap_mode="r"), columns=meta["columns"], copy=False)
+        if columns is not None:
+            df = df[columns]
+        dtypes = dict(zip(meta["columns"], meta.get("dtypes", [])))
+        promoted = {col: dtypes[col] for col in df.columns if col in dtypes and dtypes[col] != str(df[col].dtype)}
+        if promoted:
+            df = df.astype(promoted)
+    else:
+        raise ValueError(f"Unsupported artifact format: {path.suffix}")
+
+    logger.info(f"{path.suffix[1:]} file loaded successfully from: {path}")
+    return df
+
+
+def select_columns(df, column_mapping, columns):
+    # Rename the raw RTA columns and keep only the requested ones
+    return df.rename(columns=column_mapping)[columns]
+
+
+def source_columns(column_mapping, columns):
+    # Raw RTA column names behind the requested pipeline columns
+    return [raw for raw, name in column_mapping.items() if name in columns]
+
+
+def limit_threads(estimator, n_threads):
+    # Caps the OpenMP/BLAS pools of this process and, for estimators with their own
+    # pools, the estimator itself. threadpoolctl is only imported here, so scoring
+    # code importing this module does not load it
+    from threadpoolctl import threadpool_limits
+
+    if type(estimator).__module__.startswith("catboost"):
+        estimator.set_params(thread_count=n_threads)
+    elif hasattr(estimator, "get_params") and "n_jobs" in estimator.get_params():
+        estimator.set_params(n_jobs=n_threads)
+    return threadpool_limits(limits=n_threads)
@@ -0,0 +1,337 @@
+import os
+import sys
+import json
+import time
+import fcntl
+import atexit
+import resource
+import threading
+import functools
+import contextvars
+from pathlib import Path
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from accident_severity.logging import logger, run_id
+
+# Off until an entry point (the pipeline stages, the score, generate and update
+# commands) passes the instrumentation section of config.yaml to configure, so
+# library and serving callers write no files and register no exit hook
+_settings = None
+_exit_hook = False
+_lock = threading.Lock()
+_records = []
+_aggregates = {}
+_current = contextvars.ContextVar("instrumentation_step", default=None)
+_started = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def configure(config):
+    global _settings, _exit_hook
+    _settings = config
+    if config is not None and config.enabled and not _exit_hook:
+        atexit.register(write_reports)
+        _exit_hook = True
+
+
+def settings():
+    return _settings
+
+
+def enabled():
+    config = settings()
+    return config is not None and config.enabled
+
+
+def peak_rss_bytes():
+    # ru_maxrss is the process high-water mark, in kilobytes on Linux. It never
+    # decreases, so it is the peak of the whole process so far, not of one step
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def rss_bytes():
+    # Current resident set size, None where /proc is not available
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return None
+
+
+def record_rows(rows_in=None, rows_out=None):
+    step = _current.get()
+    if step is not None:
+        if rows_in is not None:
+            step["rows_in"] = int(rows_in)
+        if rows_out is not None:
+            step["rows_out"] = int(rows_out)
+
+
+def record_artifact(path):
+    step = _current.get()
+    if step is not None and os.path.exists(path):
+        step["artifact_bytes"] = step.get("artifact_bytes", 0) + os.path.getsize(path)
+
+
+class StackSampler:
+    # Samples the calling thread's stack every interval seconds into folded
+    # "frame;frame;frame count" lines, the input format of flamegraph.pl and speedscope
+    def __init__(self, interval):
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks = Counter()
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+
+    def sample(self):
+        while not self.stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{Path(code.co_filename).stem}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        self.thread.join()
+
+    def save(self, path):
+        with open(path, "w") as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+@contextmanager
+def profiled(name, config):
+    base = Path(config.profile_dir, f"{run_id()}_{name}")
+    if config.profile != "none":
+        os.makedirs(config.profile_dir, exist_ok=True)
+
+    if config.profile == "cprofile":
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(f"{base}.prof")
+    elif config.profile == "flamegraph":
+        with StackSampler(config.sample_interval_ms / 1000) as sampler:
+            yield
+        sampler.save(f"{base}.folded")
+    elif config.profile == "none":
+        yield
+    else:
+        raise ValueError(f"Unknown profile {config.profile!r}, expected none, cprofile or flamegraph")
+
+
+@contextmanager
+def step(name):
+    config = settings()
+    if config is None or not config.enabled:
+        yield None
+        return
+
+    record = {"step": name, "started": datetime.now(timezone.utc).isoformat(timespec="milliseconds")}
+    token = _current.set(record)
+    rss_before, peak_before = rss_bytes(), peak_rss_bytes()
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        with profiled(name, config):
+            yield record
+        record["status"] = "ok"
+    except BaseException:
+        record["status"] = "error"
+        raise
+    finally:
+        _current.reset(token)
+        record["wall_seconds"] = time.perf_counter() - wall
+        record["cpu_seconds"] = time.process_time() - cpu
+        rss_after = rss_bytes()
+        if rss_after is not None and rss_before is not None:
+            record["rss_delta_bytes"] = rss_after - rss_before
+        record["process_peak_rss_bytes"] = peak_rss_bytes()
+        # How far this step pushed the process high-water mark, 0 if it stayed below an earlier peak
+        record["rss_growth_bytes"] = record["process_peak_rss_bytes"] - peak_before
+        rows = record.get("rows_in", record.get("rows_out"))
+        if rows is not None and record["wall_seconds"] > 0:
+            record["rows_per_second"] = rows / record["wall_seconds"]
+        with _lock:
+            _records.append(record)
+        logger.info(f"{name}: {record['wall_seconds']:.3f}s wall, {record['cpu_seconds']:.3f}s cpu, "
+                    + (f"rss {record['rss_delta_bytes'] / 2 ** 20:+.0f} MB, " if "rss_delta_bytes" in record else "")
+                    + f"process peak rss {record['process_peak_rss_bytes'] / 2 ** 20:.0f} MB"
+                    + (f", {rows} rows ({record['rows_per_second']:,.0f} rows/s)" if "rows_per_second" in record else ""))
+
+
+def instrument(name, hot=False):
+    # hot=True is for per-request paths: only call count, rows and time totals are
+    # kept, with no per-call record, log line or profiling
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled():
+                return fn(*args, **kwargs)
+            if not hot:
+                with step(name):
+                    return fn(*args, **kwargs)
+
+            wall, cpu = time.perf_counter(), time.process_time()
+            result = fn(*args, **kwargs)
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            rows = len(result) if hasattr(result, "__len__") else 0
+            with _lock:
+                _add_totals(name, {"calls": 1, "rows": rows, "wall_seconds": wall,
+                                   "cpu_seconds": cpu, "max_wall_seconds": wall})
+            return result
+        return wrapper
+    return decorator
+
+
+def _add_totals(name, totals):
+    # Called with _lock held
+    merged = _aggregates.setdefault(name, {"calls": 0, "rows": 0, "wall_seconds": 0.0,
+                                           "cpu_seconds": 0.0, "max_wall_seconds": 0.0})
+    for metric in ("calls", "rows", "wall_seconds", "cpu_seconds"):
+        merged[metric] += totals[metric]
+    merged["max_wall_seconds"] = max(merged["max_wall_seconds"], totals["max_wall_seconds"])
+
+
+def report():
+    with _lock:
+        return {"run_id": run_id(), "started": _started, "pid": os.getpid(),
+                "steps": list(_records), "aggregates": {name: dict(totals) for name, totals in _aggregates.items()}}
+
+
+def take_report():
+    # The steps and hot-path totals recorded since the last call, which are then cleared
+    with _lock:
+        data = {"steps": list(_records), "aggregates": {name: dict(totals) for name, totals in _aggregates.items()}}
+        _records.clear()
+        _aggregates.clear()
+    return data
+
+
+def merge_report(data):
+    with _lock:
+        _records.extend(data["steps"])
+        for name, totals in data["aggregates"].items():
+            _add_totals(name, totals)
+
+
+def worker_call(fn, *args):
+    # Pool workers exit without running atexit, so a forked worker returns what it
+    # recorded next to fn's result and merge_worker_results adds it to the parent's
+    # report. Use as pool.map(functools.partial(worker_call, fn), ...)
+    return fn(*args), take_report()
+
+
+def merge_worker_results(outputs):
+    results = []
+    for result, data in outputs:
+        merge_report(data)
+        results.append(result)
+    return results
+
+
+def _after_fork():
+    # A forked worker starts with nothing recorded, so it only reports its own work
+    global _lock
+    _lock = threading.Lock()
+    _records.clear()
+    _aggregates.clear()
+
+
+PROMETHEUS_METRICS = {
+    "accident_severity_step_wall_seconds": ("gauge", "Wall-clock seconds of the last run of the step"),
+    "accident_severity_step_cpu_seconds": ("gauge", "Process CPU seconds of the last run of the step"),
+    "accident_severity_step_rss_delta_bytes": ("gauge", "Change of the resident set size over the step"),
+    "accident_severity_step_process_peak_rss_bytes": ("gauge", "High-water mark of the process resident set size "
+                                                               "when the step finished, never decreases"),
+    "accident_severity_step_rss_growth_bytes": ("gauge", "Growth of the process high-water mark during the step"),
+    "accident_severity_step_rows_in": ("gauge", "Rows the step consumed"),
+    "accident_severity_step_rows_out": ("gauge", "Rows the step produced"),
+    "accident_severity_step_rows_per_second": ("gauge", "Rows per wall-clock second"),
+    "accident_severity_step_artifact_bytes": ("gauge", "Bytes of the artifacts the step wrote"),
+    "accident_severity_hot_calls_total": ("counter", "Calls of the hot path"),
+    "accident_severity_hot_rows_total": ("counter", "Rows returned by the hot path"),
+    "accident_severity_hot_wall_seconds_total": ("counter", "Wall-clock seconds spent in the hot path"),
+    "accident_severity_hot_cpu_seconds_total": ("counter", "Process CPU seconds spent in the hot path"),
+    "accident_severity_hot_max_wall_seconds": ("gauge", "Slowest single call of the hot path"),
+}
+
+
+def prometheus_samples(data):
+    samples = {}
+    for record in data["steps"]:
+        for metric in ("wall_seconds", "cpu_seconds", "rss_delta_bytes", "process_peak_rss_bytes", "rss_growth_bytes",
+                       "rows_in", "rows_out", "rows_per_second", "artifact_bytes"):
+            if metric in record:
+                samples[(f"accident_severity_step_{metric}", record["step"])] = (data["run_id"], record[metric])
+    for name, totals in data["aggregates"].items():
+        for metric, value in totals.items():
+            suffix = "" if metric == "max_wall_seconds" else "_total"
+            samples[(f"accident_severity_hot_{metric}{suffix}", name)] = (data["run_id"], value)
+    return samples
+
+
+def parse_prometheus(path):
+    samples = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                if line.startswith("#") or not line.strip():
+                    continue
+                name, rest = line.split("{", 1)
+                labels, value = rest.rsplit("} ", 1)
+                step_name = labels.split('step="', 1)[1].split('"', 1)[0]
+                run = labels.split('run_id="', 1)[1].split('"', 1)[0]
+                samples[(name, step_name)] = (run, float(value))
+    return samples
+
+
+def prometheus_text(samples):
+    # Prometheus text exposition format, e.g. for the node_exporter textfile collector
+    lines = []
+    for name, (kind, help_text) in PROMETHEUS_METRICS.items():
+        rows = sorted((step_name, run, value) for (metric, step_name), (run, value) in samples.items() if metric == name)
+        if rows:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            lines += [f'{name}{{step="{step_name}",run_id="{run}"}} {value}' for step_name, run, value in rows]
+    return "\n".join(lines) + "\n"
+
+
+def write_reports():
+    config = settings()
+    data = report()
+    if config is None or not config.enabled or not (data["steps"] or data["aggregates"]):
+        return
+    os.makedirs(config.root_dir, exist_ok=True)
+    # One report per run and process, forked workers and repeated CLI calls never overwrite each other
+    report_path = Path(config.root_dir, f"{data['run_id']}_{data['pid']}.json")
+    with open(report_path, "w") as f:
+        json.dump(data, f, indent=4)
+
+    # The metrics file keeps the latest sample of every step across processes, so a
+    # scoring run does not wipe the training stages' metrics. The lock serialises the
+    # read-modify-write of concurrent processes (a CLI scoring run during training,
+    # service replicas), the rename keeps readers from seeing a partial file
+    prometheus_path = Path(config.root_dir, config.prometheus_file)
+    with open(prometheus_path.with_suffix(".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        samples = {**parse_prometheus(prometheus_path), **prometheus_samples(data)}
+        tmp_path = prometheus_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            f.write(prometheus_text(samples))
+        os.replace(tmp_path, prometheus_path)
+
+
+os.register_at_fork(after_in_child=_after_fork)
@@ -0,0 +1,178 @@
+import io
+import random
+import zipfile
+import threading
+import dataclasses
+from pathlib import Path
+from types import SimpleNamespace
+from urllib.error import HTTPError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from accident_severity.logging import DEFAULT_CONFIG, configure as configure_logging, stop as stop_logging
+from accident_severity.entity.config_entity import DataIngestionConfig
+from accident_severity.components.data_ingestion import DataIngestion
+from accident_severity.components.data_transformation import DataTransformation
+from accident_severity.utils.common import hash_file
+
+MEMBER = "RTA Dataset.csv"
+
+
+class StandInServer:
+    # Local stand-in for the dataset host. It can drop the connection once part way
+    # through the body, ignore Range requests or answer every request with an error status
+    def __init__(self, payload):
+        self.payload = payload
+        self.reset()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                range_header = self.headers.get("Range")
+                server.requests.append(range_header)
+                if server.status is not None:
+                    self.send_error(server.status)
+                    return
+
+                start = 0
+                if range_header and server.honour_range:
+                    start = int(range_header.split("=")[1].split("-")[0])
+                    if start >= len(server.payload):
+                        self.send_response(416)
+                        self.end_headers()
+                        return
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{len(server.payload) - 1}/{len(server.payload)}")
+                else:
+                    self.send_response(200)
+                body = server.payload[start:]
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+
+                if server.cut_after is not None:
+                    body, server.cut_after = body[:server.cut_after], None
+                self.wfile.write(body)
+                server.bytes_sent += len(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/RTA-Dataset.zip"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def reset(self, cut_after=None, honour_range=True, status=None):
+        self.cut_after, self.honour_range, self.status = cut_after, honour_range, status
+        self.bytes_sent, self.requests = 0, []
+
+
+@pytest.fixture(scope="module", autouse=True)
+def log_dir(tmp_path_factory):
+    log_dir = tmp_path_factory.mktemp("logs")
+    configure_logging(dataclasses.replace(DEFAULT_CONFIG, log_dir=str(log_dir), console=False))
+    yield log_dir
+    stop_logging()
+
+
+@pytest.fixture(scope="module")
+def payload():
+    rng = random.Random(0)
+    rows = [f"{rng.randint(0, 23)}:{rng.randint(0, 59):02d}:00,{rng.choice(['Slight Injury', 'Serious Injury'])}"
+            for _ in range(50_000)]
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.writestr(MEMBER, "Time,Accident_severity\n" + "\n".join(rows) + "\n")
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope="module")
+def server(payload):
+    server = StandInServer(payload)
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
+
+
+@pytest.fixture
+def config(tmp_path, server, payload, monkeypatch):
+    # Retries resume at once instead of backing off
+    monkeypatch.setattr("accident_severity.components.data_ingestion.time.sleep", lambda seconds: None)
+    digest = hash_file(_write(tmp_path / "source.zip", payload))
+    return DataIngestionConfig(root_dir=tmp_path, source_url=server.url,
+                               local_data_file=str(tmp_path / "RTA_data.zip"), unzip_dir=tmp_path,
+                               sha256=digest, chunk_size=16 * 1024, timeout=5, max_retries=3, extract_zip=True)
+
+
+def _write(path, data):
+    path.write_bytes(data)
+    return path
+
+
+@pytest.mark.parametrize("cut, honour_range, sha256, existing, expected", [
+    (None, True, "pinned", None, "ok"),
+    (0.4, True, "pinned", None, "ok"),
+    (0.4, False, "pinned", None, "ok"),
+    (None, True, "0" * 64, None, "rejected"),
+    (None, True, "pinned", 0.5, "ok"),
+    (None, True, None, 0.5, "ok"),
+], ids=["clean", "cut and resumed", "cut, Range ignored", "wrong sha256", "truncated file on disk",
+        "no sha256, truncated file"])
+def test_download(config, server, payload, cut, honour_range, sha256, existing, expected):
+    server.reset(cut_after=int(len(payload) * cut) if cut else None, honour_range=honour_range)
+    if existing is not None:
+        _write(Path(config.local_data_file), payload[:int(len(payload) * existing)])
+    if sha256 != "pinned":
+        config = DataIngestionConfig(**{**vars(config), "sha256": sha256})
+
+    try:
+        DataIngestion(config).download_file()
+        outcome = "ok" if Path(config.local_data_file).read_bytes() == payload else "corrupt"
+    except ValueError:
+        outcome = "rejected"
+
+    assert outcome == expected
+    if expected == "rejected":
+        assert not Path(config.local_data_file).exists()
+        assert not Path(f"{config.local_data_file}.part").exists()
+
+
+def test_resume_requests_the_missing_range(config, server, payload):
+    cut_after = int(len(payload) * 0.4)
+    server.reset(cut_after=cut_after)
+
+    DataIngestion(config).download_file()
+
+    assert server.requests == [None, f"bytes={cut_after}-"]
+    assert server.bytes_sent == len(payload)
+
+
+@pytest.mark.parametrize("status", [403, 404])
+def test_client_error_is_not_retried(config, server, status):
+    server.reset(status=status)
+
+    with pytest.raises(HTTPError) as error:
+        DataIngestion(config).download_file()
+
+    assert error.value.code == status
+    assert server.requests == [None]
+
+
+def test_server_error_is_retried(config, server):
+    server.reset(status=503)
+
+    with pytest.raises(HTTPError):
+        DataIngestion(config).download_file()
+
+    assert len(server.requests) == config.max_retries
+
+
+def test_streamed_read_matches_extracted(config, server, payload):
+    server.reset()
+    ingestion = DataIngestion(config)
+    ingestion.download_file()
+    ingestion.extract_zip_file()
+
+    extracted = DataTransformation(SimpleNamespace(zip_path=None, data_path=Path(config.unzip_dir, MEMBER)))
+    streamed = DataTransformation(SimpleNamespace(zip_path=config.local_data_file, zip_member=MEMBER))
+
+    assert extracted.read_raw(None).equals(streamed.read_raw(None))